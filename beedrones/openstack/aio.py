@@ -0,0 +1,775 @@
+# SPDX-License-Identifier: EUPL-1.2
+#
+# (C) Copyright 2018-2024 CSI-Piemonte
+
+import asyncio
+import ssl
+from inspect import isawaitable
+from logging import getLogger
+from time import time
+
+import ujson as json
+from beecell.simple import jsonDumps, truncate
+from six.moves import http_client
+from six.moves.urllib.parse import urlencode
+from beedrones.openstack.client import (
+    OpenstackClient,
+    OpenstackConnectionPool,
+    OpenstackError,
+    OpenstackObject,
+    OpenstackTransportError,
+    setup_client,
+)
+from beedrones.openstack.server import OpenstackServer
+
+
+class AsyncOpenstackConnectionPool(object):
+    """Keep-alive connection pool used by :class:`AsyncOpenstackClient`. Connections are bound to the event loop
+    where they are opened, so a pool must be used by one event loop only.
+
+    :param maxsize: max number of idle connections kept for every (proto, host, port, proxy) [default=100]
+    :param idle_timeout: idle connections older than this number of seconds are closed [default=60]
+    :param max_in_flight: max number of concurrent requests sent through the pool [default=100]
+    """
+
+    def __init__(self, maxsize=100, idle_timeout=60, max_in_flight=100):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.max_in_flight = max_in_flight
+
+        # {key: [(reader, writer, last_used), ..]}
+        self._idle = {}
+        self._semaphore = None
+
+        # pool counters
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return "<AsyncOpenstackConnectionPool id=%s hits=%s misses=%s>" % (id(self), self.hits, self.misses)
+
+    def limiter(self):
+        """Get the semaphore that limits concurrent requests. It is created on first use inside the event loop."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    def get(self, key):
+        """Get an idle connection
+
+        :param key: pool key. Use :meth:`OpenstackConnectionPool.key` to build it
+        :return: (reader, writer) or None if no idle connection is available
+        """
+        now = time()
+        idle = self._idle.get(key, [])
+        while len(idle) > 0:
+            reader, writer, last_used = idle.pop()
+            if now - last_used > self.idle_timeout or writer.is_closing() or reader.at_eof():
+                self.evictions += 1
+                writer.close()
+                continue
+            self.hits += 1
+            return reader, writer
+        self.misses += 1
+        return None
+
+    def put(self, key, reader, writer):
+        """Release a connection to the pool. If the pool is full the connection is closed.
+
+        :param key: pool key
+        :param reader: stream reader
+        :param writer: stream writer
+        """
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.maxsize:
+            idle.append((reader, writer, time()))
+            return
+        self.evictions += 1
+        writer.close()
+
+    def clear(self):
+        """Close all the idle connections"""
+        idle = self._idle
+        self._idle = {}
+        for conns in idle.values():
+            for reader, writer, last_used in conns:
+                writer.close()
+
+    def stats(self):
+        """Get pool counters
+
+        :return: dict with hits, misses, reconnects, evictions and idle connections
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reconnects": self.reconnects,
+            "evictions": self.evictions,
+            "idle": sum([len(v) for v in self._idle.values()]),
+        }
+
+
+class AsyncOpenstackClient(OpenstackClient):
+    """Asyncio http client with the same call contract of :class:`OpenstackClient`
+
+    :param uri: Ex. http://0.0.0.0:5000/v3
+    :param proxy: proxy server. Ex. ('proxy.it', 3128) [default=None]
+    :param timeout: request timeout [default=30]
+    :param pool: instance of :class:`AsyncOpenstackConnectionPool` used to reuse keep-alive connections. If not set a
+        new connection is opened for every request [optional]
+    """
+
+    async def _open_connection(self, timeout):
+        """Open a new connection
+
+        :return: (reader, writer)
+        """
+        ssl_context = None
+        server_hostname = None
+        if self.proto == "https":
+            ssl_context = ssl._create_unverified_context()
+            server_hostname = self.host
+
+        if self.proxy is None:
+            return await asyncio.open_connection(self.host, self.port, ssl=ssl_context)
+
+        # open the CONNECT tunnel to the proxy in a worker thread
+        loop = asyncio.get_running_loop()
+        sock = await loop.run_in_executor(None, self._open_tunnel, timeout)
+        self.logger.debug("set proxy %s" % self.proxy)
+        return await asyncio.open_connection(sock=sock, ssl=ssl_context, server_hostname=server_hostname)
+
+    def _open_tunnel(self, timeout):
+        conn = http_client.HTTPConnection(self.proxy[0], self.proxy[1], timeout=timeout)
+        conn.set_tunnel(self.host, port=self.port)
+        conn.connect()
+        sock = conn.sock
+        conn.sock = None
+        return sock
+
+    def _build_request(self, method, path, data, headers):
+        if data is None:
+            data = b""
+        elif isinstance(data, str):
+            data = data.encode("utf-8")
+
+        lines = ["%s %s HTTP/1.1" % (method, path), "Host: %s:%s" % (self.host, self.port)]
+        headers.setdefault("Accept-Encoding", "identity")
+        headers["Content-Length"] = len(data)
+        for key, value in headers.items():
+            lines.append("%s: %s" % (key, value))
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + bytes(data)
+
+    async def _read_response(self, reader, method):
+        """Read http response
+
+        :return: (status, reason, headers, body, will_close)
+        """
+        line = await reader.readline()
+        if not line:
+            raise http_client.RemoteDisconnected("Remote end closed connection without response")
+        items = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        version = items[0]
+        status = int(items[1])
+        reason = items[2] if len(items) > 2 else ""
+
+        headers = []
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, value = line.decode("latin-1").split(":", 1)
+            headers.append((key.strip(), value.strip()))
+        idx = {k.lower(): v for k, v in headers}
+
+        will_close = version == "HTTP/1.0" or idx.get("connection", "").lower() == "close"
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            body = b""
+        elif idx.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    # skip trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in idx:
+            body = await reader.readexactly(int(idx["content-length"]))
+        else:
+            body = await reader.read()
+            will_close = True
+        return status, reason, headers, body, will_close
+
+    async def _send(self, request, method, timeout):
+        key = OpenstackConnectionPool.key(self.proto, self.host, self.port, self.proxy)
+        conn = None
+        if self.pool is not None:
+            conn = self.pool.get(key)
+        reused = conn is not None
+        if conn is None:
+            conn = await self._open_connection(timeout)
+        reader, writer = conn
+
+        try:
+            try:
+                writer.write(request)
+                await writer.drain()
+                response = await self._read_response(reader, method)
+            except (http_client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                writer.close()
+                # a closed connection does not tell if server has already processed the request. Send again only
+                # idempotent requests
+                if reused is False or method.upper() not in OpenstackClient.replay_methods:
+                    raise
+                # keep-alive connection was closed by server. Reconnect and send again the request
+                self.logger.warning("Pooled connection closed by remote end. Reconnect")
+                self.pool.reconnects += 1
+                reader, writer = await self._open_connection(timeout)
+                writer.write(request)
+                await writer.drain()
+                response = await self._read_response(reader, method)
+        except BaseException:
+            writer.close()
+            raise
+
+        status, reason, headers, body, will_close = response
+        if self.pool is not None and will_close is False:
+            self.pool.put(key, reader, writer)
+        else:
+            writer.close()
+        return status, reason, headers, body
+
+    async def call(
+        self,
+        path,
+        method,
+        data="",
+        headers=None,
+        timeout=None,
+        token=None,
+        base_path=None,
+        resolve_conflicts=None,
+        content_type="application/json",
+        microversion=None,
+    ):
+        """Async http client. Usage:
+
+        res = await client.call('/servers', 'GET', token=token)
+
+        :param path: Request path. Ex. /api/
+        :param method: Request method. Ex. GET, POST, PUT, DELETE
+        :param headers: Request headers. [default={}]. Ex.
+            {"Content-type": "application/x-www-form-urlencoded", "Accept": "text/plain"}
+        :param data: Request data. [default={}]. Ex.
+            {'@number': 12524, '@type': 'issue', '@action': 'show'}
+        :param timeout: Request timeout. [optional]
+        :param token: Openstack authorization token [optional]
+        :param base_path: base path that replace defualt path set initially
+        :param resolve_conflicts: [optional] set this function or coroutine function to make some action when 409
+            error is returned.
+        :param content_type: request content type [default=application/json]
+        :param microversion: api microversion headers used only by this request. They replace microversion set on
+            the client. Ex. {"X-Openstack-Nova-Api-Version": "2.60"} [optional]
+        :raise OpenstackError:
+        :raise OpenstackNotFound: If request return 404
+        """
+        start = time()
+
+        # set timeout
+        if timeout is None:
+            timeout = self.timeout
+
+        if base_path is not None:
+            path = base_path + path
+        else:
+            path = self.path + path
+
+        http_headers = {"Content-Type": content_type}
+        if token is not None:
+            http_headers["X-Auth-Token"] = token
+        if microversion is None:
+            microversion = self.microversion
+        if microversion is not None:
+            http_headers.update(microversion)
+        if headers is not None:
+            http_headers.update(headers)
+
+        self.logger.info(
+            "Send http %s api request to %s://%s:%s%s with token %s"
+            % (method, self.proto, self.host, self.port, path, token)
+        )
+
+        if isinstance(data, dict):
+            data = jsonDumps(data)
+        if isinstance(data, str):
+            if data.lower().find("password") < 0:
+                self.logger.debug("Send [headers=%s] [data=%s]" % (http_headers, data))
+            else:
+                self.logger.debug("Send [headers=%s] [data=%s]" % (http_headers, "xxxxxxx"))
+
+        request = self._build_request(method, path, data, http_headers)
+        try:
+            if self.pool is not None:
+                async with self.pool.limiter():
+                    response = await asyncio.wait_for(self._send(request, method, timeout), timeout)
+            else:
+                response = await asyncio.wait_for(self._send(request, method, timeout), timeout)
+        except asyncio.TimeoutError:
+            self.logger.error("timeout")
+            raise OpenstackTransportError("timeout after %ss" % timeout)
+        except http_client.RemoteDisconnected:
+            self.logger.error("Remote end closed connection without response")
+            raise OpenstackTransportError("Remote end closed connection without response")
+        except Exception as ex:
+            self.logger.error(str(ex))
+            raise OpenstackTransportError(str(ex))
+
+        status, reason, res_headers, res = response
+        content_type = {k.lower(): v for k, v in res_headers}.get("content-type")
+        self.logger.info("Response status: %s %s" % (status, reason))
+        if content_type == "application/octet-stream":
+            self.logger.debug("Response [content-type=%s] [headers=%s]" % (content_type, truncate(res_headers)))
+        else:
+            self.logger.debug(
+                "Response [content-type=%s] [headers=%s] [data=%s]"
+                % (content_type, truncate(res_headers), truncate(res))
+            )
+        if content_type is not None and content_type.find("application/json") >= 0:
+            try:
+                res = json.loads(res)
+            except Exception as ex:
+                self.logger.warning(ex)
+        self.logger.info("Response elapsed: %s" % (time() - start))
+
+        # resolve_conflicts can be a coroutine function. Run it after status check
+        conflicts = []
+
+        def on_conflict(res):
+            conflicts.append(resolve_conflicts(res))
+            return None, None, None
+
+        if resolve_conflicts is None:
+            on_conflict = None
+        try:
+            res = self._check_response(path, status, res, res_headers, content_type, on_conflict)
+        except OpenstackError as ex:
+            ex.headers = res_headers
+            raise
+        if len(conflicts) > 0:
+            res = conflicts[0]
+            if isawaitable(res):
+                res = await res
+        return res
+
+
+class AsyncOpenstackManager(object):
+    """Asyncio counterpart of :class:`OpenstackManager`. Identity, token and service catalog are taken from an
+    authorized :class:`OpenstackManager`, requests are sent with :class:`AsyncOpenstackClient` on one event loop.
+
+    Usage:
+
+    manager.authorize(user, pwd, project=project, domain=domain)
+    async_manager = AsyncOpenstackManager(manager)
+    servers, volumes = await asyncio.gather(async_manager.server.list(detail=True), async_manager.volume.list_all())
+
+    :param manager: authorized instance of :class:`OpenstackManager`
+    :param pool_size: max number of idle keep-alive connections kept for every endpoint [default=100]
+    :param pool_idle_timeout: idle keep-alive connections older than this number of seconds are closed [default=60]
+    :param max_in_flight: max number of concurrent requests [default=100]
+    """
+
+    def __init__(self, manager, pool_size=100, pool_idle_timeout=60, max_in_flight=100):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.manager = manager
+        self.uri = manager.uri
+        self.proxy = manager.proxy
+        self.timeout = manager.timeout
+
+        self.connection_pool = AsyncOpenstackConnectionPool(
+            maxsize=pool_size, idle_timeout=pool_idle_timeout, max_in_flight=max_in_flight
+        )
+        self._client_cache = {}
+
+        self.server = AsyncOpenstackServer(self)
+        self.volume = AsyncOpenstackVolume(self)
+        self.network = AsyncOpenstackNetwork(self)
+        self.image = AsyncOpenstackImage(self)
+
+    def __repr__(self):
+        return "<AsyncOpenstackManager id=%s uri=%s>" % (id(self), self.uri)
+
+    @property
+    def identity(self):
+        return self.manager.identity
+
+    def endpoint(self, service, interface="public"):
+        """Get service endpoint from the catalog of the sync manager
+
+        :param service: service name
+        :param interface: endpoint interface [default=public]
+        """
+        return self.manager.endpoint(service, interface=interface)
+
+    def get_client(self, uri):
+        """Get async client for uri. Clients are cached and share the connection pool.
+
+        :param uri: endpoint uri
+        :return: instance of :class:`AsyncOpenstackClient`
+        """
+        client = self._client_cache.get(uri, None)
+        if client is None:
+            client = AsyncOpenstackClient(uri, self.proxy, timeout=self.timeout, pool=self.connection_pool)
+            self._client_cache[uri] = client
+        return client
+
+    def get_pool_stats(self):
+        """Get keep-alive connection pool counters"""
+        return self.connection_pool.stats()
+
+    def close(self):
+        """Close idle connections"""
+        self.connection_pool.clear()
+
+
+class AsyncOpenstackServer(OpenstackObject):
+    """Async openstack server manager"""
+
+    def setup(self):
+        self.uri = self.manager.endpoint("nova")
+        # change version from 2 to 2.1
+        self.uri = self.uri.replace("v2/", "v2.1/")
+        self.client = self.manager.get_client(self.uri)
+
+    @setup_client
+    async def iter_servers(self, detail=False, page_size=1000, marker=None, all_tenants=True, **kvargs):
+        """Iterate over all the servers using marker paging. Filters are the same of :meth:`OpenstackServer.list`
+
+        :param detail: if True show server details
+        :param page_size: number of servers requested for every page [default=1000]
+        :param marker: The ID of the last-seen item. Iteration starts after this server [optional]
+        :param all_tenants: if True show server fro all tenant [default=True]
+        :return: async generator of dict with server info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/servers"
+        if detail is True:
+            path = "/servers/detail"
+
+        query = OpenstackServer._list_query(all_tenants=all_tenants, **kvargs)
+        query["limit"] = page_size
+        microversion = self.nova_microversion("2.60")
+
+        while True:
+            if marker is not None:
+                query["marker"] = marker
+            new_path = "%s?%s" % (path, urlencode(query))
+            res = await self.client.call(
+                new_path, "GET", data="", token=self.manager.identity.token, microversion=microversion
+            )
+            servers = res[0].get("servers", [])
+            self.logger.debug("Get openstack servers page: %s" % len(servers))
+            for server in servers:
+                yield server
+
+            if len(servers) == 0 or res[0].get("server_links") is None:
+                break
+            marker = servers[-1]["id"]
+
+    async def list(self, detail=False, page_size=1000, marker=None, all_tenants=True, **kvargs):
+        """List all the servers. Filters are the same of :meth:`OpenstackServer.list`
+
+        :param detail: if True show server details
+        :param page_size: number of servers requested for every page [default=1000]
+        :param marker: The ID of the last-seen item [optional]
+        :param all_tenants: if True show server fro all tenant [default=True]
+        :return: list of dict with server info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        servers = []
+        async for server in self.iter_servers(
+            detail=detail, page_size=page_size, marker=marker, all_tenants=all_tenants, **kvargs
+        ):
+            servers.append(server)
+        self.logger.debug("Get openstack servers: %s" % truncate(servers))
+        return servers
+
+    @setup_client
+    async def get(self, oid):
+        """Get server
+
+        :param oid: server id
+        :return: dict with server info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/servers/%s" % oid
+        res = await self.client.call(path, "GET", data="", token=self.manager.identity.token)
+        self.logger.debug("Get openstack server: %s" % truncate(res[0]))
+        return res[0]["server"]
+
+    @setup_client
+    async def delete(self, oid, force=False):
+        """Delete server
+
+        :param oid: server id
+        :param force: if True force delete server
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        if force is True:
+            path = "/servers/%s/action" % oid
+            res = await self.client.call(
+                path, "POST", data=jsonDumps({"forceDelete": None}), token=self.manager.identity.token
+            )
+        else:
+            path = "/servers/%s" % oid
+            res = await self.client.call(path, "DELETE", data="", token=self.manager.identity.token)
+        self.logger.debug("Delete openstack server: %s" % oid)
+        return res[0]
+
+
+class AsyncOpenstackVolume(OpenstackObject):
+    """Async openstack volume manager. It uses block storage api v3"""
+
+    def setup(self):
+        self.uri = self.manager.endpoint("cinderv3")
+        self.client = self.manager.get_client(self.uri)
+
+    @property
+    def microversion(self):
+        return {"OpenStack-API-Version": "volume 3.50"}
+
+    @setup_client
+    async def list(self, detail=False, limit=None, offset=None, marker=None, all_tenants=True, **kvargs):
+        """List volumes
+
+        :param detail: if True show volume details
+        :param limit: Requests a page size of items [optional]
+        :param offset: Used in conjunction with limit to return a slice of items [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param all_tenants: if True show volumes of all tenants [default=True]
+        :return: (list of dict with volume info, total volume count)
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/volumes"
+        if detail is True:
+            path = "/volumes/detail"
+
+        query = kvargs
+        query["with_count"] = True
+        if limit is not None:
+            query["limit"] = limit
+        if offset is not None:
+            query["offset"] = offset
+        if marker is not None:
+            query["marker"] = marker
+        if all_tenants is True:
+            query["all_tenants"] = 1
+
+        path = "%s?%s" % (path, urlencode(query))
+        res = await self.client.call(
+            path, "GET", data="", token=self.manager.identity.token, timeout=60, microversion=self.microversion
+        )
+        self.logger.debug("Get openstack volumes: %s" % truncate(res[0]))
+        return res[0]["volumes"], res[0].get("count")
+
+    async def list_all(self, detail=False, limit=1000):
+        """List all the volumes. After the first page the other pages are requested concurrently.
+
+        :param detail: if True show volume details
+        :param limit: page size [default=1000]
+        :return: list of dict with volume info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        volumes, count = await self.list(detail=detail, limit=limit, offset=0)
+        if count is not None:
+            pages = await asyncio.gather(
+                *[self.list(detail=detail, limit=limit, offset=offset) for offset in range(limit, count, limit)]
+            )
+            for page in pages:
+                volumes.extend(page[0])
+        self.logger.debug("Get openstack volumes: %s" % len(volumes))
+        return volumes
+
+    @setup_client
+    async def get(self, oid):
+        """Get volume
+
+        :param oid: volume id
+        :return: dict with volume info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/volumes/%s" % oid
+        res = await self.client.call(
+            path, "GET", data="", token=self.manager.identity.token, microversion=self.microversion
+        )
+        self.logger.debug("Get openstack volume: %s" % truncate(res[0]))
+        return res[0]["volume"]
+
+    @setup_client
+    async def delete(self, oid, force=False):
+        """Delete volume
+
+        :param oid: volume id
+        :param force: if True force delete volume
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/volumes/%s" % oid
+        if force is True:
+            path += "?force=true"
+        res = await self.client.call(
+            path, "DELETE", data="", token=self.manager.identity.token, microversion=self.microversion
+        )
+        self.logger.debug("Delete openstack volume: %s" % oid)
+        return res[0]
+
+
+class AsyncOpenstackNetworkObject(OpenstackObject):
+    resource = None
+    resources = None
+
+    def __init__(self, manager):
+        OpenstackObject.__init__(self, manager)
+
+        self.ver = "/v2.0"
+
+    def setup(self):
+        self.uri = self.manager.endpoint("neutron")
+        self.client = self.manager.get_client(self.uri)
+
+    @setup_client
+    async def list(self, page_size=1000, **filters):
+        """List resources. Resources are requested one page at a time using marker pagination while neutron returns
+        a next link.
+
+        :param page_size: number of resources requested for every page [default=1000]
+        :param filters: neutron query filters. Ex. tenant_id, network_id, device_id
+        :return: list of dict with resource info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = dict(filters, limit=page_size)
+        items = []
+        while True:
+            path = "%s/%s?%s" % (self.ver, self.resources, urlencode(query, doseq=True))
+            res = (await self.client.call(path, "GET", data="", token=self.manager.identity.token))[0]
+            page = res[self.resources]
+            items.extend(page)
+            links = [link for link in res.get("%s_links" % self.resources, []) if link.get("rel") == "next"]
+            if len(page) == 0 or len(links) == 0:
+                break
+            query["marker"] = page[-1]["id"]
+        self.logger.debug("Get openstack %s: %s" % (self.resources, truncate(items)))
+        return items
+
+    @setup_client
+    async def get(self, oid):
+        """Get resource
+
+        :param oid: resource id
+        :return: dict with resource info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "%s/%s/%s" % (self.ver, self.resources, oid)
+        res = await self.client.call(path, "GET", data="", token=self.manager.identity.token)
+        self.logger.debug("Get openstack %s: %s" % (self.resource, truncate(res[0])))
+        return res[0][self.resource]
+
+    @setup_client
+    async def delete(self, oid):
+        """Delete resource
+
+        :param oid: resource id
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "%s/%s/%s" % (self.ver, self.resources, oid)
+        res = await self.client.call(path, "DELETE", data="", token=self.manager.identity.token)
+        self.logger.debug("Delete openstack %s: %s" % (self.resource, oid))
+        return res[0]
+
+
+class AsyncOpenstackNetwork(AsyncOpenstackNetworkObject):
+    """Async openstack network manager"""
+
+    resource = "network"
+    resources = "networks"
+
+    def __init__(self, manager):
+        AsyncOpenstackNetworkObject.__init__(self, manager)
+
+        self.subnet = AsyncOpenstackSubnet(manager)
+        self.port = AsyncOpenstackPort(manager)
+
+
+class AsyncOpenstackSubnet(AsyncOpenstackNetworkObject):
+    """Async openstack subnet manager"""
+
+    resource = "subnet"
+    resources = "subnets"
+
+
+class AsyncOpenstackPort(AsyncOpenstackNetworkObject):
+    """Async openstack port manager"""
+
+    resource = "port"
+    resources = "ports"
+
+
+class AsyncOpenstackImage(OpenstackObject):
+    """Async openstack image manager"""
+
+    def setup(self):
+        self.uri = "%s/v2" % self.manager.endpoint("glance")
+        self.client = self.manager.get_client(self.uri)
+
+    @setup_client
+    async def list(self, page_size=500, **kwargs):
+        """List images. Images are requested one page at a time using marker pagination while glance returns a next
+        link. Filters are the same of :meth:`OpenstackImage.list`
+
+        :param page_size: number of images requested for every page [default=500]
+        :return: list of dict with image info
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = dict(kwargs, limit=kwargs.get("limit", page_size))
+        images = []
+        while True:
+            path = "/images?%s" % urlencode(query)
+            res = (await self.client.call(path, "GET", data="", token=self.manager.identity.token))[0]
+            images.extend(res["images"])
+            if len(res["images"]) == 0 or res.get("next") is None:
+                break
+            query["marker"] = res["images"][-1]["id"]
+        self.logger.debug("Get openstack images: %s" % truncate(images))
+        return images
+
+    @setup_client
+    async def get(self, oid):
+        """Get image
+
+        :param oid: image id
+        :return: dict with image info
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/images/%s" % oid
+        res = await self.client.call(path, "GET", data="", token=self.manager.identity.token)
+        self.logger.debug("Get openstack image: %s" % truncate(res[0]))
+        return res[0]
+
+    @setup_client
+    async def delete(self, oid):
+        """Delete image
+
+        :param oid: image id
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/images/%s" % oid
+        res = await self.client.call(path, "DELETE", data="", token=self.manager.identity.token)
+        self.logger.debug("Delete openstack image: %s" % oid)
+        return res[0]
@@ -9,7 +9,7 @@ from beedrones.openstack.client import OpenstackClient, OpenstackObject, setup_c
 class OpenstackAodhObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("aodh")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackAodh(OpenstackAodhObject):
@@ -6,19 +6,39 @@ from beecell.simple import jsonDumps
 
 import ujson as json
 from logging import getLogger
-from time import time
+import random
+from time import time, sleep
+from email.utils import parsedate_to_datetime
+from datetime import datetime
+from threading import Lock, Timer
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+import os
 import ssl
 import re
+import hashlib
+import mmap
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
 from beecell.simple import truncate, check_vault
 from six.moves.urllib.parse import urlparse
 from six.moves import http_client
 from socket import timeout as SocketTimeout
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 
 class OpenstackError(Exception):
     def __init__(self, value, code=0):
         self.value = value
         self.code = code
+        # response headers. Set when error is raised from a response status
+        self.headers = None
         Exception.__init__(self, value, code)
 
     def __repr__(self):
@@ -33,6 +53,13 @@ class OpenstackNotFound(OpenstackError):
         OpenstackError.__init__(self, "Openstack entity (%s) was not found" % value, 404)
 
 
+class OpenstackTransportError(OpenstackError):
+    """Raised when request can not be sent or response can not be read"""
+
+    def __init__(self, value):
+        OpenstackError.__init__(self, value, 400)
+
+
 def setup_client(f):
     def wrapper(*args, **kvargs):
         args[0].setup()
@@ -41,13 +68,835 @@ def setup_client(f):
     return wrapper
 
 
-class OpenstackClient(object):
+def concurrent_map(func, items, concurrency):
+    """Apply func to every item using a bounded thread pool.
+
+    :param func: function to apply
+    :param items: iterable of items
+    :param concurrency: max number of concurrent threads
+    :return: list of results in the same order of items
+    """
+    items = list(items)
+    if len(items) == 0:
+        return []
+    # run func in a copy of the caller context to keep context-local settings like client microversion
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as executor:
+        return list(executor.map(lambda item: context.copy().run(func, item), items))
+
+
+@contextmanager
+def open_request_body(data=None, path=None, chunk_size=1048576):
+    """Prepare a request body that is sent without building a full copy of the payload. Usage:
+
+        with open_request_body(path='/tmp/image.qcow2') as (body, headers):
+            client.call(path, 'PUT', data=body, headers=headers)
+
+    :param data: str, bytes, file-like object opened in binary mode or iterable of bytes. File objects are read in
+        chunks and sent with Content-Length when size is known. Iterables are sent with chunked transfer encoding
+        [optional]
+    :param path: path of a file to send. File is mapped in memory with mmap [optional]
+    :param chunk_size: size of the chunks read from file objects [default=1048576]
+    :return: (body, headers) where headers contains Content-Length when size is known
+    """
+    headers = {}
+    if path is not None:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            headers["Content-Length"] = str(size)
+            if size == 0:
+                yield b"", headers
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            body = memoryview(mm)
+            try:
+                yield body, headers
+            finally:
+                body.release()
+                mm.close()
+        return
+
+    if data is None or isinstance(data, (str, bytes, bytearray, memoryview, dict)):
+        yield data, headers
+        return
+
+    if hasattr(data, "read"):
+        try:
+            size = os.fstat(data.fileno()).st_size - data.tell()
+            headers["Content-Length"] = str(size)
+        except Exception:
+            pass
+        yield iter(partial(data.read, chunk_size), b""), headers
+        return
+
+    # generators and other iterables
+    yield data, headers
+
+
+class OpenstackConnectionPool(object):
+    """Keep-alive http connection pool. Connections are grouped by (proto, host, port, proxy) and can be shared by
+    all the clients of the same manager.
+
+    :param maxsize: max number of idle connections kept for every (proto, host, port, proxy) [default=10]
+    :param idle_timeout: idle connections older than this number of seconds are closed [default=60]
+    """
+
+    def __init__(self, maxsize=10, idle_timeout=60):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+
+        self._lock = Lock()
+        # {key: [(conn, last_used), ..]}
+        self._idle = {}
+
+        # pool counters
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return "<OpenstackConnectionPool id=%s hits=%s misses=%s>" % (id(self), self.hits, self.misses)
+
+    @staticmethod
+    def key(proto, host, port, proxy=None):
+        if proxy is not None:
+            proxy = tuple(proxy)
+        return proto, host, port, proxy
+
+    @staticmethod
+    def new_connection(key, timeout):
+        """Open a new http connection
+
+        :param key: pool key. Use :meth:`key` to build it
+        :param timeout: connection timeout
+        """
+        proto, host, port, proxy = key
+        _host = host
+        _port = port
+        if proxy is not None:
+            _host = proxy[0]
+            _port = proxy[1]
+
+        if proto == "http":
+            conn = http_client.HTTPConnection(_host, _port, timeout=timeout)
+        else:
+            ssl._create_default_https_context = ssl._create_unverified_context
+            conn = http_client.HTTPSConnection(_host, _port, timeout=timeout)
+        return conn
+
+    def get(self, key, timeout):
+        """Get an idle connection or create a new one
+
+        :param key: pool key. Use :meth:`key` to build it
+        :param timeout: connection timeout
+        :return: (connection, reused). reused is True when connection was taken from the pool
+        """
+        conn = None
+        now = time()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while len(idle) > 0:
+                item, last_used = idle.pop()
+                if now - last_used > self.idle_timeout:
+                    self.evictions += 1
+                    item.close()
+                    continue
+                conn = item
+                break
+            if conn is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if conn is None:
+            return self.new_connection(key, timeout), False
+
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def put(self, key, conn):
+        """Release a connection to the pool. If the pool is full the connection is closed.
+
+        :param key: pool key
+        :param conn: http connection
+        """
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize:
+                idle.append((conn, time()))
+                return
+            self.evictions += 1
+        conn.close()
+
+    def count_reconnect(self):
+        with self._lock:
+            self.reconnects += 1
+
+    def clear(self):
+        """Close all the idle connections"""
+        with self._lock:
+            idle = self._idle
+            self._idle = {}
+        for conns in idle.values():
+            for conn, last_used in conns:
+                conn.close()
+
+    def stats(self):
+        """Get pool counters
+
+        :return: dict with hits, misses, reconnects, evictions and idle connections
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reconnects": self.reconnects,
+                "evictions": self.evictions,
+                "idle": sum([len(v) for v in self._idle.values()]),
+            }
+
+
+class OpenstackTokenCache(object):
+    """Keystone token cache. Tokens are stored with expire time and parsed catalog, keyed by identity uri, user,
+    project and domain. When path is set entries are saved in a file protected by a lock, so they can be shared by
+    different processes.
+
+    :param path: path of the cache file. If not set tokens are kept in memory [optional]
+    :param refresh_before: number of seconds before expires_at a token is considered expired and refreshed
+        [default=300]
+    """
+
+    def __init__(self, path=None, refresh_before=300):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.path = path
+        self.refresh_before = refresh_before
+
+        self._lock = Lock()
+        self._entries = {}
+
+    def __repr__(self):
+        return "<OpenstackTokenCache id=%s path=%s>" % (id(self), self.path)
+
+    @staticmethod
+    def key(uri, user, project, domain):
+        """Build cache key
+
+        :return: cache key
+        """
+        data = "%s|%s|%s|%s" % (uri, user, project, domain)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def expire_time(expires_at):
+        """Convert keystone expires_at in epoch time
+
+        :param expires_at: keystone expire time. Ex. 2024-03-26T10:00:00.000000Z
+        :return: epoch time
+        """
+        value = expires_at.replace("Z", "+00:00")
+        return datetime.fromisoformat(value).timestamp()
+
+    @contextmanager
+    def __file_lock(self):
+        with open("%s.lock" % self.path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def __read(self):
+        try:
+            with open(self.path) as f:
+                return json.loads(f.read())
+        except (IOError, ValueError):
+            return {}
+
+    def __write(self, entries):
+        tmp_path = "%s.%s.tmp" % (self.path, os.getpid())
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(entries))
+        os.replace(tmp_path, self.path)
+
+    def __valid(self, entry):
+        return entry is not None and self.expire_time(entry["expires_at"]) - self.refresh_before > time()
+
+    def get(self, key):
+        """Get a token not expiring within refresh_before seconds
+
+        :param key: cache key
+        :return: {'token':.., 'expires_at':.., 'catalog':..} or None
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if self.__valid(entry) is False and self.path is not None:
+                with self.__file_lock():
+                    entry = self.__read().get(key, None)
+                if entry is not None:
+                    self._entries[key] = entry
+        if self.__valid(entry) is False:
+            return None
+        self.logger.debug("Get token from cache. Token expires at %s" % entry["expires_at"])
+        return entry
+
+    def set(self, key, token, expires_at, catalog):
+        """Save a token
+
+        :param key: cache key
+        :param token: token
+        :param expires_at: token expire time
+        :param catalog: parsed service catalog
+        """
+        entry = {"token": token, "expires_at": expires_at, "catalog": catalog}
+        with self._lock:
+            self._entries[key] = entry
+            if self.path is not None:
+                with self.__file_lock():
+                    entries = self.__read()
+                    now = time()
+                    entries = {k: v for k, v in entries.items() if self.expire_time(v["expires_at"]) > now}
+                    entries[key] = entry
+                    self.__write(entries)
+
+    def delete(self, key):
+        """Remove a token
+
+        :param key: cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            if self.path is not None:
+                with self.__file_lock():
+                    entries = self.__read()
+                    if entries.pop(key, None) is not None:
+                        self.__write(entries)
+
+
+class OpenstackResponseCache(object):
+    """Http cache of GET responses used by :class:`OpenstackClient`. Responses with ETag or Last-Modified header are
+    revalidated with a conditional request and served from the cache when server returns 304. Responses without
+    validators are served from the cache until ttl expires. Entries are kept in a LRU bounded by number and by size
+    in bytes. Write requests invalidate the entries of the same resource path.
+
+    :param max_bytes: max size in bytes of the cached response bodies [default=67108864]
+    :param max_entries: max number of cached responses [default=10000]
+    :param ttl: number of seconds a response without validators is served from the cache. If 0 only responses with
+        validators are cached [default=60]
+    """
+
+    def __init__(self, max_bytes=67108864, max_entries=10000, ttl=60):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = Lock()
+        # {key: entry}. Last used entries are at the end
+        self._entries = OrderedDict()
+        self.size = 0
+
+        # cache counters
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __repr__(self):
+        return "<OpenstackResponseCache id=%s entries=%s size=%s>" % (id(self), len(self._entries), self.size)
+
+    @staticmethod
+    def key(proto, host, port, path, headers):
+        """Build cache key. Request headers are part of the key because responses depend on token and microversion.
+
+        :return: cache key
+        """
+        return proto, host, port, path, tuple(sorted(headers.items()))
+
+    @staticmethod
+    def prefix(base_path, path):
+        """Get the resource path invalidated by a write request. Ex. a write on /servers/<id>/action invalidates
+        all the cached entries under <base_path>/servers
+
+        :param base_path: client base path
+        :param path: request path relative to base path
+        :return: path prefix
+        """
+        items = []
+        for item in path.split("?")[0].split("/"):
+            if item == "":
+                continue
+            items.append(item)
+            if re.match(r"^v\d+(\.\d+)?$", item) is None:
+                break
+        return "%s/%s" % (base_path.rstrip("/"), "/".join(items))
+
+    def __remove(self, key):
+        entry = self._entries.pop(key)
+        self.size -= entry["size"]
+
+    def get(self, key):
+        """Get a cached response
+
+        :param key: cache key
+        :return: entry dict with status, headers, data, content_type, etag, last_modified, expire or None
+        """
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry["expire"] is not None and entry["expire"] < time():
+                self.__remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def hit(self, revalidated=False):
+        with self._lock:
+            self.hits += 1
+            if revalidated is True:
+                self.revalidations += 1
+
+    def set(self, key, status, headers, data, content_type):
+        """Cache a response
+
+        :param key: cache key
+        :param status: response status
+        :param headers: response headers
+        :param data: response body
+        :param content_type: response content type
+        """
+        idx = {k.lower(): v for k, v in headers}
+        if idx.get("cache-control", "").lower().find("no-store") >= 0:
+            return
+        etag = idx.get("etag", None)
+        last_modified = idx.get("last-modified", None)
+        expire = None
+        if etag is None and last_modified is None:
+            if self.ttl <= 0:
+                return
+            expire = time() + self.ttl
+
+        size = len(data) + sum([len(k) + len(v) for k, v in headers])
+        if size > self.max_bytes:
+            return
+        entry = {
+            "status": status,
+            "headers": headers,
+            "data": data,
+            "content_type": content_type,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expire": expire,
+            "size": size,
+        }
+        with self._lock:
+            if key in self._entries:
+                self.__remove(key)
+            self._entries[key] = entry
+            self.size += size
+            while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+                self.__remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, host, port, prefix):
+        """Remove the entries of a resource path
+
+        :param host: endpoint host
+        :param port: endpoint port
+        :param prefix: path prefix. Use :meth:`prefix` to build it
+        """
+        with self._lock:
+            keys = [
+                k
+                for k in self._entries.keys()
+                if k[1] == host and k[2] == port and (k[3] == prefix or k[3].startswith((prefix + "/", prefix + "?")))
+            ]
+            for key in keys:
+                self.__remove(key)
+            self.invalidations += len(keys)
+        if len(keys) > 0:
+            self.logger.debug("Invalidate %s cached responses of %s" % (len(keys), prefix))
+
+    def clear(self):
+        """Remove all the entries"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self.size = 0
+
+    def stats(self):
+        """Get cache counters
+
+        :return: dict with hits, misses, revalidations, evictions, invalidations, entries and size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "size": self.size,
+            }
+
+
+class OpenstackRetryPolicy(object):
+    """Retry policy of :class:`OpenstackClient`. Failed requests are sent again after an exponential backoff with
+    full jitter, or after the time set in the Retry-After header. Only idempotent methods are retried by default.
+    Retries are limited by a budget shared by all the clients of a manager: every request adds budget_ratio to the
+    budget and every retry spends 1, so retries can not amplify an outage.
+
+    :param max_retries: max number of retries of a request [default=3]
+    :param backoff: base backoff in seconds [default=0.5]
+    :param max_backoff: max backoff in seconds [default=30]
+    :param max_retry_after: max accepted Retry-After in seconds. Requests asking a longer wait are not retried
+        [default=60]
+    :param methods: retried request methods [default=["GET", "HEAD", "PUT", "DELETE"]]
+    :param statuses: retried response status [default=[429, 502, 503, 504]]
+    :param retry_transport_errors: if True retry timeouts and connections closed by server [default=True]
+    :param budget_ratio: budget added by every request [default=0.1]
+    :param budget_min: initial budget [default=10]
+    :param budget_max: max budget [default=100]
+    """
+
+    def __init__(
+        self,
+        max_retries=3,
+        backoff=0.5,
+        max_backoff=30,
+        max_retry_after=60,
+        methods=None,
+        statuses=None,
+        retry_transport_errors=True,
+        budget_ratio=0.1,
+        budget_min=10,
+        budget_max=100,
+    ):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        if methods is None:
+            methods = ["GET", "HEAD", "PUT", "DELETE"]
+        if statuses is None:
+            statuses = [429, 502, 503, 504]
+
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.methods = methods
+        self.statuses = statuses
+        self.retry_transport_errors = retry_transport_errors
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+
+        self._lock = Lock()
+        self.budget = budget_min
+
+        # policy counters
+        self.requests = 0
+        self.retries = 0
+        self.retries_by_reason = {}
+        self.budget_exhausted = 0
+        self.retries_exhausted = 0
+
+    def __repr__(self):
+        return "<OpenstackRetryPolicy id=%s retries=%s budget=%s>" % (id(self), self.retries, self.budget)
+
+    @staticmethod
+    def retry_after(headers):
+        """Get Retry-After header value in seconds
+
+        :param headers: response headers as list of (key, value)
+        :return: seconds to wait or None
+        """
+        if headers is None:
+            return None
+        value = {k.lower(): v for k, v in headers}.get("retry-after", None)
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+    def count_request(self):
+        """Add a new request to the budget"""
+        with self._lock:
+            self.requests += 1
+            self.budget = min(self.budget + self.budget_ratio, self.budget_max)
+
+    def next_delay(self, method, data, error, attempt):
+        """Get the time to wait before sending again a failed request
+
+        :param method: request method
+        :param data: request data
+        :param error: raised :class:`OpenstackError`
+        :param attempt: number of retries already made
+        :return: seconds to wait or None if request must not be retried
+        """
+        if method not in self.methods:
+            return None
+        # iterables are consumed by the first request and can not be sent again
+        if not (data is None or isinstance(data, (str, bytes, bytearray, memoryview, dict))):
+            return None
+
+        if isinstance(error, OpenstackTransportError):
+            if self.retry_transport_errors is False:
+                return None
+            reason = "transport"
+        elif error.code in self.statuses:
+            reason = error.code
+        else:
+            return None
+
+        delay = self.retry_after(error.headers)
+        if delay is not None and delay > self.max_retry_after:
+            return None
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+        with self._lock:
+            if attempt >= self.max_retries:
+                self.retries_exhausted += 1
+                return None
+            if self.budget < 1:
+                self.budget_exhausted += 1
+                self.logger.warning("Retry budget exhausted. Do not retry request")
+                return None
+            self.budget -= 1
+            self.retries += 1
+            self.retries_by_reason[reason] = self.retries_by_reason.get(reason, 0) + 1
+        return delay
+
+    def stats(self):
+        """Get policy counters
+
+        :return: dict with requests, retries, retries_by_reason, budget, budget_exhausted and retries_exhausted
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "retries_by_reason": dict(self.retries_by_reason),
+                "budget": self.budget,
+                "budget_exhausted": self.budget_exhausted,
+                "retries_exhausted": self.retries_exhausted,
+            }
+
+
+class OpenstackCompressionStats(object):
+    """Counters of compressed and decompressed response bytes grouped by endpoint"""
+
+    def __init__(self):
+        self._lock = Lock()
+        # {endpoint: {"responses": .., "compressed": .., "decompressed": ..}}
+        self._endpoints = {}
+
+    def __repr__(self):
+        return "<OpenstackCompressionStats id=%s>" % id(self)
+
+    def add(self, endpoint, compressed, decompressed):
+        """Add a compressed response
+
+        :param endpoint: endpoint uri
+        :param compressed: bytes received
+        :param decompressed: bytes after decompression
+        """
+        with self._lock:
+            item = self._endpoints.setdefault(endpoint, {"responses": 0, "compressed": 0, "decompressed": 0})
+            item["responses"] += 1
+            item["compressed"] += compressed
+            item["decompressed"] += decompressed
+
+    def stats(self):
+        """Get counters
+
+        :return: dict like {endpoint: {"responses": .., "compressed": .., "decompressed": .., "ratio": ..}}
+        """
+        with self._lock:
+            res = {}
+            for endpoint, item in self._endpoints.items():
+                res[endpoint] = dict(item)
+                res[endpoint]["ratio"] = round(item["decompressed"] / max(item["compressed"], 1), 2)
+            return res
+
+
+class OpenstackStreamResponse(object):
+    """Streamed http response body. Data are read in fixed-size chunks into a reused buffer and digests are computed
+    while reading. The connection is released when the body is fully read or the stream is closed.
+
+    :param response: http response
+    :param release: function called with True when the body was fully read, with False otherwise
+    :param chunk_size: size of the chunks [default=1048576]
+    :param hash_algorithms: list of hashlib algorithms computed while reading [default=["md5"]]
     """
+
+    def __init__(self, response, release, chunk_size=1048576, hash_algorithms=None):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.response = response
+        self.status = response.status
+        self.headers = {k.lower(): v for k, v in response.getheaders()}
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+        if hash_algorithms is None:
+            hash_algorithms = ["md5"]
+        self.hashes = {algo: hashlib.new(algo) for algo in hash_algorithms}
+        # {algorithm: expected digest}
+        self.expected = {}
+
+        self._release = release
+        self._buffer = bytearray(chunk_size)
+        self._closed = False
+
+    def __repr__(self):
+        return "<OpenstackStreamResponse id=%s status=%s>" % (id(self), self.status)
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def expect(self, algorithm, digest):
+        """Set digest to verify when body is fully read
+
+        :param algorithm: hashlib algorithm. Ex. md5, sha256, sha512
+        :param digest: expected hex digest
+        """
+        if algorithm not in self.hashes:
+            self.hashes[algorithm] = hashlib.new(algorithm)
+        self.expected[algorithm] = digest
+
+    def digests(self):
+        """Get hex digests of the data read
+
+        :return: {algorithm: hex digest}
+        """
+        return {algo: h.hexdigest() for algo, h in self.hashes.items()}
+
+    def _readinto(self):
+        try:
+            size = self.response.readinto(self._buffer)
+        except SocketTimeout:
+            self.close()
+            raise OpenstackError("timeout reading response body", 400)
+        except Exception as ex:
+            self.close()
+            raise OpenstackError(str(ex), 400)
+
+        if size == 0:
+            self._finish()
+            return None
+
+        data = memoryview(self._buffer)[:size]
+        for h in self.hashes.values():
+            h.update(data)
+        self.bytes_read += size
+        return data
+
+    def _finish(self):
+        self.close()
+        for algo, digest in self.expected.items():
+            if digest is None:
+                continue
+            value = self.hashes[algo].hexdigest()
+            if value != digest.strip('"').lower():
+                raise OpenstackError("%s checksum mismatch: expected %s, got %s" % (algo, digest, value), 400)
+        self.logger.debug("Read %s bytes from stream - digests: %s" % (self.bytes_read, self.digests()))
+
+    def iter_chunks(self):
+        """Iterate over body chunks
+
+        :return: generator of bytes
+        :raise OpenstackError: if read fails or checksum does not match
+        """
+        while self._closed is False:
+            data = self._readinto()
+            if data is None:
+                break
+            yield bytes(data)
+
+    def write_to(self, dest):
+        """Write body to a file
+
+        :param dest: file path or file-like object opened in binary mode
+        :return: number of bytes written
+        :raise OpenstackError: if read fails or checksum does not match
+        """
+        if isinstance(dest, str):
+            with open(dest, "wb") as f:
+                return self.write_to(f)
+
+        while self._closed is False:
+            data = self._readinto()
+            if data is None:
+                break
+            dest.write(data)
+        return self.bytes_read
+
+    def close(self):
+        """Release the connection. If the body was not fully read the connection is closed"""
+        if self._closed is False:
+            self._closed = True
+            self._release(self.response.isclosed())
+
+
+# microversion headers by client. Every thread and asyncio task has its own value
+_microversions = ContextVar("openstack_microversions", default={})
+
+
+class OpenstackClient(object):
+    """Openstack http client. A client can be shared by many threads: the microversion attribute is context-local
+    and every thread or asyncio task sees only its own value. Microversion headers can be also passed to every call.
+
     :param uri: Ex. http://0.0.0.0:5000/v3
     :param proxy: proxy server. Ex. ('proxy.it', 3128) [default=None]
+    :param timeout: request timeout [default=30]
+    :param pool: instance of :class:`OpenstackConnectionPool` used to reuse keep-alive connections. If not set a new
+        connection is opened for every request [optional]
+    :param cache: instance of :class:`OpenstackResponseCache` used to cache GET responses [optional]
+    :param retry_policy: instance of :class:`OpenstackRetryPolicy` used to retry failed requests [optional]
+    :param compression: if True ask gzip or deflate compressed responses [default=False]
+    :param compression_stats: instance of :class:`OpenstackCompressionStats` where compressed bytes are counted
+        [optional]
     """
 
-    def __init__(self, uri, proxy=None, timeout=30):
+    # requests sent again on a new connection when a pooled connection was closed by the remote end. A closed
+    # connection does not tell if server has already processed a request, so POST and PATCH are never sent again
+    replay_methods = ["GET", "HEAD", "PUT", "DELETE", "OPTIONS"]
+
+    def __init__(
+        self,
+        uri,
+        proxy=None,
+        timeout=30,
+        pool=None,
+        cache=None,
+        retry_policy=None,
+        compression=False,
+        compression_stats=None,
+    ):
         self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
 
         if uri is not None:
@@ -64,8 +913,52 @@ class OpenstackClient(object):
 
         self.proxy = proxy
         self.timeout = timeout
+        self.pool = pool
+        self.cache = cache
+        self.retry_policy = retry_policy
+        self.compression = compression
+        self.compression_stats = compression_stats
+
+    @property
+    def microversion(self):
+        """Microversion headers sent with every request of the current thread or asyncio task"""
+        return _microversions.get().get(self, None)
+
+    @microversion.setter
+    def microversion(self, microversion):
+        microversions = dict(_microversions.get())
+        if microversion is None:
+            microversions.pop(self, None)
+        else:
+            microversions[self] = microversion
+        _microversions.set(microversions)
+
+    def _get_connection(self, timeout, headers=None):
+        """Get http connection from pool or open a new one
+
+        :return: (connection, pool key, reused)
+        """
+        key = OpenstackConnectionPool.key(self.proto, self.host, self.port, self.proxy)
+        if self.pool is not None:
+            conn, reused = self.pool.get(key, timeout)
+        else:
+            conn, reused = OpenstackConnectionPool.new_connection(key, timeout), False
+
+        if self.proxy is not None and reused is False:
+            conn.set_tunnel(self.host, port=self.port, headers=headers)
+            self.logger.debug("set proxy %s" % self.proxy)
+        return conn, key, reused
+
+    def _release_connection(self, conn, key, response):
+        """Return http connection to the pool or close it"""
+        if self.pool is not None and response is not None and not response.will_close:
+            self.pool.put(key, conn)
+        else:
+            conn.close()
 
-        self.microversion = None
+    def _close_connection(self, conn):
+        if conn is not None:
+            conn.close()
 
     def call(
         self,
@@ -78,11 +971,17 @@ class OpenstackClient(object):
         base_path=None,
         resolve_conflicts=None,
         content_type="application/json",
+        stream=False,
+        chunk_size=1048576,
+        hash_algorithms=None,
+        microversion=None,
     ):
         """Http client. Usage:
 
         res = http_client2('https', '/api', 'POST', port=443, data='', headers={})
 
+        When a retry policy is set failed requests are sent again as configured by :class:`OpenstackRetryPolicy`.
+
         :param path: Request path. Ex. /api/
         :param method: Request method. Ex. GET, POST, PUT, DELETE
         :param headers: Request headers. [default={}]. Ex.
@@ -98,28 +997,107 @@ class OpenstackClient(object):
                 ...
                 return res, res_headers, response.status
         :param content_type: request content type [default=application/json]
+        :param stream: if True and request succeeds the response body is not read and an instance of
+            :class:`OpenstackStreamResponse` is returned in place of the data [default=False]
+        :param chunk_size: size of the chunks read from a streamed response [default=1048576]
+        :param hash_algorithms: hash algorithms computed on a streamed response [default=["md5"]]
+        :param microversion: api microversion headers used only by this request. They replace microversion set on
+            the client. Ex. {"X-Openstack-Nova-Api-Version": "2.60"} [optional]
         :raise OpenstackError:
+        :raise OpenstackTransportError: If request can not be sent or response can not be read
         :raise OpenstackNotFound: If request return 404
         """
+        if self.retry_policy is not None:
+            self.retry_policy.count_request()
+
+        attempt = 0
+        while True:
+            try:
+                return self._call(
+                    path,
+                    method,
+                    data=data,
+                    headers=headers,
+                    timeout=timeout,
+                    token=token,
+                    base_path=base_path,
+                    resolve_conflicts=resolve_conflicts,
+                    content_type=content_type,
+                    stream=stream,
+                    chunk_size=chunk_size,
+                    hash_algorithms=hash_algorithms,
+                    microversion=microversion,
+                )
+            except OpenstackError as ex:
+                delay = None
+                if self.retry_policy is not None:
+                    delay = self.retry_policy.next_delay(method, data, ex, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.logger.warning(
+                    "Retry %s request to %s in %.2fs [attempt=%s]: %s" % (method, path, delay, attempt, ex)
+                )
+                sleep(delay)
+
+    def _call(
+        self,
+        path,
+        method,
+        data="",
+        headers=None,
+        timeout=None,
+        token=None,
+        base_path=None,
+        resolve_conflicts=None,
+        content_type="application/json",
+        stream=False,
+        chunk_size=1048576,
+        hash_algorithms=None,
+        microversion=None,
+    ):
+        """Send request once. See :meth:`call`"""
         start = time()
 
         # set timeout
         if timeout is None:
             timeout = self.timeout
 
-        if base_path is not None:
-            path = base_path + path
-        else:
-            path = self.path + path
+        if base_path is None:
+            base_path = self.path
+        cache_prefix = None
+        if self.cache is not None and method in ["POST", "PUT", "PATCH", "DELETE"]:
+            cache_prefix = self.cache.prefix(base_path, path)
+        path = base_path + path
 
         http_headers = {"Content-Type": content_type}
         if token is not None:
             http_headers["X-Auth-Token"] = token
-        if self.microversion is not None:
-            http_headers.update(self.microversion)
+        if microversion is None:
+            microversion = self.microversion
+        if microversion is not None:
+            http_headers.update(microversion)
+        if self.compression is True and stream is False:
+            http_headers["Accept-Encoding"] = "gzip, deflate"
         if headers is not None:
             http_headers.update(headers)
 
+        # get cached response. Entries with validators are revalidated with a conditional request
+        cache_key = None
+        cache_entry = None
+        if self.cache is not None and method == "GET" and stream is False:
+            cache_key = self.cache.key(self.proto, self.host, self.port, path, http_headers)
+            cache_entry = self.cache.get(cache_key)
+            if cache_entry is not None:
+                if cache_entry["expire"] is not None:
+                    self.cache.hit()
+                    self.logger.debug("Get response of %s from cache" % path)
+                    return self.__load_cached(path, cache_entry, resolve_conflicts)
+                if cache_entry["etag"] is not None:
+                    http_headers["If-None-Match"] = cache_entry["etag"]
+                if cache_entry["last_modified"] is not None:
+                    http_headers["If-Modified-Since"] = cache_entry["last_modified"]
+
         self.logger.info(
             "Send http %s api request to %s://%s:%s%s with token %s"
             % (method, self.proto, self.host, self.port, path, token)
@@ -134,45 +1112,83 @@ class OpenstackClient(object):
             else:
                 self.logger.debug("Send [headers=%s] [data=%s]" % (http_headers, "xxxxxxx"))
 
+        conn = None
         try:
-            _host = self.host
-            _port = self.port
             _headers = http_headers
             if self.proxy is not None:
-                _host = self.proxy[0]
-                _port = self.proxy[1]
                 _headers = {}
                 path = "%s://%s:%s%s" % (self.proto, self.host, self.port, path)
 
-            if self.proto == "http":
-                conn = http_client.HTTPConnection(_host, _port, timeout=timeout)
-            else:
-                ssl._create_default_https_context = ssl._create_unverified_context
-                conn = http_client.HTTPSConnection(_host, _port, timeout=timeout)
+            # iterables are sent with chunked transfer encoding and can not be sent again
+            encode_chunked = _headers.get("Transfer-Encoding", "").lower() == "chunked"
+            replayable = data is None or isinstance(data, (str, bytes, bytearray, memoryview))
+            replayable = replayable and method.upper() in self.replay_methods
 
-            if self.proxy is not None:
-                conn.set_tunnel(self.host, port=self.port, headers=headers)
-                self.logger.debug("set proxy %s" % self.proxy)
-                headers = None
-
-            conn.request(method, path, data, _headers)
-            response = conn.getresponse()
+            conn, pool_key, reused = self._get_connection(timeout, headers=headers)
+            try:
+                conn.request(method, path, data, _headers, encode_chunked=encode_chunked)
+                response = conn.getresponse()
+            except (http_client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused is False or replayable is False:
+                    raise
+                # keep-alive connection was closed by server. Reconnect and send again the request
+                self.logger.warning("Pooled connection closed by remote end. Reconnect")
+                self.pool.count_reconnect()
+                conn = OpenstackConnectionPool.new_connection(pool_key, timeout)
+                if self.proxy is not None:
+                    conn.set_tunnel(self.host, port=self.port, headers=headers)
+                conn.request(method, path, data, _headers, encode_chunked=encode_chunked)
+                response = conn.getresponse()
             content_type = response.getheader("content-type")
             self.logger.info("Response status: %s %s" % (response.status, response.reason))
         except SocketTimeout as ex:
             self.logger.error("timeout")
-            raise OpenstackError("timeout after %ss" % timeout, 400)
+            self._close_connection(conn)
+            raise OpenstackTransportError("timeout after %ss" % timeout)
         except http_client.RemoteDisconnected:
             self.logger.error("Remote end closed connection without response")
-            raise OpenstackError("Remote end closed connection without response", 400)
+            self._close_connection(conn)
+            raise OpenstackTransportError("Remote end closed connection without response")
         except Exception as ex:
             self.logger.error(str(ex))
-            raise OpenstackError(str(ex), 400)
+            self._close_connection(conn)
+            raise OpenstackTransportError(str(ex))
+
+        # return streamed response
+        if stream is True and 200 <= response.status < 300:
+
+            def release(consumed):
+                if consumed is True:
+                    self._release_connection(conn, pool_key, response)
+                else:
+                    conn.close()
+                self.logger.info("Response elapsed: %s" % (time() - start))
+
+            res = OpenstackStreamResponse(response, release, chunk_size=chunk_size, hash_algorithms=hash_algorithms)
+            self.logger.debug(
+                "Response [content-type=%s] [headers=%s] [stream]" % (content_type, truncate(res.headers))
+            )
+            return res, response.getheaders(), response.status
 
         # read response
         try:
-            res = response.read()
+            encoding = (response.getheader("content-encoding") or "").lower()
+            if encoding in ["gzip", "deflate"]:
+                res = self.__read_compressed(response, encoding, chunk_size)
+            else:
+                res = response.read()
             res_headers = response.getheaders()
+            status = response.status
+            if cache_prefix is not None:
+                self.cache.invalidate(self.host, self.port, cache_prefix)
+            if cache_entry is not None and status == 304:
+                self.cache.hit(revalidated=True)
+                self.logger.debug("Response of %s not modified. Get it from cache" % path)
+                self._release_connection(conn, pool_key, response)
+                return self.__load_cached(path, cache_entry, resolve_conflicts)
+            if cache_key is not None and status == 200:
+                self.cache.set(cache_key, status, res_headers, res, content_type)
             if content_type == "application/octet-stream":
                 self.logger.debug("Response [content-type=%s] [headers=%s]" % (content_type, truncate(res_headers)))
             else:
@@ -187,16 +1203,73 @@ class OpenstackClient(object):
                     res = json.loads(res)
                 except Exception as ex:
                     self.logger.warning(ex)
-            conn.close()
+            self._release_connection(conn, pool_key, response)
             elapsed = time() - start
             self.logger.info("Response elapsed: %s" % elapsed)
         except Exception as ex:
             self.logger.error(ex)
-            raise OpenstackError(ex.message, 400)
+            conn.close()
+            raise OpenstackTransportError(str(ex))
 
+        try:
+            return self._check_response(path, status, res, res_headers, content_type, resolve_conflicts)
+        except OpenstackError as ex:
+            ex.headers = res_headers
+            raise
+
+    def __read_compressed(self, response, encoding, chunk_size):
+        """Read and decompress response body chunk by chunk"""
+        compressed = 0
+        chunks = []
+        decompressor = None
+        while True:
+            chunk = response.read(chunk_size)
+            if not chunk:
+                break
+            if decompressor is None:
+                # deflate can be sent with zlib header or as raw stream
+                wbits = zlib.MAX_WBITS | 32
+                if encoding == "deflate" and (len(chunk) < 2 or (chunk[0] << 8 | chunk[1]) % 31 != 0):
+                    wbits = -zlib.MAX_WBITS
+                decompressor = zlib.decompressobj(wbits)
+            compressed += len(chunk)
+            chunks.append(decompressor.decompress(chunk))
+        if decompressor is not None:
+            chunks.append(decompressor.flush())
+        res = b"".join(chunks)
+
+        endpoint = "%s://%s:%s%s" % (self.proto, self.host, self.port, self.path)
+        self.logger.debug("Response %s decompressed from %s to %s bytes" % (encoding, compressed, len(res)))
+        if self.compression_stats is not None:
+            self.compression_stats.add(endpoint, compressed, len(res))
+        return res
+
+    def __load_cached(self, path, entry, resolve_conflicts):
+        res = entry["data"]
+        content_type = entry["content_type"]
+        if content_type is not None and content_type.find("application/json") >= 0:
+            try:
+                res = json.loads(res)
+            except Exception as ex:
+                self.logger.warning(ex)
+        return self._check_response(path, entry["status"], res, entry["headers"], content_type, resolve_conflicts)
+
+    def _check_response(self, path, status, res, res_headers, content_type, resolve_conflicts=None):
+        """Map response status to returned data or to :class:`.OpenstackError`
+
+        :param path: request path
+        :param status: response status
+        :param res: response data
+        :param res_headers: response headers
+        :param content_type: response content type
+        :param resolve_conflicts: function called when 409 error is returned [optional]
+        :return: res, res_headers, status
+        :raise OpenstackError:
+        :raise OpenstackNotFound: If request return 404
+        """
         # get error messages
-        # self.logger.debug("+++++ AAA - response.status: %s" % response.status)
-        if response.status in [400, 401, 403, 404, 405, 408, 409, 413, 415, 500, 503]:
+        # self.logger.debug("+++++ AAA - response.status: %s" % status)
+        if status in [400, 401, 403, 404, 405, 408, 409, 413, 415, 429, 500, 502, 503, 504]:
             try:
                 self.logger.debug("+++++ AAA - type str: %s" % type(res))
                 if isinstance(res, bytes):
@@ -231,8 +1304,6 @@ class OpenstackClient(object):
             self.logger.error("Response [content-type=%s] [data=%s]" % (content_type, truncate(res)))
 
         # evaluate response status
-        status = response.status
-
         # BAD_REQUEST     400     HTTP/1.1, RFC 2616, Section 10.4.1
         if status == 400:
             raise OpenstackError(f"Bad Request {res}", 400)
@@ -281,14 +1352,26 @@ class OpenstackClient(object):
         elif status == 415:
             raise OpenstackError("Unsupported Media Type%s" % res, 415)
 
+        # Too Many Requests                429
+        elif status == 429:
+            raise OpenstackError("Too Many Requests%s" % res, 429)
+
         # INTERNAL SERVER ERROR  500
         elif status == 500:
             raise OpenstackError("Server error%s" % res, 500)
 
+        # Bad Gateway  502
+        elif status == 502:
+            raise OpenstackError("Bad Gateway%s" % res, 502)
+
         # Service Unavailable  503
         elif status == 503:
             raise OpenstackError("Service Unavailable%s" % res, 503)
 
+        # Gateway Timeout  504
+        elif status == 504:
+            raise OpenstackError("Gateway Timeout%s" % res, 504)
+
         # OK                     200    HTTP/1.1, RFC 2616, Section 10.2.1
         # CREATED                201    HTTP/1.1, RFC 2616, Section 10.2.2
         # ACCEPTED               202    HTTP/1.1, RFC 2616, Section 10.2.3
@@ -311,28 +1394,52 @@ class OpenstackObject(object):
 
     def setup(self):
         self.uri = "http://localhost"
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
+
+    @staticmethod
+    def nova_microversion(version):
+        """Get nova api microversion headers. Use them with the microversion param of :meth:`OpenstackClient.call`
+
+        :param version: microversion
+        """
+        return {"X-Openstack-Nova-Api-Version": version}
+
+    @staticmethod
+    def cinder_microversion(version):
+        """Get cinder api microversion headers. Use them with the microversion param of :meth:`OpenstackClient.call`
+
+        :param version: microversion
+        """
+        return {"OpenStack-API-Version": "volume %s" % version}
+
+    @staticmethod
+    def manila_microversion(version):
+        """Get manila api microversion headers. Use them with the microversion param of :meth:`OpenstackClient.call`
+
+        :param version: microversion
+        """
+        return {"X-OpenStack-Manila-API-Version": version}
 
     def set_nova_microversion(self, version):
-        """Set nova api microversion
+        """Set nova api microversion of the current thread or asyncio task
 
         :param version: microversion to set
         """
-        self.client.microversion = {"X-Openstack-Nova-Api-Version": version}
+        self.client.microversion = self.nova_microversion(version)
 
     def set_cinder_microversion(self, version):
-        """Set cinder api microversion
+        """Set cinder api microversion of the current thread or asyncio task
 
         :param version: microversion to set
         """
-        self.client.microversion = {"OpenStack-API-Version": "volume %s" % version}
+        self.client.microversion = self.cinder_microversion(version)
 
     def set_manila_microversion(self, version):
-        """Set manila api microversion
+        """Set manila api microversion of the current thread or asyncio task
 
         :param version: microversion to set
         """
-        self.client.microversion = {"X-OpenStack-Manila-API-Version": version}
+        self.client.microversion = self.manila_microversion(version)
 
     def is_token_valid(self):
         """Check if token expired"""
@@ -345,9 +1452,33 @@ class OpenstackManager(object):
     :param uri: connection uri
     :param proxy: http proxy [optional]
     :param default_region: default region [optional]
+    :param timeout: request timeout [default=30]
+    :param pool_size: max number of idle keep-alive connections kept for every endpoint [default=10]
+    :param pool_idle_timeout: idle keep-alive connections older than this number of seconds are closed [default=60]
+    :param token_cache: instance of :class:`OpenstackTokenCache` used by authorize to reuse tokens [optional]
+    :param token_refresh: if True and token_cache is set the token is renewed in background before it expires
+        [default=True]
+    :param response_cache: instance of :class:`OpenstackResponseCache` shared by all the clients to cache GET
+        responses [optional]
+    :param retry_policy: instance of :class:`OpenstackRetryPolicy` shared by all the clients to retry failed
+        requests. Retry budget is shared too [optional]
+    :param compression: if True all the clients ask gzip or deflate compressed responses [default=False]
     """
 
-    def __init__(self, uri=None, proxy=None, default_region=None, timeout=30):
+    def __init__(
+        self,
+        uri=None,
+        proxy=None,
+        default_region=None,
+        timeout=30,
+        pool_size=10,
+        pool_idle_timeout=60,
+        token_cache=None,
+        token_refresh=True,
+        response_cache=None,
+        retry_policy=None,
+        compression=False,
+    ):
         self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
 
         # identity service uri
@@ -360,6 +1491,24 @@ class OpenstackManager(object):
         # connection timeout
         self.timeout = timeout
 
+        # keep-alive connection pool shared by all the clients
+        self.connection_pool = OpenstackConnectionPool(maxsize=pool_size, idle_timeout=pool_idle_timeout)
+
+        # token cache
+        self.token_cache = token_cache
+        self.token_refresh = token_refresh
+        self._token_timer = None
+
+        # GET response cache
+        self.response_cache = response_cache
+
+        # retry policy
+        self.retry_policy = retry_policy
+
+        # response compression
+        self.compression = compression
+        self.compression_stats = OpenstackCompressionStats()
+
         # openstack proxy objects
         self.identity = OpenstackIdentity(self)
         self.system = None
@@ -379,10 +1528,15 @@ class OpenstackManager(object):
         self.gnocchi = None
         self.masakari = None
         self.aggregate = None
+        self.inventory = None
 
         # openstack services endpoint
         self.endpoints = None
 
+        # cache of resolved endpoints and clients. It is cleared when region or catalog change
+        self._endpoint_cache = {}
+        self._client_cache = {}
+
         self.__after_init()
 
     def __repr__(self):
@@ -409,6 +1563,7 @@ class OpenstackManager(object):
         from beedrones.openstack.image import OpenstackImage
         from beedrones.openstack.network import OpenstackNetwork
         from beedrones.openstack.aggragate import OpenstackAggregate
+        from beedrones.openstack.inventory import OpenstackInventory
 
         # initialize proxy objects
         self.system = OpenstackSystem(self)
@@ -430,9 +1585,16 @@ class OpenstackManager(object):
         self.gnocchi = OpenstackGnocchi(self)
         self.aggregate = OpenstackAggregate(self)
         self.masakari = OpenstackMasakari(self)
+        self.inventory = OpenstackInventory(self)
 
     def set_region(self, region):
         self.region = region
+        self.reset_clients()
+
+    def reset_clients(self):
+        """Clear cached endpoints and clients. Use when catalog or region change"""
+        self._endpoint_cache = {}
+        self._client_cache = {}
 
     def authorize(
         self,
@@ -463,19 +1625,29 @@ class OpenstackManager(object):
         if pwd is not None:
             pwd = check_vault(pwd, key)
 
+        self.__cancel_token_refresh()
+
         # set token
         if token is not None:
             self.identity.set_token(token)
             self.identity.set_catalog(catalog)
+        elif self.token_cache is not None:
+            cache_key = self.token_cache.key(self.uri, user, project_id or project, domain)
+
+            def get_token():
+                self.__get_token(user, pwd, project, domain, version, project_id)
+                self.token_cache.set(cache_key, self.identity.token, self.identity.token_expire, self.identity.catalog)
+
+            # get token from cache
+            entry = self.token_cache.get(cache_key)
+            if entry is not None:
+                self.identity.set_token(entry)
+                self.identity.set_catalog(entry["catalog"])
+            else:
+                get_token()
+            self.__schedule_token_refresh(cache_key, get_token)
         else:
-            # get token from identity service
-            self.logger.debug(
-                "+++++ Get token for user: %s, project: %s, domain: %s, version: %s" % (user, project, domain, version)
-            )
-            if version == "v3":
-                self.identity.get_token(user, pwd, project, domain, project_id=project_id)
-            elif version == "v2":
-                self.identity.get_token_v2(user, pwd, project)
+            self.__get_token(user, pwd, project, domain, version, project_id)
 
         # self.system = None
         # self.keypair = None
@@ -492,6 +1664,48 @@ class OpenstackManager(object):
         # self.glance = None
         # self.gnocchi = None
 
+    def __get_token(self, user, pwd, project, domain, version, project_id):
+        # get token from identity service
+        self.logger.debug(
+            "+++++ Get token for user: %s, project: %s, domain: %s, version: %s" % (user, project, domain, version)
+        )
+        if version == "v3":
+            self.identity.get_token(user, pwd, project, domain, project_id=project_id)
+        elif version == "v2":
+            self.identity.get_token_v2(user, pwd, project)
+
+    def __cancel_token_refresh(self):
+        if self._token_timer is not None:
+            self._token_timer.cancel()
+            self._token_timer = None
+
+    def __schedule_token_refresh(self, cache_key, get_token):
+        """Renew token in background refresh_before seconds before it expires. A token renewed meanwhile by another
+        process and saved in the cache is used in place of a new one.
+        """
+        if self.token_refresh is False:
+            return
+
+        def refresh():
+            try:
+                entry = self.token_cache.get(cache_key)
+                if entry is not None and entry["token"] != self.identity.token:
+                    self.identity.set_token(entry)
+                    self.identity.set_catalog(entry["catalog"])
+                else:
+                    get_token()
+                self.logger.debug("Refresh token. New token expires at %s" % self.identity.token_expire)
+            except Exception as ex:
+                self.logger.error("Token refresh failed: %s" % ex, exc_info=True)
+                return
+            self.__schedule_token_refresh(cache_key, get_token)
+
+        expire = self.token_cache.expire_time(self.identity.token_expire)
+        delay = max(expire - self.token_cache.refresh_before - time(), 0)
+        self._token_timer = Timer(delay, refresh)
+        self._token_timer.daemon = True
+        self._token_timer.start()
+
     def ping(self):
         """Ping openstack
 
@@ -514,6 +1728,11 @@ class OpenstackManager(object):
         :param interface: openstack inerface. Ex. admin, internal, public [default=public]
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
+        key = (service, self.region, interface)
+        uri = self._endpoint_cache.get(key, None)
+        if uri is not None:
+            return uri
+
         # get service endpoints
         endpoints = self.identity.catalog.get(service, {}).get("endpoints", [])
         for endpoint in endpoints:
@@ -522,12 +1741,68 @@ class OpenstackManager(object):
                 uri_parsed = urlparse(uri)
                 if service == "keystone" and uri_parsed.path.find("/v3") == -1:
                     uri += "/v3"
+                self._endpoint_cache[key] = uri
                 return uri
         raise OpenstackError("Service %s endpoint was not found" % service)
 
+    def get_client(self, uri):
+        """Get the client for a service endpoint. Clients are created once and reused until catalog or region change.
+        The returned client has no microversion set in the current thread or asyncio task, like a new one.
+
+        :param uri: service endpoint uri. Use :meth:`endpoint` to get it
+        :return: instance of :class:`OpenstackClient`
+        """
+        client = self._client_cache.get(uri, None)
+        if client is None:
+            client = OpenstackClient(
+                uri,
+                self.proxy,
+                timeout=self.timeout,
+                pool=self.connection_pool,
+                cache=self.response_cache,
+                retry_policy=self.retry_policy,
+                compression=self.compression,
+                compression_stats=self.compression_stats,
+            )
+            self._client_cache[uri] = client
+        client.microversion = None
+        return client
+
     def get_token(self):
         return self.identity.get_active_token()
 
+    def get_pool_stats(self):
+        """Get keep-alive connection pool counters
+
+        :return: dict with hits, misses, reconnects, evictions and idle connections
+        """
+        return self.connection_pool.stats()
+
+    def get_cache_stats(self):
+        """Get GET response cache counters
+
+        :return: dict with cache counters or None if cache is not enabled
+        """
+        if self.response_cache is None:
+            return None
+        return self.response_cache.stats()
+
+    def get_retry_stats(self):
+        """Get retry policy counters
+
+        :return: dict with retry counters or None if retry policy is not set
+        """
+        if self.retry_policy is None:
+            return None
+        return self.retry_policy.stats()
+
+    def get_compression_stats(self):
+        """Get compressed and decompressed response bytes per endpoint
+
+        :return: dict like {endpoint: {"responses": .., "compressed": .., "decompressed": .., "ratio": ..}}
+        """
+        return self.compression_stats.stats()
+
     def get_catalog(self):
         return self.identity.catalog
 
@@ -542,7 +1817,7 @@ class OpenstackIdentity(object):
         self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
 
         self.manager = manager
-        self.client = OpenstackClient(manager.uri, manager.proxy, timeout=manager.timeout)
+        self.client = OpenstackClient(manager.uri, manager.proxy, timeout=manager.timeout, pool=manager.connection_pool)
 
         self.token = None
         self.token_expire = None
@@ -671,6 +1946,7 @@ class OpenstackIdentity(object):
     def set_catalog(self, catalog):
         """Set catalog"""
         self.catalog = catalog
+        self.manager.reset_clients()
 
     def _parse_catalog(self, catalog):
         """ """
@@ -689,6 +1965,7 @@ class OpenstackIdentity(object):
                     url = endpoint["url"].split("//")
                     url2 = url[1].split(":")
                     endpoint["url"] = "%s//%s:%s" % (url[0], self.client.host, url2[1])
+        self.manager.reset_clients()
         self.logger.debug("Parse openstack service catalog: %s" % truncate(self.catalog))
 
     def _parse_catalog_v2(self, catalog):
@@ -727,6 +2004,7 @@ class OpenstackIdentity(object):
             }
             self.catalog[item["name"]]["endpoints"].append(data)
 
+        self.manager.reset_clients()
         self.logger.debug("Parse openstack service catalog: %s" % truncate(self.catalog))
 
     def validate_token(self, token):
@@ -903,7 +2181,7 @@ class OpenstackIdentityRole(OpenstackObject):
 
     def setup(self):
         self.uri = self.manager.endpoint("keystone")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, detail=False, name=None):
@@ -1008,7 +2286,7 @@ class OpenstackIdentityUser(OpenstackObject):
 
     def setup(self):
         self.uri = self.manager.endpoint("keystone")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, detail=False, name=None, domain=None):
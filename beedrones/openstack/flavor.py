@@ -15,7 +15,7 @@ class OpenstackFlavorObject(OpenstackObject):
         self.uri = self.manager.endpoint("nova")
         # change version from 2 to 2.1
         # self.uri = self.uri.replace('v2/', 'v2.1/')
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackFlavor(OpenstackFlavorObject):
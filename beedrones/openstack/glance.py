@@ -9,7 +9,7 @@ from beedrones.openstack.client import OpenstackClient, OpenstackObject, setup_c
 class OpenstackGlanceObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("glance")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackGlance(OpenstackGlanceObject):
@@ -2,14 +2,87 @@
 #
 # (C) Copyright 2018-2024 CSI-Piemonte
 
-from beecell.simple import truncate
-from beedrones.openstack.client import OpenstackClient, OpenstackObject, setup_client
+from beecell.simple import jsonDumps, truncate
+from six.moves.urllib.parse import quote, urlencode
+from beedrones.openstack.client import OpenstackClient, OpenstackObject, concurrent_map, setup_client
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def measures_to_columns(points, as_array=True):
+    """Convert gnocchi measures from a list of [timestamp, granularity, value] to columns. When numpy is installed
+    and as_array is True columns are numpy arrays: timestamps as datetime64[ns] in UTC, granularity and values as
+    float64. Otherwise columns are lists and timestamps are strings as returned by gnocchi.
+
+    :param points: list of [timestamp, granularity, value]
+    :param as_array: if True return numpy arrays when numpy is installed [default=True]
+    :return: dict like {'timestamps': .., 'granularity': .., 'values': ..}
+    """
+    if len(points) > 0:
+        timestamps, granularity, values = zip(*points)
+    else:
+        timestamps, granularity, values = (), (), ()
+
+    if as_array is False or numpy is None:
+        return {"timestamps": list(timestamps), "granularity": list(granularity), "values": list(values)}
+
+    # gnocchi returns utc timestamps. numpy parses naive timestamps only
+    timestamps = [item[:-6] if item.endswith("+00:00") else item for item in timestamps]
+    return {
+        "timestamps": numpy.array(timestamps, dtype="datetime64[ns]"),
+        "granularity": numpy.array(granularity, dtype="float64"),
+        "values": numpy.array(values, dtype="float64"),
+    }
 
 
 class OpenstackGnocchiObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("gnocchi")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
+
+    def _columns(self, measures, as_array):
+        """Convert all the measures lists of a response to columns. See :func:`measures_to_columns`"""
+        if isinstance(measures, dict):
+            return {key: self._columns(value, as_array) for key, value in measures.items()}
+        return measures_to_columns(measures, as_array=as_array)
+
+    def _list(self, path, query, limit=None, marker=None, page_size=None, method="GET", data=""):
+        """Send gnocchi list request with marker pagination
+
+        :param path: resource path
+        :param query: list of (key, value) filters
+        :param limit: page size of a single page request [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the items are requested one page at a time using marker pagination [optional]
+        :param method: request method [default=GET]
+        :param data: request body [default=""]
+        :return: list of items
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = list(query)
+        if page_size is not None:
+            limit = page_size
+        if limit is not None:
+            query.append(("limit", limit))
+
+        items = []
+        while True:
+            page_query = list(query)
+            if marker is not None:
+                page_query.append(("marker", marker))
+            page_path = path
+            if len(page_query) > 0:
+                page_path = "%s?%s" % (path, urlencode(page_query, doseq=True))
+            page = self.client.call(page_path, method, data=data, token=self.manager.identity.token)[0]
+            items.extend(page)
+            # page size can be capped by gnocchi max_limit. Stop only on an empty page
+            if page_size is None or len(page) == 0:
+                break
+            marker = page[-1]["id"]
+        return items
 
 
 class OpenstackGnocchi(OpenstackGnocchiObject):
@@ -18,6 +91,11 @@ class OpenstackGnocchi(OpenstackGnocchiObject):
     def __init__(self, manager):
         OpenstackGnocchiObject.__init__(self, manager)
 
+        self.ver = "/v1"
+
+        self.resource = OpenstackGnocchiResource(self)
+        self.metric = OpenstackGnocchiMetric(self)
+
     @setup_client
     def api(self):
         """Get gnocchi api versions.
@@ -31,3 +109,350 @@ class OpenstackGnocchi(OpenstackGnocchiObject):
         res = client.call(path, "GET", data="", token=self.manager.identity.token)
         self.logger.debug("Get openstack gnocchi api: %s" % truncate(res[0]))
         return res[0]["versions"]
+
+    @setup_client
+    def aggregates(
+        self,
+        operations,
+        search=None,
+        resource_type="generic",
+        start=None,
+        stop=None,
+        granularity=None,
+        needed_overlap=None,
+        fill=None,
+        groupby=None,
+        details=False,
+        as_array=True,
+    ):
+        """Get measures of many metrics, or of the metrics of all the resources matched by search, and aggregate them
+        with a single request.
+
+        :param operations: operations to apply. Ex. "(metric (<metric id> mean) (<metric id> mean))" or with search
+            "(aggregate mean (metric cpu mean))"
+        :param search: resource search. Metrics in operations are metric names of the resources found. Ex.
+            "project_id=<project id>" or {"=": {"project_id": <project id>}} [optional]
+        :param resource_type: resource type used with search [default=generic]
+        :param start: start of the time period. Ex. 2024-01-01T00:00:00 [optional]
+        :param stop: end of the time period [optional]
+        :param granularity: granularity in seconds [optional]
+        :param needed_overlap: percent of overlap needed between series [optional]
+        :param fill: value used to fill missing points. Ex. 0, null, ffill, dropna [optional]
+        :param groupby: list of resource attributes used to group the result of search [optional]
+        :param details: if True return also the metrics and resources used [default=False]
+        :param as_array: if True measures are numpy arrays when numpy is installed [default=True]
+        :return: dict like {'measures': {<metric id>: {<aggregation>: {'timestamps': .., 'granularity': ..,
+            'values': ..}}}}. With search measures are indexed by resource id and metric name. With groupby a list of
+            dict like {'group': {..}, 'measures': {..}}
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = []
+        for key, value in [
+            ("start", start),
+            ("stop", stop),
+            ("granularity", granularity),
+            ("needed_overlap", needed_overlap),
+            ("fill", fill),
+        ]:
+            if value is not None:
+                query.append((key, value))
+        if details is True:
+            query.append(("details", True))
+        if groupby is not None:
+            query.append(("groupby", groupby))
+
+        data = {"operations": operations}
+        if search is not None:
+            data["search"] = search
+            data["resource_type"] = resource_type
+
+        path = "%s/aggregates" % self.ver
+        if len(query) > 0:
+            path = "%s?%s" % (path, urlencode(query, doseq=True))
+        res = self.client.call(path, "POST", data=jsonDumps(data), token=self.manager.identity.token)[0]
+        self.logger.debug("Get openstack gnocchi aggregates: %s" % truncate(res))
+
+        if isinstance(res, list):
+            for group in res:
+                group["measures"] = self._columns(group["measures"], as_array)
+        else:
+            res["measures"] = self._columns(res["measures"], as_array)
+        return res
+
+
+class OpenstackGnocchiResource(OpenstackGnocchiObject):
+    """Openstack gnocchi resource"""
+
+    def __init__(self, gnocchi):
+        OpenstackGnocchiObject.__init__(self, gnocchi.manager)
+
+        self.ver = gnocchi.ver
+
+    @setup_client
+    def list(self, resource_type="generic", details=False, sort=None, limit=None, marker=None, page_size=None):
+        """List resources
+
+        :param resource_type: resource type. Ex. generic, instance, volume [default=generic]
+        :param details: if True return also the attributes of the resource type [default=False]
+        :param sort: list of sort keys. Ex. ['started_at:desc'] [optional]
+        :param limit: page size of a single page request [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the resources are requested one page at a time [optional]
+        :return: list of resources
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = []
+        if details is True:
+            query.append(("details", True))
+        if sort is not None:
+            query.append(("sort", sort))
+        path = "%s/resource/%s" % (self.ver, resource_type)
+        res = self._list(path, query, limit=limit, marker=marker, page_size=page_size)
+        self.logger.debug("Get openstack gnocchi resources: %s" % truncate(res))
+        return res
+
+    @setup_client
+    def search(self, query, resource_type="generic", details=False, sort=None, limit=None, marker=None, page_size=None):
+        """Search resources
+
+        :param query: search query. Ex. "project_id=<project id>" or {"=": {"project_id": <project id>}}
+        :param resource_type: resource type. Ex. generic, instance, volume [default=generic]
+        :param details: if True return also the attributes of the resource type [default=False]
+        :param sort: list of sort keys. Ex. ['started_at:desc'] [optional]
+        :param limit: page size of a single page request [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the resources are requested one page at a time [optional]
+        :return: list of resources
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        params = []
+        data = ""
+        if isinstance(query, dict):
+            data = jsonDumps(query)
+        else:
+            params.append(("filter", query))
+        if details is True:
+            params.append(("details", True))
+        if sort is not None:
+            params.append(("sort", sort))
+        path = "%s/search/resource/%s" % (self.ver, resource_type)
+        res = self._list(path, params, limit=limit, marker=marker, page_size=page_size, method="POST", data=data)
+        self.logger.debug("Search openstack gnocchi resources: %s" % truncate(res))
+        return res
+
+    @setup_client
+    def get(self, oid, resource_type="generic"):
+        """Get resource
+
+        :param oid: resource id
+        :param resource_type: resource type [default=generic]
+        :return: resource
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "%s/resource/%s/%s" % (self.ver, resource_type, oid)
+        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
+        self.logger.debug("Get openstack gnocchi resource: %s" % truncate(res[0]))
+        return res[0]
+
+
+class OpenstackGnocchiMetric(OpenstackGnocchiObject):
+    """Openstack gnocchi metric and measures"""
+
+    def __init__(self, gnocchi):
+        OpenstackGnocchiObject.__init__(self, gnocchi.manager)
+
+        self.ver = gnocchi.ver
+
+    @setup_client
+    def list(self, limit=None, marker=None, page_size=None, **filters):
+        """List metrics
+
+        :param limit: page size of a single page request [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the metrics are requested one page at a time [optional]
+        :param filters: metric attribute filters. Ex. name=cpu, resource_id=<resource id> [optional]
+        :return: list of metrics
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = sorted(filters.items())
+        path = "%s/metric" % self.ver
+        res = self._list(path, query, limit=limit, marker=marker, page_size=page_size)
+        self.logger.debug("Get openstack gnocchi metrics: %s" % truncate(res))
+        return res
+
+    @setup_client
+    def get(self, oid):
+        """Get metric
+
+        :param oid: metric id
+        :return: metric
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "%s/metric/%s" % (self.ver, oid)
+        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
+        self.logger.debug("Get openstack gnocchi metric: %s" % truncate(res[0]))
+        return res[0]
+
+    @setup_client
+    def create(self, name, archive_policy_name=None, resource_id=None, unit=None):
+        """Create metric
+
+        :param name: metric name
+        :param archive_policy_name: archive policy name [optional]
+        :param resource_id: id of the resource of the metric [optional]
+        :param unit: metric unit [optional]
+        :return: metric
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        data = {"name": name}
+        if archive_policy_name is not None:
+            data["archive_policy_name"] = archive_policy_name
+        if resource_id is not None:
+            data["resource_id"] = resource_id
+        if unit is not None:
+            data["unit"] = unit
+        path = "%s/metric" % self.ver
+        res = self.client.call(path, "POST", data=jsonDumps(data), token=self.manager.identity.token)
+        self.logger.debug("Create openstack gnocchi metric: %s" % truncate(res[0]))
+        return res[0]
+
+    @setup_client
+    def delete(self, oid):
+        """Delete metric
+
+        :param oid: metric id
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "%s/metric/%s" % (self.ver, oid)
+        res = self.client.call(path, "DELETE", data="", token=self.manager.identity.token)
+        self.logger.debug("Delete openstack gnocchi metric: %s" % truncate(res[0]))
+        return res[0]
+
+    @setup_client
+    def get_measures(
+        self,
+        metric,
+        resource_id=None,
+        resource_type="generic",
+        start=None,
+        stop=None,
+        aggregation=None,
+        granularity=None,
+        resample=None,
+        refresh=False,
+        as_array=True,
+    ):
+        """Get measures of a metric
+
+        :param metric: metric id, or metric name when resource_id is set
+        :param resource_id: id of the resource of the metric [optional]
+        :param resource_type: resource type used with resource_id [default=generic]
+        :param start: start of the time period. Ex. 2024-01-01T00:00:00 [optional]
+        :param stop: end of the time period [optional]
+        :param aggregation: aggregation method. Ex. mean, max, min [default=mean]
+        :param granularity: granularity in seconds [optional]
+        :param resample: granularity in seconds used to resample measures [optional]
+        :param refresh: if True measures not yet processed are aggregated before returning [default=False]
+        :param as_array: if True measures are numpy arrays when numpy is installed [default=True]
+        :return: dict like {'timestamps': .., 'granularity': .., 'values': ..}
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = []
+        for key, value in [
+            ("start", start),
+            ("stop", stop),
+            ("aggregation", aggregation),
+            ("granularity", granularity),
+            ("resample", resample),
+        ]:
+            if value is not None:
+                query.append((key, value))
+        if refresh is True:
+            query.append(("refresh", True))
+
+        if resource_id is not None:
+            path = "%s/resource/%s/%s/metric/%s/measures" % (self.ver, resource_type, resource_id, quote(metric))
+        else:
+            path = "%s/metric/%s/measures" % (self.ver, metric)
+        if len(query) > 0:
+            path = "%s?%s" % (path, urlencode(query))
+        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)[0]
+        self.logger.debug("Get openstack gnocchi metric %s measures: %s" % (metric, len(res)))
+        return measures_to_columns(res, as_array=as_array)
+
+    @setup_client
+    def batch_get_measures(
+        self,
+        metric_ids,
+        aggregation="mean",
+        start=None,
+        stop=None,
+        granularity=None,
+        fill=None,
+        chunk_size=100,
+        concurrency=4,
+        as_array=True,
+    ):
+        """Get measures of many metrics. Metrics are requested with one aggregates request for every chunk of
+        chunk_size metrics in place of one request for every metric. Metrics of a chunk do not need to overlap:
+        measures of every metric are returned like with a single metric request.
+
+        :param metric_ids: list of metric ids
+        :param aggregation: aggregation method. Ex. mean, max, min [default=mean]
+        :param start: start of the time period. Ex. 2024-01-01T00:00:00 [optional]
+        :param stop: end of the time period [optional]
+        :param granularity: granularity in seconds [optional]
+        :param fill: value used to fill the points missing in a metric but present in the other metrics of the same
+            chunk. Ex. 0, null, ffill. If not set missing points are not returned [optional]
+        :param chunk_size: max number of metrics requested with a single request [default=100]
+        :param concurrency: max number of requests sent in parallel [default=4]
+        :param as_array: if True measures are numpy arrays when numpy is installed [default=True]
+        :return: dict like {<metric id>: {'timestamps': .., 'granularity': .., 'values': ..}}
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        metric_ids = list(metric_ids)
+        chunks = [metric_ids[i : i + chunk_size] for i in range(0, len(metric_ids), chunk_size)]
+
+        def get_chunk(chunk):
+            operations = "(metric %s)" % " ".join(["(%s %s)" % (oid, aggregation) for oid in chunk])
+            return self.manager.gnocchi.aggregates(
+                operations,
+                start=start,
+                stop=stop,
+                granularity=granularity,
+                needed_overlap=0,
+                fill=fill,
+                as_array=as_array,
+            )["measures"]
+
+        res = {}
+        for measures in concurrent_map(get_chunk, chunks, concurrency):
+            for oid, aggregations in measures.items():
+                res[oid] = aggregations[aggregation]
+        self.logger.debug("Get openstack gnocchi measures of %s metrics" % len(res))
+        return res
+
+    @setup_client
+    def add_measures(self, oid, measures):
+        """Add measures to a metric
+
+        :param oid: metric id
+        :param measures: list of dict like {'timestamp': '2024-01-01T00:00:00', 'value': 10.5}
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "%s/metric/%s/measures" % (self.ver, oid)
+        res = self.client.call(path, "POST", data=jsonDumps(measures), token=self.manager.identity.token)
+        self.logger.debug("Add openstack gnocchi metric %s measures: %s" % (oid, len(measures)))
+        return res[0]
+
+    @setup_client
+    def batch_add_measures(self, measures):
+        """Add measures to many metrics with a single request
+
+        :param measures: dict like {<metric id>: [{'timestamp': '2024-01-01T00:00:00', 'value': 10.5}, ..]}
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "%s/batch/metrics/measures" % self.ver
+        res = self.client.call(path, "POST", data=jsonDumps(measures), token=self.manager.identity.token)
+        self.logger.debug("Add openstack gnocchi measures of %s metrics" % len(measures))
+        return res[0]
@@ -2,8 +2,14 @@
 #
 # (C) Copyright 2018-2024 CSI-Piemonte
 
+import os
 import ujson as json
+import yaml
+from collections import OrderedDict
+from hashlib import sha256
 from logging import getLogger
+from threading import Lock
+from time import sleep, time
 from beecell.simple import truncate
 from six.moves.urllib.parse import urlencode
 from six.moves.urllib.request import urlopen
@@ -16,10 +22,266 @@ from beedrones.openstack.client import (
 from beecell.simple import jsonDumps
 
 
+class OpenstackHeatYamlLoader(yaml.SafeLoader):
+    """Yaml loader that keeps dates as strings like heat does. Ex. heat_template_version: 2016-10-14"""
+
+
+OpenstackHeatYamlLoader.yaml_implicit_resolvers = {
+    key: [item for item in resolvers if item[0] != "tag:yaml.org,2002:timestamp"]
+    for key, resolvers in yaml.SafeLoader.yaml_implicit_resolvers.items()
+}
+
+
+class OpenstackHeatTemplateBundle(object):
+    """Heat template with environment and included files. Template and environment are parsed, get_file includes and
+    provider templates are resolved and the bundle is serialized to json once. Use the bundle with stack create,
+    update, preview and template validate in place of template, environment and files.
+
+    :param template: template as yaml or json string or as dict
+    :param environment: environment as yaml or json string or as dict [optional]
+    :param files: dict with the content of the files referenced in the template. Missing files are read with
+        loader [optional]
+    :param base_dir: directory of the files referenced in the template with a relative path [optional]
+    :param loader: function that receives a file name and returns its content. If not set files are read from
+        base_dir or from the url when name is an url [optional]
+    """
+
+    provider_extensions = (".yaml", ".yml", ".template")
+
+    def __init__(self, template, environment=None, files=None, base_dir=None, loader=None):
+        self.base_dir = base_dir
+        self.loader = loader
+        if self.loader is None:
+            self.loader = self.__load
+
+        self.template = self.parse(template)
+        self.environment = self.parse(environment) if environment is not None else None
+        self.files = dict(files or {})
+        self.__resolve(self.template)
+        if self.environment is not None:
+            self.__resolve_registry(self.environment.get("resource_registry", {}))
+
+        # json fragment with template, environment and files added to every request body
+        fragment = {"template": self.template, "files": self.files}
+        if self.environment is not None:
+            fragment["environment"] = self.environment
+        self.fragment = jsonDumps(fragment)[1:-1]
+        self.hash = sha256(json.dumps(fragment, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def __repr__(self):
+        return "<OpenstackHeatTemplateBundle hash=%s files=%s>" % (self.hash, len(self.files))
+
+    @staticmethod
+    def parse(content):
+        """Parse yaml or json content
+
+        :param content: yaml or json string or dict
+        :return: dict
+        """
+        if isinstance(content, dict):
+            return content
+        return yaml.load(content, Loader=OpenstackHeatYamlLoader)
+
+    def __load(self, name):
+        if name.find("://") > 0:
+            return urlopen(name).read().decode("utf-8")
+        path = name
+        if self.base_dir is not None and not os.path.isabs(name):
+            path = os.path.join(self.base_dir, name)
+        with open(path, "r") as f:
+            return f.read()
+
+    def __include(self, name, provider=False):
+        if name not in self.files:
+            self.files[name] = self.loader(name)
+            if provider is True:
+                self.__resolve(self.parse(self.files[name]))
+
+    def __resolve(self, obj):
+        """Add to files the files referenced by get_file and the provider templates used as resource type"""
+        if isinstance(obj, dict):
+            for key, value in obj.items():
+                if key == "get_file" and isinstance(value, str):
+                    self.__include(value)
+                elif key == "type" and isinstance(value, str) and value.endswith(self.provider_extensions):
+                    self.__include(value, provider=True)
+                else:
+                    self.__resolve(value)
+        elif isinstance(obj, list):
+            for item in obj:
+                self.__resolve(item)
+
+    def __resolve_registry(self, registry):
+        """Add to files the provider templates of the environment resource registry and of its resources section.
+        Mappings to other resource types and hooks are not files"""
+        for key, value in registry.items():
+            if key == "resources" and isinstance(value, dict):
+                for item in value.values():
+                    if isinstance(item, dict):
+                        self.__resolve_registry(item)
+            elif isinstance(value, str) and value.endswith(self.provider_extensions):
+                self.__include(value, provider=True)
+
+    def dumps(self, data):
+        """Serialize a request body with the bundle template, environment and files
+
+        :param data: request body without template, environment and files
+        :return: json string
+        """
+        body = jsonDumps(data)
+        if body == "{}":
+            return "{%s}" % self.fragment
+        return "%s,%s}" % (body[:-1], self.fragment)
+
+
+class OpenstackHeatTemplateCache(object):
+    """LRU cache of template bundles by template content and of template validation results by bundle hash.
+
+    Bundles are keyed by template, environment, files and base_dir. Files read with the loader are assumed immutable:
+    when an included file or provider template changes, get the bundle with refresh=True or call invalidate. The
+    rebuilt bundle has a new hash, so its validation is not served from cache.
+
+    :param max_bundles: max number of cached bundles [default=128]
+    :param max_results: max number of cached validation results [default=1024]
+    """
+
+    def __init__(self, max_bundles=128, max_results=1024):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.max_bundles = max_bundles
+        self.max_results = max_results
+
+        self._lock = Lock()
+        # {content hash: bundle}. Last used entries are at the end
+        self._bundles = OrderedDict()
+        # {bundle hash: validation result}
+        self._results = OrderedDict()
+
+        # cache counters
+        self.hits = 0
+        self.misses = 0
+        self.validate_hits = 0
+        self.validate_misses = 0
+
+    def __repr__(self):
+        return "<OpenstackHeatTemplateCache id=%s bundles=%s results=%s>" % (
+            id(self),
+            len(self._bundles),
+            len(self._results),
+        )
+
+    @staticmethod
+    def key(template, environment=None, files=None, base_dir=None):
+        """Get the hash of the template content
+
+        :return: sha256 hex digest
+        """
+        content = []
+        for item in [template, environment, files]:
+            if item is None or isinstance(item, str):
+                content.append(item)
+            else:
+                content.append(json.dumps(item, sort_keys=True))
+        content.append(base_dir)
+        return sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def __put(entries, key, value, max_entries):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+
+    def bundle(self, template, environment=None, files=None, base_dir=None, loader=None, refresh=False):
+        """Get a template bundle. A new bundle is created only when template content was never seen or refresh is
+        True. Files read with loader are read once for every template content.
+
+        :param template: template as yaml or json string or as dict
+        :param environment: environment as yaml or json string or as dict [optional]
+        :param files: dict with the content of the files referenced in the template [optional]
+        :param base_dir: directory of the files referenced in the template with a relative path [optional]
+        :param loader: function that receives a file name and returns its content [optional]
+        :param refresh: if True files are read again and the cached bundle is replaced [default=False]
+        :return: instance of :class:`OpenstackHeatTemplateBundle`
+        """
+        key = self.key(template, environment, files, base_dir)
+        with self._lock:
+            bundle = self._bundles.get(key, None)
+            if bundle is not None and refresh is False:
+                self._bundles.move_to_end(key)
+                self.hits += 1
+                return bundle
+            self.misses += 1
+
+        bundle = OpenstackHeatTemplateBundle(template, environment, files, base_dir=base_dir, loader=loader)
+        with self._lock:
+            self.__put(self._bundles, key, bundle, self.max_bundles)
+        self.logger.debug("Create heat template bundle %s" % bundle)
+        return bundle
+
+    def get_result(self, bundle):
+        """Get the cached validation result of a bundle
+
+        :param bundle: instance of :class:`OpenstackHeatTemplateBundle`
+        :return: validation result or None
+        """
+        with self._lock:
+            result = self._results.get(bundle.hash, None)
+            if result is None:
+                self.validate_misses += 1
+                return None
+            self._results.move_to_end(bundle.hash)
+            self.validate_hits += 1
+            return result
+
+    def set_result(self, bundle, result):
+        """Cache the validation result of a bundle
+
+        :param bundle: instance of :class:`OpenstackHeatTemplateBundle`
+        :param result: validation result
+        """
+        with self._lock:
+            self.__put(self._results, bundle.hash, result, self.max_results)
+
+    def invalidate(self, template, environment=None, files=None, base_dir=None):
+        """Remove the cached bundle of a template content. Use it when a file read with the loader changes
+
+        :param template: template as yaml or json string or as dict
+        :param environment: environment as yaml or json string or as dict [optional]
+        :param files: dict with the content of the files referenced in the template [optional]
+        :param base_dir: directory of the files referenced in the template with a relative path [optional]
+        :return: True if a bundle was removed
+        """
+        key = self.key(template, environment, files, base_dir)
+        with self._lock:
+            return self._bundles.pop(key, None) is not None
+
+    def clear(self):
+        """Remove all the cached bundles and validation results"""
+        with self._lock:
+            self._bundles.clear()
+            self._results.clear()
+
+    def stats(self):
+        """Get cache counters
+
+        :return: dict with bundles, results, hits, misses, validate_hits and validate_misses
+        """
+        with self._lock:
+            return {
+                "bundles": len(self._bundles),
+                "results": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses,
+                "validate_hits": self.validate_hits,
+                "validate_misses": self.validate_misses,
+            }
+
+
 class OpenstackHeatObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("heat")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackHeat(OpenstackHeatObject):
@@ -32,6 +294,8 @@ class OpenstackHeat(OpenstackHeatObject):
     def __init__(self, manager):
         OpenstackHeatObject.__init__(self, manager)
 
+        self.template_cache = OpenstackHeatTemplateCache()
+
         self.stack = OpenstackHeatStack(self)
         self.template = OpenstackHeatTemplate(self)
         self.software_config = OpenstackHeatSoftwareConfig(self)
@@ -44,7 +308,7 @@ class OpenstackHeat(OpenstackHeatObject):
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
         redux_uri = self.uri.split("/")[0] + "//" + self.uri.split("/")[2]
-        client = OpenstackClient(redux_uri, self.manager.proxy, timeout=self.manager.timeout)
+        client = self.manager.get_client(redux_uri)
         path = "/"
         self.logger.debug("Path to check: %s%s" % (client.path, path))
         res = client.call(path, "GET", data="", token=self.manager.identity.token)
@@ -86,12 +350,21 @@ class OpenstackHeatStack(OpenstackHeatObject):
 
         self.manager = heat.manager
         self.uri = heat.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
         self.resource = OpenstackHeatStackResource(self)
         self.snapshot = OpenstackHeatStackSnapshot(self)
         self.event = OpenstackHeatStackEvent(self)
 
+    @staticmethod
+    def __dumps(data, bundle):
+        """Serialize request body. Template, environment and files of data are replaced by bundle when set"""
+        if bundle is None:
+            return jsonDumps(data)
+        for key in ["template", "template_url", "environment", "files"]:
+            data.pop(key, None)
+        return bundle.dumps(data)
+
     @setup_client
     def list(
         self,
@@ -264,6 +537,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
         timeout_mins=None,
         disable_rollback=True,
         stack_owner=None,
+        bundle=None,
     ):
         """Create stack
 
@@ -383,6 +657,8 @@ class OpenstackHeatStack(OpenstackHeatObject):
                 fails. Set to False to delete all previously-created stack resources when stack creation fails.
                 Default is True.
         :param use_all_urls: [optional] Default False. Must be True if you need to pass other params as files in a URL
+        :param bundle: [optional] instance of :class:`OpenstackHeatTemplateBundle`. If set template, environment and
+                files are ignored and the bundle already serialized content is sent.
 
         return:
 
@@ -441,7 +717,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
             path,
             "POST",
             token=self.manager.identity.token,
-            data=jsonDumps(data),
+            data=self.__dumps(data, bundle),
             headers=headers,
         )
         self.logger.debug("Create openstack heat stack: %s" % truncate(res[0]))
@@ -459,6 +735,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
         tags=None,
         timeout_mins=None,
         disable_rollback=True,
+        bundle=None,
     ):
         """Update a stack.
 
@@ -503,7 +780,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
             data["disable_rollback"] = disable_rollback
 
             path = "/stacks/%s/%s" % (stack_name, oid)
-            res = self.client.call(path, "PATCH", data=jsonDumps(data), token=self.manager.identity.token)
+            res = self.client.call(path, "PATCH", data=self.__dumps(data, bundle), token=self.manager.identity.token)
             self.logger.debug("Update openstack heat stack: %s" % truncate(res[0]))
         else:
             raise OpenstackError("You must specify both stack name and stack UUID", 404)
@@ -542,6 +819,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
         timeout_mins=None,
         disable_rollback=True,
         use_all_urls=False,
+        bundle=None,
     ):
         """Previews a stack.
 
@@ -576,7 +854,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
             data["disable_rollback"] = "FALSE"
 
         path = "/stacks/preview"
-        res = self.client.call(path, "POST", data=jsonDumps(data), token=self.manager.identity.token)
+        res = self.client.call(path, "POST", data=self.__dumps(data, bundle), token=self.manager.identity.token)
         self.logger.debug("Preview openstack heat stack: %s" % truncate(res[0]))
         return res[0]
 
@@ -593,6 +871,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
         tags=None,
         timeout_mins=None,
         use_all_urls=False,
+        bundle=None,
     ):
         """Preview a stack update.
 
@@ -626,7 +905,7 @@ class OpenstackHeatStack(OpenstackHeatObject):
                 data["tags"] = tags
 
             path = "/stacks/%s/%s/preview" % (stack_name, oid)
-            res = self.client.call(path, "PUT", data=jsonDumps(data), token=self.manager.identity.token)
+            res = self.client.call(path, "PUT", data=self.__dumps(data, bundle), token=self.manager.identity.token)
             self.logger.debug("Preview update openstack heat stack: %s" % truncate(res[0]))
         else:
             raise OpenstackError("You must specify both stack name and stack UUID", 404)
@@ -769,7 +1048,7 @@ class OpenstackHeatStackResource(OpenstackHeatObject):
 
         self.manager = stack.manager
         self.uri = stack.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(
@@ -1068,7 +1347,7 @@ class OpenstackHeatStackSnapshot(OpenstackHeatObject):
 
         self.manager = stack.manager
         self.uri = stack.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
         self.event = OpenstackHeatStackResourceEvent(self)
 
@@ -1197,7 +1476,7 @@ class OpenstackHeatStackEvent(OpenstackHeatObject):
 
         self.manager = stack.manager
         self.uri = stack.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, stack_name, oid, resource_action=None, resource_status=None):
@@ -1229,6 +1508,81 @@ class OpenstackHeatStackEvent(OpenstackHeatObject):
         self.logger.debug("Openstack heat stack Events: %s" % truncate(res[0]))
         return res[0]["events"]
 
+    def tail_events(
+        self,
+        stack_name,
+        oid,
+        since_marker=None,
+        nested_depth=None,
+        limit=100,
+        interval=2,
+        max_interval=30,
+        backoff=1.5,
+        timeout=None,
+        follow=True,
+    ):
+        """Yield only the new stack events. Events are requested in ascending order one page at a time starting after
+        the last event returned. When no new event is found the poll interval grows by backoff up to max_interval.
+        The id of the last event yielded can be used as since_marker to resume tailing.
+
+        :param stack_name: The name of a stack.
+        :param oid: The UUID of the stack.
+        :param since_marker: id of the last event already read. If not set all the events are returned [optional]
+        :param nested_depth: include events of nested stacks up to this depth [optional]
+        :param limit: max number of events requested for every page [default=100]
+        :param interval: min poll interval in seconds [default=2]
+        :param max_interval: max poll interval in seconds [default=30]
+        :param backoff: poll interval multiplier applied when no new event is found [default=1.5]
+        :param timeout: stop after timeout seconds [optional]
+        :param follow: if False stop when all the events were read. If True stop when the stack is no more in
+            progress and all its events were read [default=True]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        :return: generator of events
+        """
+        if stack_name is None or oid is None:
+            raise OpenstackError("You must specify both stack name and stack UUID", 404)
+
+        marker = since_marker
+        delay = interval
+        start = time()
+        finished = False
+        while True:
+            query = {"sort_dir": "asc", "limit": limit}
+            if marker is not None:
+                query["marker"] = marker
+            if nested_depth is not None:
+                query["nested_depth"] = nested_depth
+
+            self.setup()
+            path = "/stacks/%s/%s/events?%s" % (stack_name, oid, urlencode(query))
+            events = self.client.call(path, "GET", data="", token=self.manager.identity.token)[0]["events"]
+            self.logger.debug("Get openstack heat stack %s new events: %s" % (oid, len(events)))
+            for event in events:
+                marker = event["id"]
+                yield event
+
+            # read next page immediately
+            if len(events) == limit:
+                delay = interval
+                continue
+            if follow is False or finished is True:
+                return
+            if timeout is not None and time() - start > timeout:
+                self.logger.warning("Tail openstack heat stack %s events timeout" % oid)
+                return
+
+            if len(events) > 0:
+                delay = interval
+            else:
+                # stack is idle. Check status and read the last events once more when it is no more in progress
+                path = "/stacks/%s/%s" % (stack_name, oid)
+                stack = self.client.call(path, "GET", data="", token=self.manager.identity.token)[0]["stack"]
+                if stack["stack_status"].find("IN_PROGRESS") == -1:
+                    finished = True
+                    continue
+                delay = min(delay * backoff, max_interval)
+            sleep(delay)
+
 
 class OpenstackHeatStackResourceEvent(OpenstackHeatObject):
     """ """
@@ -1238,7 +1592,7 @@ class OpenstackHeatStackResourceEvent(OpenstackHeatObject):
 
         self.manager = resource.manager
         self.uri = resource.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, stack_name, oid, resource_name):
@@ -1268,7 +1622,24 @@ class OpenstackHeatTemplate(OpenstackHeatObject):
 
         self.manager = heat.manager
         self.uri = heat.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
+        self.cache = heat.template_cache
+
+    def bundle(self, template, environment=None, files=None, base_dir=None, loader=None, refresh=False):
+        """Get a template bundle from the template cache. Template is parsed and its files are resolved only the first
+        time its content is seen. Files read with loader are assumed immutable: use refresh when they change.
+
+        :param template: template as yaml or json string or as dict
+        :param environment: environment as yaml or json string or as dict [optional]
+        :param files: dict with the content of the files referenced in the template [optional]
+        :param base_dir: directory of the files referenced in the template with a relative path [optional]
+        :param loader: function that receives a file name and returns its content [optional]
+        :param refresh: if True files are read again and the cached bundle is replaced [default=False]
+        :return: instance of :class:`OpenstackHeatTemplateBundle`
+        """
+        return self.cache.bundle(
+            template, environment=environment, files=files, base_dir=base_dir, loader=loader, refresh=refresh
+        )
 
     @setup_client
     def versions(self):
@@ -1295,7 +1666,7 @@ class OpenstackHeatTemplate(OpenstackHeatObject):
         return res[0]
 
     @setup_client
-    def validate(self, template_url=None, template=None, environment=None):
+    def validate(self, template_url=None, template=None, environment=None, bundle=None):
         """Validate a Template.
 
         :param template_url: [optional] A URI to the location containing the
@@ -1321,9 +1692,22 @@ class OpenstackHeatTemplate(OpenstackHeatObject):
             the template_url parameter value.
         :param environment: [optional] A JSON environment for the stack.
         :param use_all_urls: [optional] set yes if need to use an environment URL
+        :param bundle: [optional] instance of :class:`OpenstackHeatTemplateBundle` used in place of template and
+            environment. Result is cached by bundle hash and returned without a new request next time.
         :raises OpenstackError: raise :class:`.OpenstackError`
         :return:
         """
+        path = "/validate"
+        if bundle is not None:
+            res = self.cache.get_result(bundle)
+            if res is not None:
+                self.logger.debug("Validate openstack heat template %s: cached" % bundle.hash)
+                return res
+            res = self.client.call(path, "POST", data=bundle.dumps({}), token=self.manager.identity.token)
+            self.logger.debug("Validate openstack heat template %s: %s" % (bundle.hash, truncate(res[0])))
+            self.cache.set_result(bundle, res[0])
+            return res[0]
+
         data = {}
 
         if template is not None:
@@ -1332,8 +1716,6 @@ class OpenstackHeatTemplate(OpenstackHeatObject):
             data["template_url"] = template_url
         if environment is not None:
             data["environment"] = environment
-        print(template)
-        path = "/validate"
         res = self.client.call(path, "POST", data=jsonDumps(data), token=self.manager.identity.token)
         self.logger.debug("Validate openstack heat template: %s" % truncate(res[0]))
 
@@ -1348,7 +1730,7 @@ class OpenstackHeatSoftwareConfig(OpenstackHeatObject):
 
         self.manager = heat.manager
         self.uri = heat.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self):
@@ -1442,7 +1824,7 @@ class OpenstackHeatSoftwareDeployment(OpenstackHeatObject):
 
         self.manager = heat.manager
         self.uri = heat.uri
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self):
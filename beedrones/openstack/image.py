@@ -12,6 +12,7 @@ from beedrones.openstack.client import (
     OpenstackError,
     OpenstackObject,
     setup_client,
+    open_request_body,
 )
 
 
@@ -22,7 +23,7 @@ class OpenstackImageObject(OpenstackObject):
         self.uri = "%s%s" % (self.uri, self.ver)
         # change version from 2 to 2.1
         # self.uri = self.uri.replace('v2/', 'v2.1/')
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackImage(OpenstackImageObject):
@@ -210,23 +211,28 @@ class OpenstackImage(OpenstackImageObject):
     # image data
     #
     @setup_client
-    def upload(self, image_id, qcow2_data):
+    def upload(self, image_id, qcow2_data=None, path=None, chunk_size=1048576):
         """Uploads binary image data
 
         :param image_id: image id
-        :param qcow2_data: qcow2_data data
+        :param qcow2_data: qcow2_data data. Can be str, bytes, a file-like object opened in binary mode or an iterable
+            of bytes. File objects are sent in chunks, iterables with chunked transfer encoding [optional]
+        :param path: path of the image file to upload. File is mapped in memory with mmap [optional]
+        :param chunk_size: size of the chunks read from file objects [default=1048576]
         :raises OpenstackError: raise :class:`.OpenstackError`
         :return: dict
         """
-        path = "/images/%s/file" % image_id
-        res = self.client.call(
-            path,
-            "PUT",
-            data=qcow2_data,
-            token=self.manager.identity.token,
-            content_type="application/octet-stream",
-            timeout=1200,
-        )
+        uri = "/images/%s/file" % image_id
+        with open_request_body(data=qcow2_data, path=path, chunk_size=chunk_size) as (body, headers):
+            res = self.client.call(
+                uri,
+                "PUT",
+                data=body,
+                headers=headers,
+                token=self.manager.identity.token,
+                content_type="application/octet-stream",
+                timeout=1200,
+            )
         self.logger.debug("upload data to openstack image %s" % image_id)
         return res[0]
 
@@ -250,6 +256,54 @@ class OpenstackImage(OpenstackImageObject):
         self.logger.debug("download data from openstack image %s" % image_id)
         return res[0]
 
+    @setup_client
+    def download_stream(self, image_id, dest=None, chunk_size=1048576, verify=True, timeout=1200):
+        """Download binary image data without loading it in memory
+
+        :param image_id: image id
+        :param dest: file path or file-like object where write image data. If not set the stream is returned
+            [optional]
+        :param chunk_size: size of the chunks read [default=1048576]
+        :param verify: if True check image data against image checksum and os_hash_value when download completes
+            [default=True]
+        :param timeout: socket timeout [default=1200]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        :return: if dest is None an instance of :class:`OpenstackStreamResponse` that yields chunks of bytes,
+            otherwise a dictionary with response headers, bytes written and digests
+        """
+        hash_algorithms = []
+        image = {}
+        if verify is True:
+            image = self.get(oid=image_id)
+            if image.get("checksum", None) is not None:
+                hash_algorithms.append("md5")
+            if image.get("os_hash_algo", None) is not None and image.get("os_hash_value", None) is not None:
+                hash_algorithms.append(image["os_hash_algo"])
+
+        path = "/images/%s/file" % image_id
+        stream = self.client.call(
+            path,
+            "GET",
+            token=self.manager.identity.token,
+            content_type="application/octet-stream",
+            timeout=timeout,
+            stream=True,
+            chunk_size=chunk_size,
+            hash_algorithms=hash_algorithms,
+        )[0]
+        if "md5" in hash_algorithms:
+            stream.expect("md5", image["checksum"])
+        if image.get("os_hash_algo", None) in hash_algorithms:
+            stream.expect(image["os_hash_algo"], image["os_hash_value"])
+        self.logger.debug("stream data from openstack image %s" % image_id)
+
+        if dest is None:
+            return stream
+
+        with stream:
+            size = stream.write_to(dest)
+        return {"headers": stream.headers, "bytes": size, "digests": stream.digests()}
+
     #
     # schemas
     #
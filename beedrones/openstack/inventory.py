@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: EUPL-1.2
+#
+# (C) Copyright 2018-2024 CSI-Piemonte
+
+from logging import getLogger
+from time import time
+from beedrones.openstack.client import OpenstackError, concurrent_map
+
+
+class OpenstackInventory(object):
+    """Openstack inventory. Collect servers, flavors, volumes, images and ports and join them per server.
+
+    :param manager: instance of :class:`OpenstackManager`
+    """
+
+    def __init__(self, manager):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.manager = manager
+
+    def __list_flavors(self, page_size):
+        flavors = []
+        marker = None
+        while True:
+            page = self.manager.flavor.list(detail=True, limit=page_size, marker=marker)
+            flavors.extend(page)
+            if len(page) < page_size:
+                return flavors
+            marker = page[-1]["id"]
+
+    def __list_images(self, project, page_size):
+        query = {"limit": page_size}
+        if project is not None:
+            query["owner"] = project
+        images = []
+        while True:
+            page = self.manager.image.list(**query)
+            images.extend(page)
+            if len(page) < page_size:
+                return images
+            query["marker"] = page[-1]["id"]
+
+    def __get_image(self, oid):
+        try:
+            return self.manager.image.get(oid=oid)
+        except OpenstackError as ex:
+            # image was deleted after server was created
+            if ex.code == 404:
+                return None
+            raise
+
+    def snapshot(self, project=None, page_size=1000, volume_concurrency=4):
+        """Get a snapshot of the servers with flavor, volumes, image and ports. Servers, flavors, volumes, images and
+        ports are requested concurrently, indexed once and joined in one pass.
+
+        :param project: project id. If not set resources of all the projects are returned [optional]
+        :param page_size: number of items requested for every page [default=1000]
+        :param volume_concurrency: max number of volume pages or images not owned by project requested in parallel
+            [default=4]
+        :return: list of dict like
+
+            {'server': {..},
+             'flavor': {..},
+             'image': {..},
+             'volumes': [{..}, ..],
+             'ports': [{..}, ..],
+             'info': {'cpu': 1, 'memory': 2048, 'os': '', 'state': 'poweredOn', 'disk': 40, ..}}
+
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        start = time()
+        server_filters = {}
+        if project is not None:
+            server_filters["tenant_id"] = project
+
+        tasks = [
+            lambda: self.manager.server.list(detail=True, page_size=page_size, **server_filters),
+            lambda: self.__list_flavors(page_size),
+            lambda: self.manager.volume_v3.list_all(
+                detail=True, limit=page_size, concurrency=volume_concurrency, tenant=project
+            ),
+            lambda: self.__list_images(project, page_size),
+            lambda: self.manager.network.port.list(tenant=project),
+        ]
+        servers, flavors, volumes, images, ports = concurrent_map(lambda task: task(), tasks, len(tasks))
+        self.logger.debug(
+            "Get openstack inventory: %s servers, %s flavors, %s volumes, %s images, %s ports"
+            % (len(servers), len(flavors), len(volumes), len(images), len(ports))
+        )
+
+        # build indexes
+        flavor_idx = {item["id"]: item for item in flavors}
+        volume_idx = {item["id"]: item for item in volumes}
+        image_idx = {item["id"]: item for item in images}
+
+        # public, shared and community images are not returned by the owner filter. Get them one by one
+        missing = {server["image"]["id"] for server in servers if isinstance(server.get("image"), dict)}
+        missing = sorted(missing.difference(image_idx.keys()))
+        for image in concurrent_map(self.__get_image, missing, volume_concurrency):
+            if image is not None:
+                image_idx[image["id"]] = image
+        port_idx = {}
+        for port in ports:
+            port_idx.setdefault(port["device_id"], []).append(port)
+
+        # join
+        records = []
+        for server in servers:
+            # since compute api 2.47 server contains the flavor properties in place of the flavor id
+            flavor = flavor_idx.get(server["flavor"].get("id"), None)
+            if flavor is None and "ram" in server["flavor"]:
+                flavor = server["flavor"]
+
+            image = None
+            if isinstance(server.get("image"), dict):
+                image = image_idx.get(server["image"]["id"], None)
+
+            attached = server.get("os-extended-volumes:volumes_attached", [])
+            server_volumes = [volume_idx[item["id"]] for item in attached if item["id"] in volume_idx]
+
+            info = self.manager.server.info(server, volume_idx=volume_idx, image_idx=image_idx, flavor=flavor)
+            records.append(
+                {
+                    "server": server,
+                    "flavor": flavor,
+                    "image": image,
+                    "volumes": server_volumes,
+                    "ports": port_idx.get(server["id"], []),
+                    "info": info,
+                }
+            )
+
+        self.logger.debug("Get openstack inventory snapshot: %s servers - elapsed: %s" % (len(records), time() - start))
+        return records
@@ -5,11 +5,14 @@
 from beecell.simple import jsonDumps
 
 import ujson as json
+from ipaddress import ip_network
 from logging import getLogger
+from time import sleep, time
 from beecell.simple import truncate
 from six.moves.urllib.parse import urlencode
 from six.moves.urllib.request import urlopen
 from beedrones.openstack.client import (
+    concurrent_map,
     OpenstackClient,
     OpenstackError,
     OpenstackObject,
@@ -20,7 +23,7 @@ from beedrones.openstack.client import (
 class OpenstackManilaObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("manilav2")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
         self.set_manila_microversion("2.42")
 
 
@@ -47,7 +50,7 @@ class OpenstackManila(OpenstackManilaObject):
         """
         if version is None:
             redux_uri = self.uri.split("/")[0] + "//" + self.uri.split("/")[2]
-            client = OpenstackClient(redux_uri, self.manager.proxy, timeout=self.manager.timeout)
+            client = self.manager.get_client(redux_uri)
             path = "/"
             self.logger.debug("Path to check: %s%s" % (client.path, path))
             res = client.call(path, "GET", data="", token=self.manager.identity.token)
@@ -55,7 +58,7 @@ class OpenstackManila(OpenstackManilaObject):
             return res[0]["versions"]
         else:
             redux_uri = self.uri.split("/")[0] + "//" + self.uri.split("/")[2]
-            client = OpenstackClient(redux_uri, self.manager.proxy, timeout=self.manager.timeout)
+            client = self.manager.get_client(redux_uri)
             path = "/%s/" % version
             self.logger.debug("Path to check: %s%s" % (client.path, path))
             res = client.call(path, "GET", data="", token=self.manager.identity.token)
@@ -167,7 +170,7 @@ class OpenstackManilaShare(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
         self.action = OpenstackManilaShareAction(manila)
         self.snapshot = OpenstackManilaShareSnapshot(manila)
 
@@ -349,7 +352,7 @@ class OpenstackManilaShareAction(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def action(self, share_id, action, data):
@@ -477,6 +480,145 @@ class OpenstackManilaShareAction(OpenstackManilaObject):
         res = self.action(share_id, "list_access", data).get("access_list", [])
         return res
 
+    @staticmethod
+    def access_key(rule):
+        """Get a hashable key of an access rule
+
+        :param rule: access rule as returned by list_access or as passed to grant_access
+        :return: tuple (access_type, access_to, access_level)
+        """
+        access_type = str(rule.get("access_type")).lower()
+        access_to = str(rule.get("access_to"))
+        if access_type == "ip":
+            access_to = str(ip_network(access_to, strict=False))
+        return access_type, access_to, str(rule.get("access_level", "rw")).lower()
+
+    def wait_access(self, share_id, granted=None, revoked=None, timeout=300, interval=2, max_interval=10):
+        """Wait granted access rules become active and revoked access rules are removed. Every poll lists all the
+        access rules of the share with a single request.
+
+        :param share_id: share id
+        :param granted: list of granted access rule ids [optional]
+        :param revoked: list of revoked access rule ids [optional]
+        :param timeout: timeout in seconds [default=300]
+        :param interval: min poll interval in seconds [default=2]
+        :param max_interval: max poll interval in seconds. Interval is doubled at every poll [default=10]
+        :return: dict with the final state of every granted rule. Ex. {<access id>: 'active', ..}
+        :raise OpenstackError:
+        """
+        granted = set(granted or [])
+        revoked = set(revoked or [])
+        states = {}
+        start = time()
+        delay = interval
+        while True:
+            rules = {rule["id"]: rule for rule in self.list_access(share_id)}
+            for access_id in list(granted):
+                state = rules.get(access_id, {}).get("state", None)
+                if state in ["active", "error"]:
+                    states[access_id] = state
+                    granted.discard(access_id)
+            revoked = set([access_id for access_id in revoked if access_id in rules])
+            if len(granted) == 0 and len(revoked) == 0:
+                return states
+            if time() - start > timeout:
+                raise OpenstackError(
+                    "Share %s access rules %s are not ready after %ss" % (share_id, list(granted | revoked), timeout),
+                    408,
+                )
+            sleep(delay)
+            delay = min(delay * 2, max_interval)
+
+    @setup_client
+    def sync_access(self, share_id, desired_rules, concurrency=8, wait=True, timeout=300):
+        """Make share access rules equal to desired rules. Current rules are listed once and compared with the desired
+        rules by (access_type, access_to, access_level). Missing rules are granted and rules not desired are revoked
+        concurrently. Then all the changed rules are waited with one list request for every poll. When only the access
+        level of a rule changes, the old rule is revoked and its removal is waited before the new rule is granted,
+        because manila does not grant access to the same access_to twice.
+
+        :param share_id: share id
+        :param desired_rules: list of dict with access_type, access_to and access_level [default=rw]. Ex.
+            [{'access_type': 'ip', 'access_to': '10.102.0.0/24', 'access_level': 'rw'}, ..]
+        :param concurrency: max number of grant and revoke requests sent in parallel [default=8]
+        :param wait: if True wait granted rules are active and revoked rules are removed [default=True]
+        :param timeout: wait timeout in seconds [default=300]
+        :return: dict like
+
+            {'granted': [{..}, ..],
+             'revoked': [<access id>, ..],
+             'unchanged': 4,
+             'errors': [{'rule': {..}, 'error': ..}, ..]}
+
+        :raise OpenstackError:
+        """
+        current_idx = {self.access_key(rule): rule for rule in self.list_access(share_id)}
+        desired_idx = {}
+        for rule in desired_rules:
+            desired_idx.setdefault(self.access_key(rule), rule)
+
+        grant = [desired_idx[key] for key in desired_idx if key not in current_idx]
+        revoke = [current_idx[key] for key in current_idx if key not in desired_idx]
+        self.logger.debug(
+            "Sync openstack manila share %s access: %s to grant, %s to revoke" % (share_id, len(grant), len(revoke))
+        )
+
+        def apply(task):
+            action, rule = task
+            try:
+                if action == "grant":
+                    access = self.grant_access(
+                        share_id, rule.get("access_level", "rw"), rule["access_type"], rule["access_to"]
+                    )
+                    return action, rule, access, None
+                self.revoke_access(share_id, rule["id"])
+                return action, rule, None, None
+            except OpenstackError as ex:
+                return action, rule, None, str(ex)
+
+        res = {"granted": [], "revoked": [], "unchanged": len(current_idx) - len(revoke), "errors": []}
+
+        def run(tasks):
+            for action, rule, access, error in concurrent_map(apply, tasks, concurrency):
+                if error is not None:
+                    res["errors"].append({"rule": rule, "error": error})
+                elif action == "grant":
+                    res["granted"].append(access)
+                else:
+                    res["revoked"].append(rule["id"])
+
+        # rules that change only access level are granted after the old rule is removed
+        revoked_targets = {self.access_key(rule)[:2]: rule["id"] for rule in revoke}
+        regrant = [rule for rule in grant if self.access_key(rule)[:2] in revoked_targets]
+        grant = [rule for rule in grant if self.access_key(rule)[:2] not in revoked_targets]
+
+        run([("revoke", rule) for rule in revoke] + [("grant", rule) for rule in grant])
+
+        if len(regrant) > 0:
+            old_ids = [revoked_targets[self.access_key(rule)[:2]] for rule in regrant]
+            self.wait_access(share_id, revoked=[oid for oid in old_ids if oid in res["revoked"]], timeout=timeout)
+            tasks = []
+            for rule, old_id in zip(regrant, old_ids):
+                if old_id in res["revoked"]:
+                    tasks.append(("grant", rule))
+                else:
+                    res["errors"].append({"rule": rule, "error": "access rule %s was not revoked" % old_id})
+            run(tasks)
+
+        # rules in error state are reported, not granted again
+        for rule in current_idx.values():
+            if rule.get("state") == "error" and self.access_key(rule) in desired_idx:
+                res["errors"].append({"rule": rule, "error": "access rule is in error state"})
+
+        if wait is True and len(res["granted"]) + len(res["revoked"]) > 0:
+            granted = [access["id"] for access in res["granted"]]
+            states = self.wait_access(share_id, granted=granted, revoked=res["revoked"], timeout=timeout)
+            for access in res["granted"]:
+                access["state"] = states.get(access["id"], access.get("state"))
+                if access["state"] == "error":
+                    res["errors"].append({"rule": access, "error": "access rule is in error state"})
+        return res
+
     @setup_client
     def reset_status(self, share_id, status):
         """Administrator only. Explicitly updates the state of a share.
@@ -583,7 +725,7 @@ class OpenstackManilaShareSnapshot(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, details=False, **kwargs):
@@ -771,7 +913,7 @@ class OpenstackManilaShareType(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, default=False, desc=None):
@@ -1058,7 +1200,7 @@ class OpenstackManilaStoragePool(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, details=False, **kwargs):
@@ -1120,7 +1262,7 @@ class OpenstackManilaQuotaSet(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def get_default(self, tenant_id, **kwargs):
@@ -1276,7 +1418,7 @@ class OpenstackManilaShareNetwork(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, details=False, **kwargs):
@@ -1437,7 +1579,7 @@ class OpenstackManilaSecurityService(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, details=False, **kwargs):
@@ -1664,7 +1806,7 @@ class OpenstackManilaShareServer(OpenstackManilaObject):
     def __init__(self, manila):
         OpenstackManilaObject.__init__(self, manila.manager)
 
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
     @setup_client
     def list(self, **kwargs):
@@ -9,7 +9,7 @@ from beedrones.openstack.client import OpenstackClient, OpenstackObject, setup_c
 class OpenstackMasakariObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("masakari")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackMasakari(OpenstackMasakariObject):
@@ -6,6 +6,7 @@ from beecell.simple import jsonDumps
 
 import re
 from copy import deepcopy
+from ipaddress import ip_network
 
 import ujson as json
 from beecell.simple import truncate, set_request_params
@@ -13,6 +14,7 @@ from six.moves.urllib.parse import urlencode
 from beedrones.openstack.client import (
     OpenstackClient,
     OpenstackError,
+    OpenstackNotFound,
     OpenstackObject,
     setup_client,
 )
@@ -21,7 +23,88 @@ from beedrones.openstack.client import (
 class OpenstackNetworkObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("neutron")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
+
+    def _list(self, resource, query, fields=None, limit=None, marker=None, page_size=None):
+        """Send neutron list request with fields projection and marker pagination
+
+        :param resource: resource collection. Ex. ports, security-groups
+        :param query: list of (key, value) filters. A list value is sent as repeated filter
+        :param fields: list of fields returned for every item. Ex. ['id', 'fixed_ips', 'device_id'] [optional]
+        :param limit: page size of a single page request [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the items are requested one page at a time using marker pagination [optional]
+        :return: list of items
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        query = list(query)
+        if page_size is not None:
+            limit = page_size
+        if fields is not None:
+            fields = list(fields)
+            # marker pagination needs item id
+            if limit is not None and "id" not in fields:
+                fields.append("id")
+            query.append(("fields", fields))
+        if limit is not None:
+            query.append(("limit", limit))
+
+        key = resource.replace("-", "_")
+        items = []
+        while True:
+            page_query = list(query)
+            if marker is not None:
+                page_query.append(("marker", marker))
+            path = "%s/%s?%s" % (self.ver, resource, urlencode(page_query, doseq=True))
+            res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
+            page = res[0][key]
+            items.extend(page)
+            # page size can be capped by neutron pagination_max_limit. Stop only on an empty page
+            if page_size is None or len(page) == 0:
+                break
+            marker = page[-1]["id"]
+        return items
+
+    def _create_many(self, resource, bodies, chunk_size=100, create=None):
+        """Create many items with neutron bulk create. Items are sent in chunks of chunk_size items. Bulk create is
+        atomic: when a chunk fails none of its items is created. Items of a failed chunk are created one at a time
+        with create, if set, to get the result of every item.
+
+        :param resource: resource collection. Ex. ports, security-group-rules
+        :param bodies: list of item bodies
+        :param chunk_size: max number of items sent in a single request [default=100]
+        :param create: function used to create a single item of a failed chunk. It receives the item index [optional]
+        :return: list of results in the same order of bodies. Ex.
+            [{'index': 0, 'created': True, 'item': {..}, 'error': None},
+             {'index': 1, 'created': False, 'item': None, 'error': 'Security group rule already exists..'}]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        key = resource.replace("-", "_")
+        path = "%s/%s" % (self.ver, resource)
+        results = []
+        for start in range(0, len(bodies), chunk_size):
+            chunk = bodies[start : start + chunk_size]
+            try:
+                res = self.client.call(path, "POST", data=jsonDumps({key: chunk}), token=self.manager.identity.token)
+                for index, item in enumerate(res[0][key], start):
+                    results.append({"index": index, "created": True, "item": item, "error": None})
+                continue
+            except OpenstackError as ex:
+                self.logger.warning("Bulk create openstack %s %s-%s failed: %s" % (key, start, start + len(chunk), ex))
+                error = ex
+
+            for index in range(start, start + len(chunk)):
+                result = {"index": index, "created": False, "item": None, "error": str(error)}
+                if create is not None:
+                    try:
+                        result.update({"created": True, "item": create(index), "error": None})
+                    except OpenstackError as ex:
+                        result["error"] = str(ex)
+                results.append(result)
+
+        created = len([r for r in results if r["created"] is True])
+        self.logger.debug("Bulk create openstack %s: %s created, %s failed" % (key, created, len(results) - created))
+        return results
 
 
 class OpenstackNetwork(OpenstackNetworkObject):
@@ -50,6 +133,9 @@ class OpenstackNetwork(OpenstackNetworkObject):
         network_type=None,
         external=None,
         physical_network=None,
+        fields=None,
+        page_size=None,
+        **filters,
     ):
         """list network
 
@@ -82,6 +168,11 @@ class OpenstackNetwork(OpenstackNetworkObject):
                                  networks. For example, the Open vSwitch plug-in
                                  configuration file defines a symbolic name
                                  that maps to specific bridges on each Compute host.
+        :param fields: list of fields returned for every network. Ex. ['id', 'name'] [optional]
+        :param page_size: if set all the networks are requested one page at a time using marker pagination
+            [optional]
+        :param filters: other neutron filters passed as they are. Ex. status='ACTIVE', name=['net1', 'net2']
+            [optional]
         :return: Ex.
 
             [{'admin_state_up': True,
@@ -100,14 +191,9 @@ class OpenstackNetwork(OpenstackNetworkObject):
 
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
-        path = "%s/networks" % self.ver
         query = {}
         if tenant is not None:
             query["tenant_id"] = tenant
-        if limit is not None:
-            query["limit"] = limit
-        if marker is not None:
-            query["marker"] = marker
         if segmentation_id is not None:
             query["provider:segmentation_id"] = segmentation_id
         if network_type is not None:
@@ -118,19 +204,13 @@ class OpenstackNetwork(OpenstackNetworkObject):
             query["shared"] = shared
         if physical_network is not None:
             query["provider:physical_network"] = physical_network
-
-        path = "%s?%s" % (path, urlencode(query))
+        query.update(filters)
 
         # get tenant network
-        net = self.client.call(path, "GET", data="", token=self.manager.identity.token)
-
-        res = net[0]["networks"]
+        res = self._list("networks", query.items(), fields=fields, limit=limit, marker=marker, page_size=page_size)
         if tenant is not None:
             # get shared network
-            path = "%s/networks?%s" % (self.ver, urlencode({"shared": True}))
-            shared = self.client.call(path, "GET", data="", token=self.manager.identity.token)
-            if len(shared) > 0:
-                res.extend(shared[0]["networks"])
+            res.extend(self._list("networks", [("shared", True)], fields=fields, page_size=page_size))
         self.logger.debug("Get openstack networks: %s" % truncate(res))
         return res
 
@@ -172,6 +252,41 @@ class OpenstackNetwork(OpenstackNetworkObject):
 
         return server
 
+    def __data(
+        self,
+        name,
+        tenant_id,
+        physical_network,
+        shared=False,
+        qos_policy_id=None,
+        external=False,
+        segments=None,
+        network_type="vlan",
+        segmentation_id=None,
+        mtu=1450,
+    ):
+        """Get network create body. Params are the same of create"""
+        data = {
+            "name": name,
+            "tenant_id": tenant_id,
+            "admin_state_up": True,
+            "port_security_enabled": True,
+            "shared": shared,
+            "router:external": external,
+            "provider:network_type": network_type,
+            "mtu": mtu,
+        }
+
+        if physical_network is not None:
+            data["provider:physical_network"] = physical_network
+        if qos_policy_id is not None:
+            data["qos_policy_id"] = qos_policy_id
+        if segments is not None:
+            data["segments"] = segments
+        if segmentation_id is not None:
+            data["provider:segmentation_id"] = segmentation_id
+        return data
+
     @setup_client
     def create(
         self,
@@ -212,32 +327,42 @@ class OpenstackNetwork(OpenstackNetworkObject):
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
         data = {
-            "network": {
-                "name": name,
-                "tenant_id": tenant_id,
-                "admin_state_up": True,
-                "port_security_enabled": True,
-                "shared": shared,
-                "router:external": external,
-                "provider:network_type": network_type,
-                "mtu": mtu,
-            }
+            "network": self.__data(
+                name,
+                tenant_id,
+                physical_network,
+                shared,
+                qos_policy_id,
+                external,
+                segments,
+                network_type,
+                segmentation_id,
+                mtu,
+            )
         }
 
-        if physical_network is not None:
-            data["network"]["provider:physical_network"] = physical_network
-        if qos_policy_id is not None:
-            data["network"]["qos_policy_id"] = qos_policy_id
-        if segments is not None:
-            data["network"]["segments"] = segments
-        if segmentation_id is not None:
-            data["network"]["provider:segmentation_id"] = segmentation_id
-
         path = "%s/networks" % self.ver
         res = self.client.call(path, "POST", data=jsonDumps(data), token=self.manager.identity.token)
         self.logger.debug("Create openstack network: %s" % truncate(res[0]))
         return res[0]["network"]
 
+    @setup_client
+    def create_many(self, networks, chunk_size=100):
+        """Create many networks with a bulk create request for every chunk of networks. When a chunk fails its
+        networks are created one at a time.
+
+        :param networks: list of dict with the params of create. Ex.
+            [{'name': .., 'tenant_id': .., 'physical_network': ..}, ..]
+        :param chunk_size: max number of networks created with a single request [default=100]
+        :return: list of results in the same order of networks. Ex.
+            [{'index': 0, 'created': True, 'item': {..}, 'error': None}, ..]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        bodies = [self.__data(**item) for item in networks]
+        return self._create_many(
+            "networks", bodies, chunk_size=chunk_size, create=lambda index: self.create(**networks[index])
+        )
+
     @setup_client
     def update(self, oid, name=None, shared=None, qos_policy_id=None, external=None, mtu=None):
         """Updates a network.
@@ -351,13 +476,29 @@ class OpenstackSubnet(OpenstackNetworkObject):
         self.ver = network.ver
 
     @setup_client
-    def list(self, tenant=None, network=None, gateway_ip=None, cidr=None):
+    def list(
+        self,
+        tenant=None,
+        network=None,
+        gateway_ip=None,
+        cidr=None,
+        fields=None,
+        limit=None,
+        marker=None,
+        page_size=None,
+        **filters,
+    ):
         """Lists subnets to which the tenant has access.
 
         :param tenant: tenant id
         :param network: The ID of the attached network.
         :param gateway_ip : The gateway IP address.
         :param cidr: The CIDR.
+        :param fields: list of fields returned for every subnet. Ex. ['id', 'cidr'] [optional]
+        :param limit: Requests a page size of items [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the subnets are requested one page at a time using marker pagination [optional]
+        :param filters: other neutron filters passed as they are. Ex. ip_version=4 [optional]
         :return: Ex.
             [{'allocation_pools': [{'end': '172.25.4.250', 'start': '172.25.4.201'}],
               'cidr': '172.25.4.0/24',
@@ -377,8 +518,6 @@ class OpenstackSubnet(OpenstackNetworkObject):
              ]
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
-        path = "%s/subnets" % self.ver
-
         query = {}
         if tenant is not None:
             query["tenant_id"] = tenant
@@ -388,11 +527,11 @@ class OpenstackSubnet(OpenstackNetworkObject):
             query["gateway_ip"] = gateway_ip
         if cidr is not None:
             query["cidr"] = cidr
-        path = "%s?%s" % (path, urlencode(query))
+        query.update(filters)
 
-        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
-        self.logger.debug("Get openstack subnets: %s" % truncate(res[0]))
-        return res[0]["subnets"]
+        res = self._list("subnets", query.items(), fields=fields, limit=limit, marker=marker, page_size=page_size)
+        self.logger.debug("Get openstack subnets: %s" % truncate(res))
+        return res
 
     @setup_client
     def get(self, oid=None, name=None):
@@ -433,6 +572,40 @@ class OpenstackSubnet(OpenstackNetworkObject):
 
         return server
 
+    def __data(
+        self,
+        name,
+        network_id,
+        tenant_id,
+        gateway_ip,
+        cidr,
+        allocation_pools=None,
+        enable_dhcp=True,
+        host_routes=None,
+        dns_nameservers=["8.8.8.7", "8.8.8.8"],
+        service_types=None,
+    ):
+        """Get subnet create body. Params are the same of create"""
+        data = {
+            "name": name,
+            "network_id": network_id,
+            "tenant_id": tenant_id,
+            "ip_version": 4,
+            "cidr": cidr,
+            "gateway_ip": gateway_ip,
+        }
+        if allocation_pools is not None:
+            data["allocation_pools"] = allocation_pools
+        if host_routes is not None:
+            data["host_routes"] = host_routes
+        if enable_dhcp is not None:
+            data["enable_dhcp"] = enable_dhcp
+        if dns_nameservers is not None:
+            data["dns_nameservers"] = dns_nameservers
+        if service_types is not None:
+            data["service_types"] = service_types
+        return data
+
     @setup_client
     def create(
         self,
@@ -497,31 +670,42 @@ class OpenstackSubnet(OpenstackNetworkObject):
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
         data = {
-            "subnet": {
-                "name": name,
-                "network_id": network_id,
-                "tenant_id": tenant_id,
-                "ip_version": 4,
-                "cidr": cidr,
-                "gateway_ip": gateway_ip,
-            }
+            "subnet": self.__data(
+                name,
+                network_id,
+                tenant_id,
+                gateway_ip,
+                cidr,
+                allocation_pools,
+                enable_dhcp,
+                host_routes,
+                dns_nameservers,
+                service_types,
+            )
         }
-        if allocation_pools is not None:
-            data["subnet"]["allocation_pools"] = allocation_pools
-        if host_routes is not None:
-            data["subnet"]["host_routes"] = host_routes
-        if enable_dhcp is not None:
-            data["subnet"]["enable_dhcp"] = enable_dhcp
-        if dns_nameservers is not None:
-            data["subnet"]["dns_nameservers"] = dns_nameservers
-        if service_types is not None:
-            data["subnet"]["service_types"] = service_types
 
         path = "%s/subnets" % self.ver
         res = self.client.call(path, "POST", data=jsonDumps(data), token=self.manager.identity.token)
         self.logger.debug("Create openstack subnet: %s" % truncate(res[0]))
         return res[0]["subnet"]
 
+    @setup_client
+    def create_many(self, subnets, chunk_size=100):
+        """Create many subnets with a bulk create request for every chunk of subnets. When a chunk fails its subnets
+        are created one at a time.
+
+        :param subnets: list of dict with the params of create. Ex.
+            [{'name': .., 'network_id': .., 'tenant_id': .., 'gateway_ip': .., 'cidr': ..}, ..]
+        :param chunk_size: max number of subnets created with a single request [default=100]
+        :return: list of results in the same order of subnets. Ex.
+            [{'index': 0, 'created': True, 'item': {..}, 'error': None}, ..]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        bodies = [self.__data(**item) for item in subnets]
+        return self._create_many(
+            "subnets", bodies, chunk_size=chunk_size, create=lambda index: self.create(**subnets[index])
+        )
+
     @setup_client
     def update(
         self,
@@ -640,6 +824,11 @@ class OpenstackPort(OpenstackNetworkObject):
         security_group=None,
         subnet_id=None,
         ip_address=None,
+        fields=None,
+        limit=None,
+        marker=None,
+        page_size=None,
+        **filters,
     ):
         """Lists ports to which the tenant has access.
 
@@ -653,6 +842,12 @@ class OpenstackPort(OpenstackNetworkObject):
         :param security_groups: The UUIDs of any attached security groups.
         :param ip_address: port ip address
         :param subnet_id: port subnet id
+        :param fields: list of fields returned for every port. Ex. ['id', 'fixed_ips', 'device_id'] [optional]
+        :param limit: Requests a page size of items [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the ports are requested one page at a time using marker pagination [optional]
+        :param filters: other neutron filters passed as they are. Ex. mac_address='fa:16:3e:07:ae:72',
+            device_id=['id1', 'id2'] [optional]
         :return: Ex.
             [{'admin_state_up': True,
               'allowed_address_pairs': [],
@@ -679,8 +874,6 @@ class OpenstackPort(OpenstackNetworkObject):
             ]
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
-        path = "%s/ports" % self.ver
-
         query = {}
         if tenant is not None:
             query["tenant_id"] = tenant
@@ -690,20 +883,25 @@ class OpenstackPort(OpenstackNetworkObject):
             query["status"] = status
         if device_id is not None:
             query["device_id"] = device_id
+        if device_owner is not None:
+            query["device_owner"] = device_owner
         if ip_address is not None:
             query["fixed_ips"] = "ip_address_substr=%s" % ip_address
         if subnet_id is not None:
             query["fixed_ips"] = "subnet_id=%s" % subnet_id
-        path = "%s?%s" % (path, urlencode(query))
-        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
+        query.update(filters)
+
+        if security_group is not None and fields is not None and "security_groups" not in fields:
+            fields = list(fields) + ["security_groups"]
+        res = self._list("ports", query.items(), fields=fields, limit=limit, marker=marker, page_size=page_size)
 
         resp = []
         if security_group is not None:
-            for item in res[0]["ports"]:
+            for item in res:
                 if security_group in item.get("security_groups", []):
                     resp.append(item)
         else:
-            resp = res[0]["ports"]
+            resp = res
 
         self.logger.debug("Get openstack ports: %s" % truncate(resp))
         return resp
@@ -757,6 +955,43 @@ class OpenstackPort(OpenstackNetworkObject):
 
         return server
 
+    def __data(
+        self,
+        name,
+        network_id,
+        fixed_ips,
+        host_id=None,
+        profile=None,
+        vnic_type=None,
+        device_owner=None,
+        device_id=None,
+        security_groups=None,
+        mac_address=None,
+        tenant_id=None,
+        allowed_address_pairs=None,
+    ):
+        """Get port create body. Params are the same of create"""
+        data = {"network_id": network_id, "name": name, "admin_state_up": True}
+        if fixed_ips is not None:
+            data["fixed_ips"] = fixed_ips
+        if tenant_id is not None:
+            data["tenant_id"] = tenant_id
+        if host_id is not None:
+            data["binding:host_id"] = host_id
+        if profile is not None:
+            data["binding:profile"] = profile
+        if host_id is not None:
+            data["binding:vnic_type"] = vnic_type
+        if device_owner is not None:
+            data["device_owner"] = device_owner
+        if device_id is not None:
+            data["device_id"] = device_id
+        if security_groups is not None:
+            data["security_groups"] = security_groups
+        if allowed_address_pairs is not None:
+            data["allowed_address_pairs"] = allowed_address_pairs
+        return data
+
     @setup_client
     def create(
         self,
@@ -809,31 +1044,45 @@ class OpenstackPort(OpenstackNetworkObject):
         :return: port data
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
-        data = {"port": {"network_id": network_id, "name": name, "admin_state_up": True}}
-        if fixed_ips is not None:
-            data["port"]["fixed_ips"] = fixed_ips
-        if tenant_id is not None:
-            data["port"]["tenant_id"] = tenant_id
-        if host_id is not None:
-            data["port"]["binding:host_id"] = host_id
-        if profile is not None:
-            data["port"]["binding:profile"] = profile
-        if host_id is not None:
-            data["port"]["binding:vnic_type"] = vnic_type
-        if device_owner is not None:
-            data["port"]["device_owner"] = device_owner
-        if device_id is not None:
-            data["port"]["device_id"] = device_id
-        if security_groups is not None:
-            data["port"]["security_groups"] = security_groups
-        if allowed_address_pairs is not None:
-            data["port"]["allowed_address_pairs"] = allowed_address_pairs
+        data = {
+            "port": self.__data(
+                name,
+                network_id,
+                fixed_ips,
+                host_id,
+                profile,
+                vnic_type,
+                device_owner,
+                device_id,
+                security_groups,
+                mac_address,
+                tenant_id,
+                allowed_address_pairs,
+            )
+        }
 
         path = "%s/ports" % self.ver
         res = self.client.call(path, "POST", data=jsonDumps(data), token=self.manager.identity.token)
         self.logger.debug("Create openstack port: %s" % truncate(res[0]))
         return res[0]["port"]
 
+    @setup_client
+    def create_many(self, ports, chunk_size=100):
+        """Create many ports with a bulk create request for every chunk of ports. When a chunk fails its ports
+        are created one at a time.
+
+        :param ports: list of dict with the params of create. Ex.
+            [{'name': .., 'network_id': .., 'fixed_ips': [..]}, ..]
+        :param chunk_size: max number of ports created with a single request [default=100]
+        :return: list of results in the same order of ports. Ex.
+            [{'index': 0, 'created': True, 'item': {..}, 'error': None}, ..]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        bodies = [self.__data(**item) for item in ports]
+        return self._create_many(
+            "ports", bodies, chunk_size=chunk_size, create=lambda index: self.create(**ports[index])
+        )
+
     @setup_client
     def update(
         self,
@@ -1027,9 +1276,18 @@ class OpenstackFloatingIp(OpenstackNetworkObject):
         return res[0]['fixed_ip']'''
 
     @setup_client
-    def list(self):
+    def list(self, tenant=None, fields=None, limit=None, marker=None, page_size=None, **filters):
         """Lists floating IP addresses associated with the tenant.
 
+        :param tenant: tenant id [optional]
+        :param fields: list of fields returned for every floating ip. Ex. ['id', 'floating_ip_address', 'port_id']
+            [optional]
+        :param limit: Requests a page size of items [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the floating ips are requested one page at a time using marker pagination
+            [optional]
+        :param filters: other neutron filters passed as they are. Ex. port_id='ba315146-..', status='ACTIVE'
+            [optional]
         :return: Ex:
             [{'fixed_ip_address': '192.168.90.175',
               'floating_ip_address': '194.116.110.171',
@@ -1042,10 +1300,14 @@ class OpenstackFloatingIp(OpenstackNetworkObject):
             ]
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
-        path = "%s/floatingips" % self.ver
-        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
-        self.logger.debug("List openstack floating ips: %s" % (truncate(res[0])))
-        return res[0]["floatingips"]
+        query = {}
+        if tenant is not None:
+            query["tenant_id"] = tenant
+        query.update(filters)
+
+        res = self._list("floatingips", query.items(), fields=fields, limit=limit, marker=marker, page_size=page_size)
+        self.logger.debug("List openstack floating ips: %s" % (truncate(res)))
+        return res
 
     @setup_client
     def get(self, oid):
@@ -1156,9 +1418,16 @@ class OpenstackRouter(OpenstackNetworkObject):
         self.ver = network.ver
 
     @setup_client
-    def list(self, tenant_id=None):
+    def list(self, tenant_id=None, fields=None, limit=None, marker=None, page_size=None, **filters):
         """List routers.
 
+        :param tenant_id: tenant id [optional]
+        :param fields: list of fields returned for every router. Ex. ['id', 'name', 'external_gateway_info']
+            [optional]
+        :param limit: Requests a page size of items [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the routers are requested one page at a time using marker pagination [optional]
+        :param filters: other neutron filters passed as they are. Ex. name='router01' [optional]
         :return: Ex.
             [...,
              {'admin_state_up': True,
@@ -1180,12 +1449,11 @@ class OpenstackRouter(OpenstackNetworkObject):
         query = {}
         if tenant_id is not None:
             query["tenant_id"] = tenant_id
+        query.update(filters)
 
-        path = "%s/routers?%s" % (self.ver, urlencode(query))
-
-        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
-        self.logger.debug("Get openstack routers: %s" % truncate(res[0]))
-        return res[0]["routers"]
+        res = self._list("routers", query.items(), fields=fields, limit=limit, marker=marker, page_size=page_size)
+        self.logger.debug("Get openstack routers: %s" % truncate(res))
+        return res
 
     @setup_client
     def get(self, oid=None):
@@ -1473,6 +1741,33 @@ class OpenstackRouter(OpenstackNetworkObject):
 class OpenstackSecurityGroup(OpenstackNetworkObject):
     """ """
 
+    # protocol names accepted by neutron and their ip protocol number
+    protocols = {
+        "ah": "51",
+        "dccp": "33",
+        "egp": "8",
+        "esp": "50",
+        "gre": "47",
+        "icmp": "1",
+        "icmpv6": "58",
+        "igmp": "2",
+        "ipip": "4",
+        "ipv6-encap": "41",
+        "ipv6-frag": "44",
+        "ipv6-icmp": "58",
+        "ipv6-nonxt": "59",
+        "ipv6-opts": "60",
+        "ipv6-route": "43",
+        "ospf": "89",
+        "pgm": "113",
+        "rsvp": "46",
+        "sctp": "132",
+        "tcp": "6",
+        "udp": "17",
+        "udplite": "136",
+        "vrrp": "112",
+    }
+
     def __init__(self, network):
         OpenstackNetworkObject.__init__(self, network.manager)
 
@@ -1492,22 +1787,28 @@ class OpenstackSecurityGroup(OpenstackNetworkObject):
         return res[0]
 
     @setup_client
-    def list(self, detail=False, tenant=None):
-        """List flavors
+    def list(self, detail=False, tenant=None, fields=None, limit=None, marker=None, page_size=None, **filters):
+        """List security groups
 
         :param tenant: tenant id
+        :param fields: list of fields returned for every security group. Ex. ['id', 'name'] [optional]
+        :param limit: Requests a page size of items [optional]
+        :param marker: The ID of the last-seen item [optional]
+        :param page_size: if set all the security groups are requested one page at a time using marker pagination
+            [optional]
+        :param filters: other neutron filters passed as they are. Ex. name='default' [optional]
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
-        path = "%s/security-groups" % self.ver
-
         query = {}
         if tenant is not None:
             query["tenant_id"] = tenant
-        path = "%s?%s" % (path, urlencode(query))
+        query.update(filters)
 
-        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)
-        self.logger.debug("Get openstack security groups: %s" % truncate(res[0]))
-        return res[0]["security_groups"]
+        res = self._list(
+            "security-groups", query.items(), fields=fields, limit=limit, marker=marker, page_size=page_size
+        )
+        self.logger.debug("Get openstack security groups: %s" % truncate(res))
+        return res
 
     @setup_client
     def get(self, oid):
@@ -1590,6 +1891,40 @@ class OpenstackSecurityGroup(OpenstackNetworkObject):
         self.logger.debug("get openstack security group rule %s: %s" % (ruleid, truncate(res[0])))
         return res[0]
 
+    def __rule_data(
+        self,
+        security_group,
+        direction,
+        ethertype=None,
+        port_range_min=None,
+        port_range_max=None,
+        protocol=None,
+        remote_group_id=None,
+        remote_ip_prefix=None,
+    ):
+        """Get security group rule create body. Params are the same of create_rule. Port range and ethertype are sent
+        also when no remote is set, otherwise the rule would match every port. Ethertype not set is inferred from
+        remote ip prefix"""
+        if ethertype is None and remote_ip_prefix is not None:
+            ethertype = "IPv%s" % ip_network(str(remote_ip_prefix), strict=False).version
+        data = {
+            "direction": direction,
+            "protocol": protocol,
+            "security_group_id": security_group,
+        }
+        for key, value in [
+            ("ethertype", ethertype),
+            ("port_range_min", port_range_min),
+            ("port_range_max", port_range_max),
+        ]:
+            if value is not None:
+                data[key] = value
+        if remote_ip_prefix is not None:
+            data["remote_ip_prefix"] = remote_ip_prefix
+        elif remote_group_id is not None:
+            data["remote_group_id"] = remote_group_id
+        return data
+
     @setup_client
     def create_rule(
         self,
@@ -1639,30 +1974,17 @@ class OpenstackSecurityGroup(OpenstackNetworkObject):
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
         data = {
-            "security_group_rule": {
-                "direction": direction,
-                "protocol": protocol,
-                "security_group_id": security_group,
-            }
-        }
-        if remote_ip_prefix is not None:
-            data["security_group_rule"].update(
-                {
-                    "port_range_min": port_range_min,
-                    "port_range_max": port_range_max,
-                    "ethertype": ethertype,
-                    "remote_ip_prefix": remote_ip_prefix,
-                }
-            )
-        elif remote_group_id is not None:
-            data["security_group_rule"].update(
-                {
-                    "port_range_min": port_range_min,
-                    "port_range_max": port_range_max,
-                    "ethertype": ethertype,
-                    "remote_group_id": remote_group_id,
-                }
+            "security_group_rule": self.__rule_data(
+                security_group,
+                direction,
+                ethertype,
+                port_range_min,
+                port_range_max,
+                protocol,
+                remote_group_id,
+                remote_ip_prefix,
             )
+        }
 
         def resolve_conflicts(res):
             # NeutronError - Security group rule already exists. Rule id is 6ef5ab8c-f550-4b15-ac0c-4b99a7003280.
@@ -1695,6 +2017,23 @@ class OpenstackSecurityGroup(OpenstackNetworkObject):
         self.logger.debug("Create openstack security group %s rule: %s" % (security_group, truncate(res[0])))
         return res[0]["security_group_rule"]
 
+    @setup_client
+    def create_many(self, rules, chunk_size=100):
+        """Create many security group rules with a bulk create request for every chunk of rules. When a chunk fails
+        its rules are created one at a time with create_rule, that resolves already existing rules.
+
+        :param rules: list of dict with the params of create_rule. Ex.
+            [{'security_group': .., 'direction': 'ingress', 'protocol': 'tcp', 'port_range_min': 22, ..}, ..]
+        :param chunk_size: max number of security group rules created with a single request [default=100]
+        :return: list of results in the same order of rules. Ex.
+            [{'index': 0, 'created': True, 'item': {..}, 'error': None}, ..]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        bodies = [self.__rule_data(**item) for item in rules]
+        return self._create_many(
+            "security-group-rules", bodies, chunk_size=chunk_size, create=lambda index: self.create_rule(**rules[index])
+        )
+
     @setup_client
     def delete_rule(self, ruleid):
         """Remove a security group rule
@@ -1707,6 +2046,121 @@ class OpenstackSecurityGroup(OpenstackNetworkObject):
         self.logger.debug("Delete openstack security group rule %s: %s" % (ruleid, truncate(res[0])))
         return res[0]
 
+    @staticmethod
+    def rule_key(rule):
+        """Get a hashable key of a security group rule. Rules with the same key allow the same traffic.
+
+        :param rule: security group rule as returned by neutron or as sent to create
+        :return: tuple (direction, ethertype, protocol, port_range_min, port_range_max, remote_ip_prefix,
+            remote_group_id)
+        """
+        # ethertype not set is inferred from remote ip prefix like neutron does
+        ethertype = rule.get("ethertype")
+        if ethertype is None and rule.get("remote_ip_prefix") is not None:
+            ethertype = "IPv%s" % ip_network(str(rule.get("remote_ip_prefix")), strict=False).version
+        ethertype = ethertype or "IPv4"
+
+        # protocol names are compared as numbers. icmp is ipv6-icmp in IPv6 rules
+        protocol = rule.get("protocol")
+        if protocol is not None:
+            protocol = str(protocol).lower()
+            protocol = OpenstackSecurityGroup.protocols.get(protocol, protocol)
+            if protocol in ["any", "0"]:
+                protocol = None
+            elif protocol == "1" and ethertype == "IPv6":
+                protocol = "58"
+        port_range_min = rule.get("port_range_min")
+        port_range_max = rule.get("port_range_max")
+        if port_range_min is not None:
+            port_range_min = int(port_range_min)
+        if port_range_max is not None:
+            port_range_max = int(port_range_max)
+
+        # 0.0.0.0/0 and ::/0 match every remote like an empty remote_ip_prefix
+        remote_ip_prefix = rule.get("remote_ip_prefix")
+        if remote_ip_prefix is not None:
+            network = ip_network(str(remote_ip_prefix), strict=False)
+            remote_ip_prefix = None if network.prefixlen == 0 else str(network)
+
+        # remote_group_id is not sent when remote_ip_prefix is set
+        remote_group_id = rule.get("remote_group_id")
+        if rule.get("remote_ip_prefix") is not None:
+            remote_group_id = None
+
+        return (
+            rule.get("direction"),
+            ethertype,
+            protocol,
+            port_range_min,
+            port_range_max,
+            remote_ip_prefix,
+            remote_group_id,
+        )
+
+    @setup_client
+    def reconcile(self, security_group_id, desired_rules, chunk_size=100, dry_run=False):
+        """Make security group rules equal to desired rules. Current rules are requested once and compared with the
+        desired rules using rule_key. Only missing rules are created, with a bulk create, and only rules not desired
+        are deleted. Missing rules are created before deleting the others so allowed traffic is never interrupted.
+
+        :param security_group_id: security group id
+        :param desired_rules: list of dict with the params of create_rule except security_group. Ex.
+            [{'direction': 'ingress', 'ethertype': 'IPv4', 'protocol': 'tcp', 'port_range_min': 22,
+              'port_range_max': 22, 'remote_ip_prefix': '10.0.0.0/24'}, ..]
+        :param chunk_size: max number of rules created with a single request [default=100]
+        :param dry_run: if True return the changes without applying them [default=False]
+        :return: dict like
+
+            {'add': [{..}, ..],
+             'remove': [{..}, ..],
+             'unchanged': 10,
+             'created': [{'index': 0, 'created': True, 'item': {..}, 'error': None}, ..],
+             'deleted': [{'id': .., 'deleted': True, 'error': None}, ..]}
+
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        """
+        current = self._list("security-group-rules", [("security_group_id", security_group_id)])
+        current_idx = {}
+        for rule in current:
+            current_idx.setdefault(self.rule_key(rule), []).append(rule)
+
+        # index desired rules by their params normalized like neutron returns them
+        desired_idx = {}
+        for rule in desired_rules:
+            rule = dict(rule, security_group=security_group_id)
+            desired_idx.setdefault(self.rule_key(rule), rule)
+
+        add_keys = set(desired_idx.keys()) - set(current_idx.keys())
+        remove_keys = set(current_idx.keys()) - set(desired_idx.keys())
+        add = [desired_idx[key] for key in desired_idx if key in add_keys]
+        remove = [rule for key in current_idx if key in remove_keys for rule in current_idx[key]]
+        res = {
+            "add": add,
+            "remove": remove,
+            "unchanged": len(current) - len(remove),
+            "created": [],
+            "deleted": [],
+        }
+        self.logger.debug(
+            "Reconcile openstack security group %s rules: %s to add, %s to remove, %s unchanged"
+            % (security_group_id, len(add), len(remove), res["unchanged"])
+        )
+        if dry_run is True:
+            return res
+
+        if len(add) > 0:
+            res["created"] = self.create_many(add, chunk_size=chunk_size)
+        for rule in remove:
+            item = {"id": rule["id"], "deleted": True, "error": None}
+            try:
+                self.delete_rule(rule["id"])
+            except OpenstackNotFound:
+                pass
+            except OpenstackError as ex:
+                item.update({"deleted": False, "error": str(ex)})
+            res["deleted"].append(item)
+        return res
+
     #
     # actions
     #
@@ -17,29 +17,13 @@ from beedrones.openstack.client import (
 
 class OpenstackProjectObject(OpenstackObject):
     def setup(self):
-        self.client = OpenstackClient(self.manager.uri, self.manager.proxy, timeout=self.manager.timeout)
-        self.compute = OpenstackClient(
-            self.manager.endpoint("nova"),
-            self.manager.proxy,
-            timeout=self.manager.timeout,
-        )
+        self.client = self.manager.get_client(self.manager.uri)
+        self.compute = self.manager.get_client(self.manager.endpoint("nova"))
         # self.blockstore = OpenstackClient(self.manager.endpoint('cinderv2'), self.manager.proxy,
         #                                   timeout=self.manager.timeout)
-        self.blockstore = OpenstackClient(
-            self.manager.endpoint("cinderv3"),
-            self.manager.proxy,
-            timeout=self.manager.timeout,
-        )
-        self.network = OpenstackClient(
-            self.manager.endpoint("neutron"),
-            self.manager.proxy,
-            timeout=self.manager.timeout,
-        )
-        self.manila = OpenstackClient(
-            self.manager.endpoint("manilav2"),
-            self.manager.proxy,
-            timeout=self.manager.timeout,
-        )
+        self.blockstore = self.manager.get_client(self.manager.endpoint("cinderv3"))
+        self.network = self.manager.get_client(self.manager.endpoint("neutron"))
+        self.manila = self.manager.get_client(self.manager.endpoint("manilav2"))
 
 
 class OpenstackDomain(OpenstackProjectObject):
@@ -24,7 +24,7 @@ class OpenstackServerObject(OpenstackObject):
         self.uri = self.manager.endpoint("nova")
         # change version from 2 to 2.1
         self.uri = self.uri.replace("v2/", "v2.1/")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackServer(OpenstackServerObject):
@@ -64,6 +64,143 @@ class OpenstackServer(OpenstackServerObject):
     def __init__(self, manager):
         OpenstackServerObject.__init__(self, manager)
 
+    @staticmethod
+    def _list_query(
+        image=None,
+        flavor=None,
+        status=None,
+        host=None,
+        all_tenants=True,
+        name=None,
+        not_tags=None,
+        not_tags_any=None,
+        tags=None,
+        tags_any=None,
+        launched_at=None,
+        updated_at=None,
+        **kvargs,
+    ):
+        query = {}
+        if image is not None:
+            query["image"] = image
+        if flavor is not None:
+            query["flavor"] = flavor
+        if status is not None:
+            query["status"] = status
+        if host is not None:
+            query["host"] = host
+        if name is not None:
+            query["name"] = name
+        if all_tenants is True:
+            query["all_tenants"] = 1
+        if not_tags is not None:
+            query["not-tags"] = not_tags
+        if not_tags_any is not None:
+            query["not-tags-any"] = not_tags_any
+        if tags is not None:
+            query["tags"] = tags
+        if tags_any is not None:
+            query["tags-any"] = tags_any
+        if launched_at is not None:
+            query["launched_at"] = launched_at
+        if updated_at is not None:
+            query["updated_at"] = updated_at
+
+        query.update(kvargs)
+        return query
+
+    @setup_client
+    def iter_servers(
+        self,
+        detail=False,
+        page_size=1000,
+        marker=None,
+        image=None,
+        flavor=None,
+        status=None,
+        host=None,
+        all_tenants=True,
+        name=None,
+        not_tags=None,
+        not_tags_any=None,
+        tags=None,
+        tags_any=None,
+        launched_at=None,
+        updated_at=None,
+        **kvargs,
+    ):
+        """Iterate over all the servers. Servers are requested one page at a time using marker paging, so only one
+        page is kept in memory.
+
+        :param detail: if True show server details
+        :param page_size: number of servers requested for every page [default=1000]
+        :param marker: The ID of the last-seen item. Iteration starts after this server [optional]
+        :param all_tenants: if True show server fro all tenant [default=True]
+        :param image: Filters the response by an image, as a UUID.
+        :param flavor: Filters the response by a flavor, as a UUID. A flavor is a combination of memory, disk size,
+            and CPUs.
+        :param status: Filters the response by a server status, as a string. For example, ACTIVE.
+        :param host: Filters the response by a host name, as a string. This query parameter is typically available to
+            only administrative users. If you are a non-administrative user, the API ignores this parameter.
+        :param name: Filters the response by a server name, as a string. You can use regular expressions in the query.
+            For example, the ?name=bob regular expression returns both bob and bobb. If you must match on only bob, you
+            can use a regular expression that matches the syntax of the underlying database server that is implemented
+            for Compute, such as MySQL or PostgreSQL.
+        :param not_tags: (Optional) A list of tags to filter the server list by. Servers that don’t match all tags in
+            this list will be returned. Boolean expression in this case is ‘NOT (t1 AND t2)’. Tags in query must be
+            separated by comma.
+        :param not_tags_any: (Optional) A list of tags to filter the server list by. Servers that don’t match any tags
+            in this list will be returned. Boolean expression in this case is ‘NOT (t1 OR t2)’. Tags in query must be
+            separated by comma.
+        :param tags: (Optional) A list of tags to filter the server list by. Servers that match all tags in this list
+            will be returned. Boolean expression in this case is ‘t1 AND t2’. Tags in query must be separated by comma.
+        :param tags_any: (Optional) A list of tags to filter the server list by. Servers that match any tag in this
+            list will be returned. Boolean expression in this case is ‘t1 OR t2’. Tags in query must be separated by
+            comma.
+        :param launched_at: Filter the server list result by a date and time stamp when the instance was launched. The
+            date and time stamp format is ISO 8601: CCYY-MM-DDThh:mm:ss±hh:mm. For example, 2015-08-27T09:49:58-05:00
+        :param updated_at: updated at time
+        :return: generator of dict with server info
+        :raise OpenstackError: raise :class:`.OpenstackError`
+        """
+        path = "/servers"
+        if detail is True:
+            path = "/servers/detail"
+
+        query = self._list_query(
+            image=image,
+            flavor=flavor,
+            status=status,
+            host=host,
+            all_tenants=all_tenants,
+            name=name,
+            not_tags=not_tags,
+            not_tags_any=not_tags_any,
+            tags=tags,
+            tags_any=tags_any,
+            launched_at=launched_at,
+            updated_at=updated_at,
+            **kvargs,
+        )
+        query["limit"] = page_size
+        microversion = self.nova_microversion("2.60")
+
+        while True:
+            if marker is not None:
+                query["marker"] = marker
+            new_path = "%s?%s" % (path, urlencode(query))
+            res = self.client.call(
+                new_path, "GET", data="", token=self.manager.identity.token, microversion=microversion
+            )[0]
+            servers = res.get("servers", [])
+            self.logger.debug("Get openstack servers page: %s" % len(servers))
+            for server in servers:
+                yield server
+
+            if len(servers) == 0 or res.get("server_links") is None:
+                break
+            marker = servers[-1]["id"]
+
     @setup_client
     def list(
         self,
@@ -82,6 +219,7 @@ class OpenstackServer(OpenstackServerObject):
         tags_any=None,
         launched_at=None,
         updated_at=None,
+        page_size=1000,
         *args,
         **kvargs,
     ):
@@ -96,7 +234,7 @@ class OpenstackServer(OpenstackServerObject):
             only administrative users. If you are a non-administrative user, the API ignores this parameter.
         :param limit: Requests a page size of items. Returns a number of items up to a limit value. Use the limit
             parameter to make an initial limited request and use the ID of the last-seen item from the response as the
-            marker parameter value in a subsequent limited request.
+            marker parameter value in a subsequent limited request. If not set all the servers are returned.
         :param marker: The ID of the last-seen item. Use the limit parameter to make an initial limited request and use
             the ID of the last-seen item from the response as the marker parameter value in a subsequent limited
             request.
@@ -118,58 +256,61 @@ class OpenstackServer(OpenstackServerObject):
         :param launched_at: Filter the server list result by a date and time stamp when the instance was launched. The
             date and time stamp format is ISO 8601: CCYY-MM-DDThh:mm:ss±hh:mm. For example, 2015-08-27T09:49:58-05:00
         :param updated_at: updated at time
-        :return: dict with server info
+        :param page_size: number of servers requested for every page when limit is not set [default=1000]
+        :return: list of dict with server info
         :raise OpenstackError: raise :class:`.OpenstackError`
         """
-        query = {}
+        if limit is None:
+            servers = list(
+                self.iter_servers(
+                    detail=detail,
+                    page_size=page_size,
+                    marker=marker,
+                    image=image,
+                    flavor=flavor,
+                    status=status,
+                    host=host,
+                    all_tenants=all_tenants,
+                    name=name,
+                    not_tags=not_tags,
+                    not_tags_any=not_tags_any,
+                    tags=tags,
+                    tags_any=tags_any,
+                    launched_at=launched_at,
+                    updated_at=updated_at,
+                    **kvargs,
+                )
+            )
+            self.logger.debug("Get openstack servers: %s" % truncate(servers))
+            return servers
+
         path = "/servers"
         if detail is True:
             path = "/servers/detail"
 
-        if image is not None:
-            query["image"] = image
-        if flavor is not None:
-            query["flavor"] = flavor
-        if status is not None:
-            query["status"] = status
-        if host is not None:
-            query["host"] = host
-        if name is not None:
-            query["name"] = name
-        if limit is not None:
-            query["limit"] = limit
+        query = self._list_query(
+            image=image,
+            flavor=flavor,
+            status=status,
+            host=host,
+            all_tenants=all_tenants,
+            name=name,
+            not_tags=not_tags,
+            not_tags_any=not_tags_any,
+            tags=tags,
+            tags_any=tags_any,
+            launched_at=launched_at,
+            updated_at=updated_at,
+            **kvargs,
+        )
+        query["limit"] = limit
         if marker is not None:
             query["marker"] = marker
-        if all_tenants is True:
-            query["all_tenants"] = 1
-        if not_tags is not None:
-            query["not-tags"] = not_tags
-        if not_tags_any is not None:
-            query["not-tags-any"] = not_tags_any
-        if tags is not None:
-            query["tags"] = tags
-        if tags_any is not None:
-            query["tags-any"] = tags_any
-        if launched_at is not None:
-            query["launched_at"] = launched_at
-        if updated_at is not None:
-            query["updated_at"] = updated_at
 
         self.set_nova_microversion("2.60")
-
-        def get_servers(orig_path):
-            query.update(kvargs)
-            new_path = f"{orig_path}?{urlencode(query)}"
-            while new_path is not None:
-                res = self.client.call(new_path, "GET", data="", token=self.manager.identity.token)[0]
-                server_links = res.get("server_links")
-                if server_links is not None:
-                    new_path = server_links[0]["href"]
-                else:
-                    new_path = None
-            return res.get("servers", []), None
-
-        servers, markers = get_servers(path)
+        path = "%s?%s" % (path, urlencode(query))
+        res = self.client.call(path, "GET", data="", token=self.manager.identity.token)[0]
+        servers = res.get("servers", [])
         self.logger.debug("Get openstack servers: %s" % truncate(servers))
         return servers
 
@@ -642,8 +783,9 @@ class OpenstackServer(OpenstackServerObject):
 
                 # get image
                 elif server["image"] is not None and server["image"] != "":
-                    image = image_idx[server["image"]["id"]]
-                    meta = image.get("metadata", None)
+                    image = image_idx.get(server["image"]["id"], None)
+                    if image is not None:
+                        meta = image.get("metadata", None)
             if image is not None:
                 # get image from boot volume
                 if server["image"] is None or server["image"] == "" and boot_volume is not None:
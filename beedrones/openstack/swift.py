@@ -7,24 +7,29 @@ from beecell.simple import jsonDumps
 import ujson as json
 from uuid import uuid4
 from hmac import new as hmacnew
-from hashlib import sha1
-from time import time
+from hashlib import sha1, md5
+from time import time, sleep
+from threading import Lock
+import os
+import mmap
 from logging import getLogger
 from beecell.simple import truncate
-from six.moves.urllib.parse import urlencode
+from six.moves.urllib.parse import urlencode, quote
 from six.moves.urllib.request import urlopen
 from beedrones.openstack.client import (
     OpenstackClient,
     OpenstackError,
     OpenstackObject,
     setup_client,
+    open_request_body,
+    concurrent_map,
 )
 
 
 class OpenstackSwiftObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("swift")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackSwift(OpenstackSwiftObject):
@@ -513,6 +518,54 @@ class OpenstackSwift(OpenstackSwiftObject):
         r.append(result)
         return r
 
+    def __iter_listing(self, read, page_size, marker, **kvargs):
+        while True:
+            entries = read(limit=page_size, marker=marker, **kvargs)[0]
+            # page size can be capped by container_listing_limit. Stop only on an empty page
+            if not entries:
+                break
+            for entry in entries:
+                yield entry
+            last = entries[-1]
+            marker = last.get("name", last.get("subdir"))
+
+    def iter_containers(self, prefix=None, marker=None, end_marker=None, page_size=10000):
+        """Iterate over the containers of the account. Containers are requested one page at a time using marker
+        paging, so memory does not depend on the number of containers.
+
+        :param prefix: Only containers with names that begin with this prefix are returned [optional]
+        :param marker: Only containers with names greater than this value are returned [optional]
+        :param end_marker: Only containers with names less than this value are returned [optional]
+        :param page_size: number of containers requested for every page [default=10000]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        :return: generator of dictionaries with container count, bytes and name
+        """
+        return self.__iter_listing(self.account_read, page_size, marker, end_marker=end_marker, prefix=prefix)
+
+    def iter_objects(self, container, prefix=None, delimiter=None, marker=None, end_marker=None, page_size=10000):
+        """Iterate over the objects of a container. Objects are requested one page at a time using marker paging, so
+        memory does not depend on the number of objects.
+
+        :param container: The unique (within an account) name for the container.
+        :param prefix: Only objects with names that begin with this prefix are returned [optional]
+        :param delimiter: The delimiter is a single character used to split object names to present a pseudo-directory
+            hierarchy of objects. Pseudo-directories are returned as dictionaries with only the subdir key [optional]
+        :param marker: Only objects with names greater than this value are returned [optional]
+        :param end_marker: Only objects with names less than this value are returned [optional]
+        :param page_size: number of objects requested for every page [default=10000]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        :return: generator of dictionaries with object bytes, last_modified, hash, name and content_type
+        """
+        return self.__iter_listing(
+            self.container_read,
+            page_size,
+            marker,
+            container=container,
+            end_marker=end_marker,
+            prefix=prefix,
+            delimiter=delimiter,
+        )
+
     @setup_client
     def container_put(
         self,
@@ -1212,7 +1265,7 @@ class OpenstackSwift(OpenstackSwiftObject):
         if multipart_manifest is not None:
             query["multipart-manifest"] = multipart_manifest
         if content_range is not None:
-            query["Range"] = content_range
+            headers["Range"] = content_range
         if if_match is not None:
             headers["If-Match "] = if_match
         if if_none_match is not None:
@@ -1235,6 +1288,67 @@ class OpenstackSwift(OpenstackSwiftObject):
         r.append(result)
         return r
 
+    @setup_client
+    def object_get_stream(
+        self,
+        container,
+        c_object,
+        dest=None,
+        chunk_size=1048576,
+        verify=True,
+        hash_algorithms=None,
+        content_range=None,
+        x_newest=None,
+        timeout=None,
+    ):
+        """Download object content without loading it in memory
+
+        :param container: The unique (within an account) name for the container.
+        :param c_object: The unique name for the object.
+        :param dest: file path or file-like object where write object content. If not set the stream is returned
+            [optional]
+        :param chunk_size: size of the chunks read [default=1048576]
+        :param verify: if True check object md5 against etag when download completes. Not applied to large objects
+            and ranged requests [default=True]
+        :param hash_algorithms: hash algorithms computed while reading [default=["md5"]]
+        :param content_range: Range header value. Ex. bytes=10-15 [optional]
+        :param x_newest: If set to true , Object Storage queries all replicas to return the most recent one [optional]
+        :param timeout: socket timeout [optional]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        :return: if dest is None an instance of :class:`OpenstackStreamResponse` that yields chunks of bytes,
+            otherwise a dictionary with response headers, bytes written and digests
+        """
+        headers = {}
+        if content_range is not None:
+            headers["Range"] = content_range
+        if x_newest is not None:
+            headers["X-Newest"] = x_newest
+
+        path = "/%s/%s" % (container, c_object)
+        stream = self.client.call(
+            path,
+            "GET",
+            data="",
+            headers=headers,
+            token=self.manager.identity.token,
+            timeout=timeout,
+            stream=True,
+            chunk_size=chunk_size,
+            hash_algorithms=hash_algorithms,
+        )[0]
+
+        large_object = "x-static-large-object" in stream.headers or "x-object-manifest" in stream.headers
+        if verify is True and content_range is None and large_object is False:
+            stream.expect("md5", stream.headers.get("etag", None))
+        self.logger.debug("Openstack swift stream object %s/%s: %s" % (container, c_object, truncate(stream.headers)))
+
+        if dest is None:
+            return stream
+
+        with stream:
+            size = stream.write_to(dest)
+        return {"headers": stream.headers, "bytes": size, "digests": stream.digests()}
+
     @setup_client
     def object_put(
         self,
@@ -1260,6 +1374,9 @@ class OpenstackSwift(OpenstackSwiftObject):
         if_none_match=None,
         x_trans_id_extra=None,
         data="",
+        path=None,
+        chunk_size=1048576,
+        timeout=None,
     ):
         """Put object content and metadata
 
@@ -1352,6 +1469,11 @@ class OpenstackSwift(OpenstackSwiftObject):
             logs. You can also use x_trans_id_extra strings to help operators debug
             requests that fail to receive responses. The operator can search for the
             extra information in the logs.
+        :param data: object content. Can be str, bytes, a file-like object opened in binary mode or an iterable of
+            bytes. File objects are sent in chunks, iterables with chunked transfer encoding [default=""]
+        :param path: path of a file to upload as object content. File is mapped in memory with mmap [optional]
+        :param chunk_size: size of the chunks read from file objects [default=1048576]
+        :param timeout: socket timeout [optional]
         :raises OpenstackError: raise :class:`.OpenstackError`
         :return List containing a list of dictionary for the body and a dictionary for the header
             ex:
@@ -1368,9 +1490,9 @@ class OpenstackSwift(OpenstackSwiftObject):
         query = {}
         headers = {}
         if container is not None and c_object is not None:
-            path = "/%s/%s" % (container, c_object)
+            uri = "/%s/%s" % (container, c_object)
         else:
-            path = "//"  # so that raises an error
+            uri = "//"  # so that raises an error
         if temp_url_sig is not None:
             query["temp_url_sig"] = temp_url_sig
         if temp_url_expires is not None:
@@ -1411,8 +1533,13 @@ class OpenstackSwift(OpenstackSwiftObject):
             headers["X-Trans-Id-Extra"] = x_trans_id_extra
 
         if len(query) > 0:
-            path = "%s?%s" % (path, urlencode(query))
-        res = self.client.call(path, "PUT", data=data, headers=headers, token=self.manager.identity.token)
+            uri = "%s?%s" % (uri, urlencode(query))
+        with open_request_body(data=data, path=path, chunk_size=chunk_size) as (body, body_headers):
+            if "Content-Length" not in headers and "Transfer-Encoding" not in headers:
+                headers.update(body_headers)
+            res = self.client.call(
+                uri, "PUT", data=body, headers=headers, token=self.manager.identity.token, timeout=timeout
+            )
         self.logger.debug("Openstack swift put object: %s" % truncate(res[0]))
         result = {}
         for item in res[1]:
@@ -1918,6 +2045,327 @@ class OpenstackSwift(OpenstackSwiftObject):
         result["resp-code"] = res[2]
         return result
 
+    def upload_large_object(
+        self,
+        container,
+        c_object,
+        source,
+        segment_size=104857600,
+        concurrency=4,
+        segment_container=None,
+        retries=3,
+        content_type=None,
+    ):
+        """Upload a file as a Static Large Object. File is split in segments that are uploaded concurrently, then the
+        manifest is written. Segments are read from a memory map of the file and are not copied in memory.
+
+        :param container: The unique (within an account) name for the container.
+        :param c_object: The unique name for the object.
+        :param source: path of the file to upload
+        :param segment_size: size in bytes of every segment [default=100MB]
+        :param concurrency: max number of segments uploaded in parallel [default=4]
+        :param segment_container: container where segments are uploaded [default=<container>_segments]
+        :param retries: number of times a failed segment upload is retried [default=3]
+        :param content_type: MIME type of the object [optional]
+        :raises OpenstackError: raise :class:`.OpenstackError`. Segments already uploaded are deleted when upload
+            fails
+        :return: dictionary with manifest put response and list of segments
+        """
+        if segment_container is None:
+            segment_container = "%s_segments" % container
+
+        size = os.path.getsize(source)
+        if size <= segment_size:
+            res = self.object_put(container=container, c_object=c_object, path=source, content_type=content_type)
+            return {"manifest": res, "segments": []}
+
+        # manifest can not contain more than slo max_manifest_segments segments. Increase segment size if needed
+        max_segments, max_file_size = self.__slo_limits()
+        if -(-size // segment_size) > max_segments:
+            new_size = -(-size // max_segments)
+            if new_size > max_file_size:
+                raise OpenstackError(
+                    "File %s of %s bytes exceeds the max size of a static large object of %s segments of %s bytes"
+                    % (source, size, max_segments, max_file_size),
+                    413,
+                )
+            self.logger.warning(
+                "Segment size %s gives more than %s segments. Use segment size %s"
+                % (segment_size, max_segments, new_size)
+            )
+            segment_size = new_size
+
+        self.container_put(container=segment_container)
+        prefix = "%s/slo/%s/%s/%s" % (c_object, time(), size, segment_size)
+        offsets = range(0, size, segment_size)
+
+        def upload_segment(view, offset):
+            name = "%s/%08d" % (prefix, offset // segment_size)
+            data = view[offset : offset + segment_size]
+            segment_bytes = len(data)
+            try:
+                etag = md5(data).hexdigest()
+                attempt = 0
+                while True:
+                    try:
+                        res = self.object_put(container=segment_container, c_object=name, data=data, etag=etag)
+                        res_etag = {k.lower(): v for k, v in res.items()}.get("etag", etag)
+                        if res_etag.strip('"') != etag:
+                            raise OpenstackError("Segment %s etag mismatch" % name, 422)
+                        break
+                    except OpenstackError as ex:
+                        attempt += 1
+                        if attempt > retries:
+                            raise
+                        self.logger.warning("Upload segment %s failed: %s. Retry %s" % (name, ex, attempt))
+                        sleep(2**attempt)
+            finally:
+                data.release()
+            self.logger.debug("Upload segment %s of %s/%s" % (name, container, c_object))
+            return {"path": "/%s/%s" % (segment_container, name), "etag": etag, "size_bytes": segment_bytes}
+
+        with open(source, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm)
+            try:
+                segments = concurrent_map(lambda offset: upload_segment(view, offset), offsets, concurrency)
+            except Exception:
+                self.__delete_segments(segment_container, prefix)
+                raise
+            finally:
+                view.release()
+                mm.close()
+
+        try:
+            res = self.object_put(
+                container=container,
+                c_object=c_object,
+                multipart_manifest="put",
+                data=jsonDumps(segments),
+                content_type=content_type,
+            )
+        except Exception:
+            self.__delete_segments(segment_container, prefix)
+            raise
+        self.logger.debug("Upload large object %s/%s with %s segments" % (container, c_object, len(segments)))
+        return {"manifest": res, "segments": segments}
+
+    def __slo_limits(self):
+        """Get max number of segments of a static large object manifest and max size of a segment from cluster info.
+        Swift defaults are used when info is not available
+
+        :return: (max_manifest_segments, max_file_size)
+        """
+        try:
+            info = self.info()
+        except OpenstackError as ex:
+            self.logger.warning("Get swift info failed: %s. Use default static large object limits" % ex)
+            info = {}
+        if not isinstance(info, dict):
+            info = {}
+        max_segments = info.get("slo", {}).get("max_manifest_segments", 1000)
+        max_file_size = info.get("swift", {}).get("max_file_size", 5368709122)
+        return max_segments, max_file_size
+
+    def __delete_segments(self, segment_container, prefix):
+        """Delete the segments of a failed large object upload. Errors are logged and not raised"""
+        try:
+            names = [item["name"] for item in self.iter_objects(segment_container, prefix="%s/" % prefix)]
+            if len(names) > 0:
+                self.bulk_delete(segment_container, names)
+            self.logger.warning("Delete %s segments of failed upload %s" % (len(names), prefix))
+        except Exception as ex:
+            self.logger.error("Delete segments of failed upload %s failed: %s" % (prefix, ex))
+
+    def download_object_parallel(
+        self, container, c_object, dest, concurrency=4, part_size=104857600, chunk_size=1048576, verify=True
+    ):
+        """Download an object fetching byte ranges concurrently. Every range is written in a preallocated file at its
+        offset. Completed ranges are recorded in <dest>.parts, so an interrupted download restarts only the missing
+        ranges if the object has not changed.
+
+        :param container: The unique (within an account) name for the container.
+        :param c_object: The unique name for the object.
+        :param dest: path of the file where write object content
+        :param concurrency: max number of ranges downloaded in parallel [default=4]
+        :param part_size: size in bytes of every range [default=100MB]
+        :param chunk_size: size of the chunks read from every range [default=1048576]
+        :param verify: if True check file md5 against object etag when download completes. Not applied to large
+            objects [default=True]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        :return: dictionary with object size, etag and number of ranges downloaded
+        """
+        meta = self.object_metadata_get(container=container, c_object=c_object)
+        meta = {k.lower(): v for k, v in meta.items()}
+        size = int(meta["content-length"])
+        etag = meta.get("etag", "").strip('"')
+        large_object = "x-static-large-object" in meta or "x-object-manifest" in meta
+
+        # load completed ranges of a previous download of the same object
+        state_file = "%s.parts" % dest
+        state = {"etag": etag, "size": size, "part_size": part_size, "done": []}
+        if os.path.exists(state_file) and os.path.exists(dest):
+            with open(state_file) as f:
+                old_state = json.loads(f.read())
+            if (
+                old_state.get("etag") == etag
+                and old_state.get("size") == size
+                and old_state.get("part_size") == part_size
+            ):
+                state = old_state
+        done = set(state["done"])
+        offsets = [offset for offset in range(0, size, part_size) if offset not in done]
+        self.logger.debug(
+            "Download object %s/%s: %s bytes, %s ranges to download" % (container, c_object, size, len(offsets))
+        )
+
+        lock = Lock()
+        fd = os.open(dest, os.O_RDWR | os.O_CREAT)
+        try:
+            os.ftruncate(fd, size)
+
+            def download_range(offset):
+                end = min(offset + part_size, size) - 1
+                stream = self.object_get_stream(
+                    container,
+                    c_object,
+                    chunk_size=chunk_size,
+                    verify=False,
+                    content_range="bytes=%s-%s" % (offset, end),
+                )
+                with stream:
+                    if stream.status != 206 and offset > 0:
+                        raise OpenstackError("Range request not supported for object %s/%s" % (container, c_object))
+                    position = offset
+                    for chunk in stream:
+                        position += os.pwrite(fd, chunk, position)
+                if position != end + 1:
+                    raise OpenstackError("Range %s-%s of %s/%s is incomplete" % (offset, end, container, c_object))
+
+                with lock:
+                    state["done"].append(offset)
+                    with open(state_file, "w") as f:
+                        f.write(json.dumps(state))
+                return offset
+
+            concurrent_map(download_range, offsets, concurrency)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        if verify is True and large_object is False and size > 0:
+            with open(dest, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    digest = md5(mm).hexdigest()
+            if digest != etag:
+                os.remove(state_file)
+                raise OpenstackError("md5 checksum mismatch: expected %s, got %s" % (etag, digest), 400)
+
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        self.logger.debug("Download object %s/%s to %s" % (container, c_object, dest))
+        return {"bytes": size, "etag": etag, "ranges": len(offsets)}
+
+    def __check_bulk_status(self, res, action):
+        """Check the response status reported by the bulk middleware. Bulk requests always return 200 and the real
+        status is in the Response Status field. Failures of single objects are listed in Errors and are returned to
+        the caller. A failure without Errors means that the whole request failed.
+
+        :param res: bulk middleware response
+        :param action: action name used in the error message
+        :raises OpenstackError: raise :class:`.OpenstackError` when the whole request failed
+        """
+        status = res.get("Response Status", "200 OK")
+        code = int(status.split(" ")[0])
+        if code >= 400 and len(res.get("Errors", [])) == 0:
+            self.logger.error("%s failed: %s %s" % (action, status, res.get("Response Body", "")))
+            raise OpenstackError("%s failed: %s %s" % (action, status, res.get("Response Body", "")), code)
+
+    @setup_client
+    def bulk_delete(self, container, objects, batch_size=10000):
+        """Delete many objects with the bulk middleware. Object paths are sent in batches of newline separated paths,
+        one request for every batch.
+
+        :param container: The unique (within an account) name for the container.
+        :param objects: list or iterator of object names. Dictionaries with a name key, like the ones returned by
+            :meth:`iter_objects`, are accepted too.
+        :param batch_size: max number of objects deleted with one request. Must not be greater than the
+            max_deletes_per_request value of the bulk middleware [default=10000]
+        :raises OpenstackError: raise :class:`.OpenstackError`. Raised also when the bulk middleware reports the
+            failure of a whole batch. Objects of the previous batches are already deleted
+        :return: dictionary with number of deleted objects, number of objects not found and list of errors as
+            [path, status]
+        """
+        result = {"deleted": 0, "not_found": 0, "errors": []}
+        headers = {"Accept": "application/json"}
+
+        def send(batch):
+            data = "\n".join(batch)
+            res = self.client.call(
+                "?bulk-delete",
+                "POST",
+                data=data,
+                headers=headers,
+                token=self.manager.identity.token,
+                content_type="text/plain",
+            )[0]
+            if isinstance(res, (bytes, str)):
+                res = json.loads(res)
+            self.__check_bulk_status(res, "Bulk delete from container %s" % container)
+            result["deleted"] += res.get("Number Deleted", 0)
+            result["not_found"] += res.get("Number Not Found", 0)
+            result["errors"].extend(res.get("Errors", []))
+            self.logger.debug("Bulk delete %s objects from container %s: %s" % (len(batch), container, truncate(res)))
+
+        batch = []
+        for item in objects:
+            if isinstance(item, dict):
+                item = item["name"]
+            batch.append(quote("/%s/%s" % (container, item)))
+            if len(batch) >= batch_size:
+                send(batch)
+                batch = []
+        if len(batch) > 0:
+            send(batch)
+
+        self.logger.debug("Bulk delete from container %s: %s" % (container, truncate(result)))
+        return result
+
+    @setup_client
+    def extract_archive(self, container, data=None, path=None, archive_format="tar", prefix=None, chunk_size=1048576):
+        """Upload an archive and extract its files as objects with one request
+
+        :param container: The unique (within an account) name for the container.
+        :param data: archive content. Can be bytes, a file-like object opened in binary mode or an iterable of bytes
+            [optional]
+        :param path: path of the archive file [optional]
+        :param archive_format: archive format. Can be tar, tar.gz or tar.bz2 [default=tar]
+        :param prefix: pseudo-directory prepended to the name of the extracted objects [optional]
+        :param chunk_size: size of the chunks read from file objects [default=1048576]
+        :raises OpenstackError: raise :class:`.OpenstackError`
+        :return: dictionary with number of files created and list of errors as [path, status]
+        """
+        uri = "/%s" % container
+        if prefix is not None:
+            uri = "%s/%s" % (uri, prefix.strip("/"))
+        uri = "%s?%s" % (uri, urlencode({"extract-archive": archive_format}))
+
+        with open_request_body(data=data, path=path, chunk_size=chunk_size) as (body, headers):
+            headers["Accept"] = "application/json"
+            res = self.client.call(
+                uri,
+                "PUT",
+                data=body,
+                headers=headers,
+                token=self.manager.identity.token,
+                content_type="application/octet-stream",
+            )[0]
+        if isinstance(res, (bytes, str)):
+            res = json.loads(res)
+        self.logger.debug("Extract archive in container %s: %s" % (container, truncate(res)))
+        self.__check_bulk_status(res, "Extract archive in container %s" % container)
+        return {"created": res.get("Number Files Created", 0), "errors": res.get("Errors", [])}
+
     def generate_key(self, container=None, key=None):
         """Generate key for temporary URLs
 
@@ -26,51 +26,27 @@ VERSION_MAPPING = {
 class OpenstackSystemObject(OpenstackObject):
     def setup(self):
         try:
-            self.compute = OpenstackClient(
-                self.manager.endpoint("nova"),
-                self.manager.proxy,
-                timeout=self.manager.timeout,
-            )
+            self.compute = self.manager.get_client(self.manager.endpoint("nova"))
         except:
             self.compute = None
         try:
-            self.blockstore = OpenstackClient(
-                self.manager.endpoint("cinderv3"),
-                self.manager.proxy,
-                timeout=self.manager.timeout,
-            )
+            self.blockstore = self.manager.get_client(self.manager.endpoint("cinderv3"))
         except:
             self.blockstore = None
         try:
-            self.network = OpenstackClient(
-                self.manager.endpoint("neutron"),
-                self.manager.proxy,
-                timeout=self.manager.timeout,
-            )
+            self.network = self.manager.get_client(self.manager.endpoint("neutron"))
         except:
             self.network = None
         try:
-            self.heat = OpenstackClient(
-                self.manager.endpoint("heat"),
-                self.manager.proxy,
-                timeout=self.manager.timeout,
-            )
+            self.heat = self.manager.get_client(self.manager.endpoint("heat"))
         except:
             self.heat = None
         try:
-            self.swift = OpenstackClient(
-                self.manager.endpoint("swift"),
-                self.manager.proxy,
-                timeout=self.manager.timeout,
-            )
+            self.swift = self.manager.get_client(self.manager.endpoint("swift"))
         except:
             self.swift = None
         try:
-            self.manila = OpenstackClient(
-                self.manager.endpoint("manilav2"),
-                self.manager.proxy,
-                timeout=self.manager.timeout,
-            )
+            self.manila = self.manager.get_client(self.manager.endpoint("manilav2"))
         except:
             self.manila = None
 
@@ -87,10 +63,8 @@ class OpenstackSystem(OpenstackSystemObject):
 
         :raise OpenstackError: raise :class:`.OpenstackError`
         """
-        path = self.compute.path = "/"
-        res = self.compute.call("", "GET", data="", token=self.manager.identity.token)
+        res = self.compute.call("", "GET", data="", token=self.manager.identity.token, base_path="/")
         self.logger.debug("Get compute api: %s" % truncate(res[0]))
-        self.compute.path = path
         return res[0]
 
     def version(self):
@@ -111,10 +85,8 @@ class OpenstackSystem(OpenstackSystemObject):
 
         :raise OpenstackError: raise :class:`.OpenstackError`
         """
-        path = self.blockstore.path = "/"
-        res = self.blockstore.call("", "GET", data="", token=self.manager.identity.token)
+        res = self.blockstore.call("", "GET", data="", token=self.manager.identity.token, base_path="/")
         self.logger.debug("Get block storage api: %s" % truncate(res[0]))
-        self.blockstore.path = path
         return res[0]
 
     @setup_client
@@ -123,10 +95,8 @@ class OpenstackSystem(OpenstackSystemObject):
 
         :raise OpenstackError: raise :class:`.OpenstackError`
         """
-        path = self.swift.path = "/info"
-        res = self.swift.call("", "GET", data="", token=self.manager.identity.token)
+        res = self.swift.call("", "GET", data="", token=self.manager.identity.token, base_path="/info")
         self.logger.debug("Get object storage api: %s" % truncate(res[0]))
-        self.swift.path = path
         return res[0]
 
     @setup_client
@@ -135,10 +105,8 @@ class OpenstackSystem(OpenstackSystemObject):
 
         :raise OpenstackError: raise :class:`.OpenstackError`
         """
-        path = self.network.path = "/"
-        res = self.network.call("", "GET", data="", token=self.manager.identity.token)
+        res = self.network.call("", "GET", data="", token=self.manager.identity.token, base_path="/")
         self.logger.debug("Get network api: %s" % truncate(res[0]))
-        self.network.path = path
         return res[0]
 
     @setup_client
@@ -147,10 +115,8 @@ class OpenstackSystem(OpenstackSystemObject):
 
         :raise OpenstackError: raise :class:`.OpenstackError`
         """
-        path = self.network.path = "/v2.0/extensions"
-        res = self.network.call("", "GET", data="", token=self.manager.identity.token)
+        res = self.network.call("", "GET", data="", token=self.manager.identity.token, base_path="/v2.0/extensions")
         self.logger.debug("Get network api extensions: %s" % truncate(res[0]))
-        self.network.path = path
         return res[0]
 
     @setup_client
@@ -159,10 +125,8 @@ class OpenstackSystem(OpenstackSystemObject):
 
         :raise OpenstackError: raise :class:`.OpenstackError`
         """
-        path = self.heat.path = "/"
-        res = self.heat.call("", "GET", data="", token=self.manager.identity.token)
+        res = self.heat.call("", "GET", data="", token=self.manager.identity.token, base_path="/")
         self.logger.debug("Get orchestrator api: %s" % truncate(res[0]))
-        self.heat.path = path
         return res[0]
 
     def manila_api(self):
@@ -170,10 +134,8 @@ class OpenstackSystem(OpenstackSystemObject):
 
         :raises OpenstackError: raise :class:`.OpenstackError`
         """
-        path = self.manila.path = "/"
-        res = self.manila.call("", "GET", data="", token=self.manager.identity.token)
+        res = self.manila.call("", "GET", data="", token=self.manager.identity.token, base_path="/")
         self.logger.debug("Get manila api: %s" % truncate(res[0]))
-        self.manila.path = path
         return res[0]
 
     @setup_client
@@ -16,19 +16,20 @@ from beedrones.openstack.client import (
     OpenstackError,
     OpenstackObject,
     setup_client,
+    concurrent_map,
 )
 
 
 class OpenstackVolumeObject(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("cinderv2")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
 
 
 class OpenstackVolumeV3Object(OpenstackObject):
     def setup(self):
         self.uri = self.manager.endpoint("cinderv3")
-        self.client = OpenstackClient(self.uri, self.manager.proxy, timeout=self.manager.timeout)
+        self.client = self.manager.get_client(self.uri)
         self.set_cinder_microversion("3.50")
 
 
@@ -159,16 +160,32 @@ class OpenstackVolumeV3(OpenstackVolumeV3Object):
         volumes = res[0].pop("volumes")
         return volumes
 
-    def list_all(self, detail=False, limit=1000):
+    def list_all(self, detail=False, limit=1000, concurrency=None, tenant=None):
         """List all volumes without limits
 
+        :param detail: if True show volume details
+        :param tenant: tenant id [optional]
+        :param limit: page size [default=1000]
+        :param concurrency: max number of pages requested in parallel after the first one. If not set pages are
+            requested one after another [optional]
         :raises OpenstackError: raise :class:`.OpenstackError`
         :return a list of dictionaries (each one is a volume)
         """
-        volumes = self.list(detail=detail, limit=limit, offset=0)
+        volumes = self.list(detail=detail, tenant=tenant, limit=limit, offset=0)
+        if concurrency is not None and concurrency > 1:
+            offsets = range(limit, self.volume_count, limit)
+            pages = concurrent_map(
+                lambda offset: self.list(detail=detail, tenant=tenant, limit=limit, offset=offset),
+                offsets,
+                concurrency,
+            )
+            for page in pages:
+                volumes.extend(page)
+            return volumes
+
         offset = limit
         while len(volumes) < self.volume_count:
-            volumes.extend(self.list(detail=detail, limit=limit, offset=offset))
+            volumes.extend(self.list(detail=detail, tenant=tenant, limit=limit, offset=offset))
             offset += limit
         return volumes
 
@@ -1084,13 +1101,23 @@ class OpenstackVolumeSnapshotV3(OpenstackVolumeV3Object):
         res = res[0]["snapshots"]
         return res, total
 
-    def _list_all(self, limit=1000):
+    def _list_all(self, limit=1000, concurrency=None):
         """List all volumes without limits
 
+        :param limit: page size [default=1000]
+        :param concurrency: max number of pages requested in parallel after the first one. If not set pages are
+            requested one after another [optional]
         :raises OpenstackError: raise :class:`.OpenstackError`
         :return a list of dictionaries (each one is a volume)
         """
         snapshots, total = self._list(limit=limit, offset=0)
+        if concurrency is not None and concurrency > 1:
+            offsets = range(limit, total, limit)
+            pages = concurrent_map(lambda offset: self._list(limit=limit, offset=offset)[0], offsets, concurrency)
+            for page in pages:
+                snapshots.extend(page)
+            return snapshots
+
         offset = limit
         while len(snapshots) < total:
             new_snapshots, new_total = self._list(limit=limit, offset=offset)
@@ -1098,7 +1125,7 @@ class OpenstackVolumeSnapshotV3(OpenstackVolumeV3Object):
             offset += limit
         return snapshots
 
-    def list(self, all=True, *args, **kvargs):
+    def list(self, all=True, *args, concurrency=None, **kvargs):
         """Lists all Block Storage snapshots, with details, that the project can access.
 
         :param detail: if True show details
@@ -1118,11 +1145,12 @@ class OpenstackVolumeSnapshotV3(OpenstackVolumeV3Object):
             the ID of the last-seen item from the response as the marker parameter value in a subsequent limited
             request. [optional]
         :param all: if True return all the snaphots, otherwise return the first 1000. [default=True]
+        :param concurrency: when all is True, max number of pages requested in parallel. Keyword only [optional]
         :raises OpenstackError: raise :class:`.OpenstackError`
         :return:
         """
         if all is True:
-            res = self._list_all()
+            res = self._list_all(concurrency=concurrency)
         else:
             res = self._list(*args, **kvargs)
 
@@ -0,0 +1,315 @@
+# SPDX-License-Identifier: EUPL-1.2
+#
+# (C) Copyright 2018-2024 CSI-Piemonte
+
+from concurrent.futures import Future, wait
+from datetime import datetime, timezone
+from logging import getLogger
+from threading import Lock, Thread, Event
+from time import time
+from six.moves.urllib.parse import urlencode
+from beedrones.openstack.client import OpenstackError, OpenstackNotFound
+
+
+class OpenstackResourceWaiter(object):
+    """Wait for many servers, volumes, shares or stacks at once. Every tick one list query is sent for every kind of
+    resource in place of one get for every resource:
+
+    - server: list filtered by changes-since. Deleted servers are returned with status DELETED
+    - volume: list filtered by updated_at (block storage api 3.60) one page at a time
+    - share: list of all the shares one page at a time, or one get for every share when few shares are waited.
+      Shares not returned are DELETED
+    - stack: list filtered by id with deleted stacks
+
+    Resources never returned by a changes-since query and deleted volumes are checked with a get. Poll interval
+    starts from interval and grows by backoff up to max_interval while no resource change status.
+
+    Usage:
+
+    waiter = OpenstackResourceWaiter(manager)
+    futures = [waiter.add("server", oid, ["ACTIVE"]) for oid in server_ids]
+    waiter.start()
+    waiter.wait()
+
+    :param manager: instance of :class:`OpenstackManager`
+    :param interval: min poll interval in seconds [default=2]
+    :param max_interval: max poll interval in seconds [default=30]
+    :param backoff: poll interval multiplier applied when no resource change status [default=1.5]
+    :param timeout: default timeout in seconds of every resource [default=1800]
+    :param skew: seconds subtracted from changes-since to tolerate clock skew [default=5]
+    """
+
+    kinds = ["server", "volume", "share", "stack"]
+    # shares are requested one at a time up to this number, otherwise all the shares are listed
+    max_share_gets = 10
+    share_page_size = 1000
+    volume_page_size = 1000
+    error_statuses = {
+        "server": ["ERROR"],
+        "volume": ["ERROR", "ERROR_DELETING", "ERROR_EXTENDING", "ERROR_RESTORING"],
+        "share": ["ERROR", "ERROR_DELETING"],
+        "stack": ["CREATE_FAILED", "UPDATE_FAILED", "DELETE_FAILED", "ROLLBACK_FAILED"],
+    }
+
+    def __init__(self, manager, interval=2, max_interval=30, backoff=1.5, timeout=1800, skew=5):
+        self.logger = getLogger(self.__class__.__module__ + "." + self.__class__.__name__)
+
+        self.manager = manager
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self.skew = skew
+
+        self._lock = Lock()
+        # {kind: {oid: item}}
+        self._pending = {kind: {} for kind in self.kinds}
+        # {kind: last poll time}
+        self._last_poll = {}
+        self._futures = []
+        self._thread = None
+        self._stop = Event()
+
+    def __repr__(self):
+        return "<OpenstackResourceWaiter id=%s pending=%s>" % (id(self), self.pending())
+
+    def add(self, kind, oid, statuses, error_statuses=None, callback=None, timeout=None):
+        """Add a resource to wait for
+
+        :param kind: resource kind. One of server, volume, share, stack
+        :param oid: resource id
+        :param statuses: list of final statuses. Use DELETED to wait for deletion
+        :param error_statuses: list of error statuses [default=error statuses of the kind]
+        :param callback: function called with the future when resource reaches a final or an error status [optional]
+        :param timeout: timeout in seconds [default=timeout of the waiter]
+        :return: instance of :class:`concurrent.futures.Future`. Result is the resource dict. An
+            :class:`.OpenstackError` is set when resource reaches an error status or timeout expires
+        """
+        if kind not in self.kinds:
+            raise OpenstackError("Resource kind %s is not supported" % kind)
+        if error_statuses is None:
+            error_statuses = self.error_statuses[kind]
+        if timeout is None:
+            timeout = self.timeout
+
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        now = time()
+        item = {
+            "future": future,
+            "statuses": [s.upper() for s in statuses],
+            "errors": [s.upper() for s in error_statuses],
+            "added": now,
+            "deadline": now + timeout,
+            "status": None,
+            "resource": None,
+        }
+        with self._lock:
+            self._pending[kind][oid] = item
+            self._futures.append(future)
+        self.logger.debug("Wait %s %s for status %s" % (kind, oid, statuses))
+        return future
+
+    def pending(self):
+        """Get number of pending resources"""
+        with self._lock:
+            return sum([len(items) for items in self._pending.values()])
+
+    @staticmethod
+    def __iso(epoch):
+        return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def __list_server(self, oids, since):
+        servers = self.manager.server.list(detail=True, **{"changes-since": self.__iso(since)})
+        return {item["id"]: item for item in servers}, False
+
+    def __list_volume(self, oids, since):
+        volume = self.manager.volume_v3
+        volume.setup()
+        query = {"all_tenants": 1, "updated_at": "gte:%s" % self.__iso(since), "limit": self.volume_page_size}
+        microversion = volume.cinder_microversion("3.60")
+        volumes = {}
+        # page size can be capped by cinder osapi_max_limit. Stop only on an empty page
+        while True:
+            path = "/volumes/detail?%s" % urlencode(query)
+            res = volume.client.call(path, "GET", data="", token=self.manager.identity.token, microversion=microversion)
+            page = res[0]["volumes"]
+            if len(page) == 0:
+                return volumes, False
+            for item in page:
+                volumes[item["id"]] = item
+            query["marker"] = page[-1]["id"]
+
+    def __list_share(self, oids, since):
+        share = self.manager.manila.share
+        shares = {}
+        if len(oids) <= self.max_share_gets:
+            for oid in oids:
+                try:
+                    shares[oid] = share.get(oid)
+                except OpenstackError as ex:
+                    # manila returns 404 with an itemNotFound body
+                    if ex.code != 404:
+                        raise
+            return shares, True
+
+        # page size can be capped by manila osapi_max_limit. Stop only on an empty page
+        offset = 0
+        while True:
+            page = share.list(details=True, limit=self.share_page_size, offset=offset, sort_key="id", sort_dir="asc")
+            if len(page) == 0:
+                return shares, True
+            for item in page:
+                shares[item["id"]] = item
+            offset += len(page)
+
+    def __list_stack(self, oids, since):
+        heat = self.manager.heat
+        heat.setup()
+        stacks = {}
+        for i in range(0, len(oids), 100):
+            query = [("id", oid) for oid in oids[i : i + 100]]
+            query.extend([("show_deleted", True), ("global_tenant", True)])
+            path = "/stacks?%s" % urlencode(query)
+            res = heat.client.call(path, "GET", data="", token=self.manager.identity.token)[0]
+            for item in res["stacks"]:
+                item["status"] = item["stack_status"]
+                stacks[item["id"]] = item
+        return stacks, True
+
+    def __get(self, kind, oid):
+        """Get a resource not returned by the list query"""
+        paths = {"server": ("/servers/%s", "server"), "volume": ("/volumes/%s", "volume")}
+        path, key = paths[kind]
+        obj = self.manager.server if kind == "server" else self.manager.volume_v3
+        obj.setup()
+        try:
+            res = obj.client.call(path % oid, "GET", data="", token=self.manager.identity.token)[0]
+            return res[key]
+        except OpenstackNotFound:
+            return {"id": oid, "status": "DELETED"}
+
+    def __resolve(self, kind, oid, item, now):
+        """Resolve future of a resource
+
+        :return: True if resource was resolved
+        """
+        status = item["status"]
+        future = item["future"]
+        if status is not None and status in item["statuses"]:
+            self.logger.debug("%s %s reached status %s" % (kind, oid, status))
+            future.set_result(item["resource"])
+        elif status is not None and status in item["errors"]:
+            self.logger.error("%s %s reached error status %s" % (kind, oid, status))
+            future.set_exception(OpenstackError("%s %s is in error status %s" % (kind, oid, status)))
+        elif now > item["deadline"]:
+            self.logger.error("%s %s timeout. Last status: %s" % (kind, oid, status))
+            future.set_exception(OpenstackError("%s %s timeout. Last status: %s" % (kind, oid, status), 408))
+        else:
+            return False
+        return True
+
+    def poll(self):
+        """Check status of all the pending resources once
+
+        :return: number of resources that changed status
+        """
+        listers = {
+            "server": self.__list_server,
+            "volume": self.__list_volume,
+            "share": self.__list_share,
+            "stack": self.__list_stack,
+        }
+        changed = 0
+        for kind in self.kinds:
+            with self._lock:
+                items = dict(self._pending[kind])
+            if len(items) == 0:
+                continue
+
+            # query changes since last poll or since a new resource was added
+            start = time()
+            since = [item["added"] for item in items.values() if item["status"] is None]
+            since = min(since + [self._last_poll.get(kind, start)]) - self.skew
+            try:
+                found, complete = listers[kind](list(items.keys()), since)
+            except OpenstackError as ex:
+                self.logger.warning("Poll %s status failed: %s" % (kind, ex))
+                continue
+            self._last_poll[kind] = start
+
+            now = time()
+            for oid, item in items.items():
+                resource = found.get(oid, None)
+                if resource is None and complete is True:
+                    resource = {"id": oid, "status": "DELETED"}
+                elif resource is None and (item["status"] is None or "DELETED" in item["statuses"]):
+                    try:
+                        resource = self.__get(kind, oid)
+                    except OpenstackError as ex:
+                        self.logger.warning("Get %s %s status failed: %s" % (kind, oid, ex))
+                if resource is not None:
+                    status = str(resource.get("status")).upper()
+                    if status != item["status"]:
+                        changed += 1
+                    item["status"] = status
+                    item["resource"] = resource
+
+                if self.__resolve(kind, oid, item, now) is True:
+                    with self._lock:
+                        self._pending[kind].pop(oid, None)
+        return changed
+
+    def __fail(self, ex):
+        """Set exception on the futures of all the pending resources"""
+        with self._lock:
+            for kind in self.kinds:
+                for item in self._pending[kind].values():
+                    if not item["future"].done():
+                        item["future"].set_exception(ex)
+                self._pending[kind] = {}
+
+    def run(self):
+        """Poll resource status until all the resources are resolved or waiter is stopped"""
+        interval = self.interval
+        while self.pending() > 0 and not self._stop.is_set():
+            try:
+                changed = self.poll()
+            except Exception as ex:
+                # unexpected error. Fail the pending resources so that wait does not hang
+                self.logger.error("Poll resource status failed: %s" % ex, exc_info=True)
+                self.__fail(ex)
+                return
+            if changed > 0:
+                interval = self.interval
+            else:
+                interval = min(interval * self.backoff, self.max_interval)
+            if self.pending() > 0:
+                self._stop.wait(interval)
+
+    def start(self):
+        """Start polling in a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop background polling"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait(self, timeout=None):
+        """Wait all the resources. Polling is started if not running
+
+        :param timeout: max time to wait in seconds [optional]
+        :return: (done futures, not done futures)
+        """
+        self.start()
+        with self._lock:
+            futures = list(self._futures)
+        return wait(futures, timeout=timeout)
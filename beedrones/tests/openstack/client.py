@@ -2,10 +2,19 @@
 #
 # (C) Copyright 2018-2024 CSI-Piemonte
 
+import asyncio
 from time import sleep
 import os
 from beedrones.tests.test_util import BeedronesTestCase, runtest
-from beedrones.openstack.client import OpenstackManager
+from beedrones.openstack.client import (
+    concurrent_map,
+    OpenstackManager,
+    OpenstackTokenCache,
+    OpenstackResponseCache,
+    OpenstackRetryPolicy,
+)
+from beedrones.openstack.aio import AsyncOpenstackManager
+from beedrones.openstack.waiter import OpenstackResourceWaiter
 
 oid = None
 name = None
@@ -22,6 +31,16 @@ tests = [
     "test_get_services",
     "test_get_endpoints",
     "test_endpoint",
+    "test_connection_pool_stats",
+    "test_client_cache",
+    "test_token_cache",
+    "test_async_list",
+    "test_inventory_snapshot",
+    "test_response_cache",
+    "test_retry_policy",
+    "test_compression",
+    "test_resource_waiter",
+    "test_thread_microversion",
     # ----- system -------
     "test_compute_api",
     "test_compute_services",
@@ -77,6 +96,7 @@ tests = [
     "test_flavor_get_by_tenant",
     # ----- server -------
     "test_server_list",
+    "test_server_iter",
     "test_get_server",
     "test_server_create",
     "test_get_server_by_name",
@@ -98,6 +118,7 @@ tests = [
     "test_server_delete"
     # ----- volume -------
     "test_volume_list",
+    "test_volume_list_all_concurrent",
     "test_volume_get",
     "test_volume_create",
     "test_volume_get_by_name",
@@ -169,9 +190,105 @@ class OpenstackClientTestCase(BeedronesTestCase):
         res = self.client.endpoint(self.service)
         self.logger.debug(self.pp.pformat(res))
 
+    def test_connection_pool_stats(self):
+        self.client.identity.get_services()
+        self.client.identity.get_endpoints()
+        res = self.client.get_pool_stats()
+        self.logger.debug(self.pp.pformat(res))
+        self.assertGreaterEqual(res["hits"], 1)
+
+    def test_client_cache(self):
+        self.client.flavor.list()
+        client = self.client.flavor.client
+        self.client.server.list()
+        self.assertIs(client, self.client.server.client)
+
     #
     # system
     #
+    def test_token_cache(self):
+        cache = OpenstackTokenCache(path="/tmp/beedrones-token-cache.json")
+        client1 = OpenstackManager(uri=self.client.uri, default_region=self.region, token_cache=cache)
+        client1.authorize(self.user, self.pwd, project=self.project, domain=self.domain, key=self.fernet)
+        client2 = OpenstackManager(uri=self.client.uri, default_region=self.region, token_cache=cache)
+        client2.authorize(self.user, self.pwd, project=self.project, domain=self.domain, key=self.fernet)
+        self.assertEqual(client1.identity.token, client2.identity.token)
+
+    def test_async_list(self):
+        async def list_all():
+            manager = AsyncOpenstackManager(self.client)
+            res = await asyncio.gather(
+                manager.server.list(detail=True),
+                manager.volume.list_all(detail=True),
+                manager.network.port.list(),
+                manager.image.list(),
+            )
+            manager.close()
+            return res
+
+        servers, volumes, ports, images = asyncio.run(list_all())
+        self.logger.debug("servers: %s, volumes: %s, ports: %s" % (len(servers), len(volumes), len(ports)))
+
+    def test_inventory_snapshot(self):
+        res = self.client.inventory.snapshot()
+        self.logger.debug(self.pp.pformat(res[:3]))
+
+    def test_response_cache(self):
+        client = OpenstackManager(
+            uri=self.client.uri, default_region=self.region, response_cache=OpenstackResponseCache(ttl=30)
+        )
+        client.authorize(self.user, self.pwd, project=self.project, domain=self.domain, key=self.fernet)
+        client.flavor.list()
+        client.flavor.list()
+        client.image.list()
+        client.image.list()
+        res = client.get_cache_stats()
+        self.logger.debug(self.pp.pformat(res))
+        self.assertGreaterEqual(res["hits"], 2)
+
+    def test_retry_policy(self):
+        client = OpenstackManager(
+            uri=self.client.uri, default_region=self.region, retry_policy=OpenstackRetryPolicy(max_retries=2)
+        )
+        client.authorize(self.user, self.pwd, project=self.project, domain=self.domain, key=self.fernet)
+        client.server.list(limit=10)
+        res = client.get_retry_stats()
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual(res["requests"], 1)
+
+    def test_compression(self):
+        client = OpenstackManager(uri=self.client.uri, default_region=self.region, compression=True)
+        client.authorize(self.user, self.pwd, project=self.project, domain=self.domain, key=self.fernet)
+        client.server.list(detail=True)
+        client.network.port.list()
+        res = client.get_compression_stats()
+        self.logger.debug(self.pp.pformat(res))
+
+    def test_resource_waiter(self):
+        waiter = OpenstackResourceWaiter(self.client, interval=1, timeout=60)
+        futures = [
+            waiter.add("server", server["id"], [server["status"]]) for server in self.client.server.list(limit=10)
+        ]
+        done, not_done = waiter.wait(timeout=60)
+        self.assertEqual(len(not_done), 0)
+        self.assertEqual(len(done), len(futures))
+
+    def test_thread_microversion(self):
+        server = self.client.server
+        server.setup()
+
+        def get_version(version):
+            server.set_nova_microversion(version)
+            sleep(0.1)
+            res = server.client.call("/servers?limit=1", "GET", data="", token=self.client.identity.token)
+            headers = {key.lower(): value for key, value in res[1]}
+            return headers["x-openstack-nova-api-version"]
+
+        versions = ["2.1", "2.10", "2.60", "2.1", "2.10", "2.60"]
+        res = concurrent_map(get_version, versions, len(versions))
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual(res, versions)
+
     def test_compute_api(self):
         res = self.client.system.compute_api()
         self.logger.debug(self.pp.pformat(res))
@@ -443,6 +560,12 @@ class OpenstackClientTestCase(BeedronesTestCase):
         self.logger.debug(self.pp.pformat(res))
         oid = res[0]["id"]
 
+    def test_server_iter(self):
+        count = 0
+        for server in self.client.server.iter_servers(detail=True, page_size=50):
+            count += 1
+        self.logger.debug("Get %s servers" % count)
+
     def test_get_server(self):
         global oid
         res = self.client.server.get(oid=oid)
@@ -590,6 +713,10 @@ class OpenstackClientTestCase(BeedronesTestCase):
         self.logger.debug(self.pp.pformat(res))
         oid = res[0]["id"]
 
+    def test_volume_list_all_concurrent(self):
+        res = self.client.volume_v3.list_all(detail=True, limit=100, concurrency=8)
+        self.logger.debug("Get %s volumes" % len(res))
+
     def test_volume_get(self):
         global oid
         res = self.client.volume_v3.get(oid=oid)
@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: EUPL-1.2
+#
+# (C) Copyright 2018-2024 CSI-Piemonte
+
+from beedrones.tests.test_util import runtest
+from beedrones.tests.openstack.client import OpenstackClientTestCase
+from beedrones.openstack import gnocchi
+
+metric_ids = None
+
+tests = [
+    "test_authorize",
+    "test_measures_to_columns",
+    "test_measures_to_columns_without_numpy",
+    "test_list_resources",
+    "test_list_metrics",
+    "test_get_measures",
+    "test_batch_get_measures",
+]
+
+points = [
+    ["2024-01-01T00:00:00+00:00", 300.0, 1.5],
+    ["2024-01-01T00:05:00+00:00", 300.0, 2.5],
+    ["2024-01-01T00:10:00+00:00", 300.0, 4.0],
+]
+
+
+class OpenstackGnocchiTestCase(OpenstackClientTestCase):
+    def test_measures_to_columns(self):
+        if gnocchi.numpy is None:
+            self.skipTest("numpy is not installed")
+        res = gnocchi.measures_to_columns(points)
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual(str(res["timestamps"].dtype), "datetime64[ns]")
+        self.assertEqual(str(res["timestamps"][1]), "2024-01-01T00:05:00.000000000")
+        self.assertEqual(res["granularity"].tolist(), [300.0, 300.0, 300.0])
+        self.assertEqual(res["values"].tolist(), [1.5, 2.5, 4.0])
+
+        res = gnocchi.measures_to_columns([])
+        self.assertEqual(len(res["values"]), 0)
+
+    def test_measures_to_columns_without_numpy(self):
+        numpy = gnocchi.numpy
+        gnocchi.numpy = None
+        try:
+            res = gnocchi.measures_to_columns(points)
+        finally:
+            gnocchi.numpy = numpy
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual(res["timestamps"], [item[0] for item in points])
+        self.assertEqual(res["granularity"], [300.0, 300.0, 300.0])
+        self.assertEqual(res["values"], [1.5, 2.5, 4.0])
+
+        # lists are returned also when numpy is installed
+        res = gnocchi.measures_to_columns(points, as_array=False)
+        self.assertEqual(res["values"], [1.5, 2.5, 4.0])
+
+    def test_list_resources(self):
+        res = self.client.gnocchi.resource.list(resource_type="instance", page_size=10)
+        self.logger.debug(self.pp.pformat(res))
+
+    def test_list_metrics(self):
+        global metric_ids
+        res = self.client.gnocchi.metric.list(name="cpu", page_size=10)
+        self.logger.debug(self.pp.pformat(res))
+        metric_ids = [item["id"] for item in res[:5]]
+
+    def test_get_measures(self):
+        res = self.client.gnocchi.metric.get_measures(metric_ids[0], aggregation="mean", as_array=False)
+        self.logger.debug(self.pp.pformat(res))
+
+    def test_batch_get_measures(self):
+        # chargeback: measures of many metrics requested in chunks smaller than the number of metrics
+        self.assertGreater(len(metric_ids), 2)
+        res = self.client.gnocchi.metric.batch_get_measures(
+            metric_ids, aggregation="mean", chunk_size=2, as_array=False
+        )
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual(sorted(res.keys()), sorted(metric_ids))
+        for oid in metric_ids:
+            single = self.client.gnocchi.metric.get_measures(oid, aggregation="mean", as_array=False)
+            self.assertEqual(res[oid]["timestamps"], single["timestamps"])
+            self.assertEqual(res[oid]["values"], single["values"])
+
+
+if __name__ == "__main__":
+    runtest(OpenstackGnocchiTestCase, tests)
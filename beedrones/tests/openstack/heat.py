@@ -0,0 +1,194 @@
+# SPDX-License-Identifier: EUPL-1.2
+#
+# (C) Copyright 2018-2024 CSI-Piemonte
+
+from beedrones.tests.test_util import runtest
+from beedrones.tests.openstack.client import OpenstackClientTestCase
+from beedrones.openstack.heat import OpenstackHeatTemplateCache
+from beecell.simple import id_gen
+
+stack_name = None
+stack_id = None
+
+tests = [
+    "test_authorize",
+    "test_template_cache",
+    "test_template_cache_refresh",
+    "test_template_bundle_registry",
+    "test_template_validate_cached",
+    "test_stack_create",
+    "test_stack_tail_events",
+    "test_stack_tail_events_since_marker",
+    "test_stack_delete",
+]
+
+template = """
+heat_template_version: 2016-10-14
+parameters:
+  length:
+    type: number
+    default: 8
+resources:
+  random:
+    type: OS::Heat::RandomString
+    properties:
+      length: {get_param: length}
+  config:
+    type: OS::Heat::SoftwareConfig
+    properties:
+      config: {get_file: config.sh}
+"""
+
+# same template content with a different text layout
+template_json = {
+    "heat_template_version": "2016-10-14",
+    "parameters": {"length": {"type": "number", "default": 8}},
+    "resources": {
+        "random": {"type": "OS::Heat::RandomString", "properties": {"length": {"get_param": "length"}}},
+        "config": {"type": "OS::Heat::SoftwareConfig", "properties": {"config": {"get_file": "config.sh"}}},
+    },
+}
+
+
+class OpenstackHeatTestCase(OpenstackClientTestCase):
+    def test_template_cache(self):
+        loaded = []
+
+        def loader(name):
+            loaded.append(name)
+            return "#!/bin/sh\necho %s\n" % name
+
+        cache = OpenstackHeatTemplateCache(max_bundles=2)
+        bundle = cache.bundle(template, loader=loader)
+        self.logger.debug(bundle)
+        self.assertEqual(bundle.files, {"config.sh": "#!/bin/sh\necho config.sh\n"})
+        self.assertEqual(bundle.template["heat_template_version"], "2016-10-14")
+
+        # same content: bundle is returned from cache and files are not read again
+        self.assertIs(cache.bundle(template, loader=loader), bundle)
+        self.assertEqual(loaded, ["config.sh"])
+
+        # different text with the same parsed content: new bundle with the same hash
+        other = cache.bundle(template_json, loader=loader)
+        self.assertIsNot(other, bundle)
+        self.assertEqual(other.hash, bundle.hash)
+
+        # changed content: new bundle with a new hash
+        changed = cache.bundle(template.replace("default: 8", "default: 16"), loader=loader)
+        self.assertNotEqual(changed.hash, bundle.hash)
+
+        # validation results are cached by bundle hash
+        self.assertIsNone(cache.get_result(bundle))
+        cache.set_result(bundle, {"Parameters": {}})
+        self.assertEqual(cache.get_result(other), {"Parameters": {}})
+        self.assertIsNone(cache.get_result(changed))
+
+        # oldest bundle was evicted
+        cache.bundle(template, loader=loader)
+        self.assertEqual(len(loaded), 4)
+
+        stats = cache.stats()
+        self.logger.debug(self.pp.pformat(stats))
+        self.assertEqual(
+            stats,
+            {"bundles": 2, "results": 1, "hits": 1, "misses": 4, "validate_hits": 1, "validate_misses": 2},
+        )
+
+    def test_template_cache_refresh(self):
+        content = {"config.sh": "#!/bin/sh\necho v1\n"}
+        cache = OpenstackHeatTemplateCache()
+        bundle = cache.bundle(template, loader=lambda name: content[name])
+        cache.set_result(bundle, {"Parameters": {}})
+
+        # files read with loader are assumed immutable
+        content["config.sh"] = "#!/bin/sh\necho v2\n"
+        self.assertIs(cache.bundle(template, loader=lambda name: content[name]), bundle)
+
+        # refresh reads files again. Changed content has a new hash and is validated again
+        refreshed = cache.bundle(template, loader=lambda name: content[name], refresh=True)
+        self.assertEqual(refreshed.files["config.sh"], "#!/bin/sh\necho v2\n")
+        self.assertNotEqual(refreshed.hash, bundle.hash)
+        self.assertIsNone(cache.get_result(refreshed))
+        self.assertIs(cache.bundle(template, loader=lambda name: content[name]), refreshed)
+
+        self.assertTrue(cache.invalidate(template))
+        self.assertFalse(cache.invalidate(template))
+        self.assertEqual(cache.stats()["bundles"], 0)
+
+    def test_template_bundle_registry(self):
+        loaded = []
+
+        def loader(name):
+            loaded.append(name)
+            if name == "server.yaml":
+                return "heat_template_version: 2016-10-14\nresources:\n  config: {type: config.yaml}\n"
+            return "heat_template_version: 2016-10-14\n"
+
+        environment = {
+            "resource_registry": {
+                "My::Server": "server.yaml",
+                "My::None": "OS::Heat::None",
+                "resources": {"random": {"OS::Heat::RandomString": "random.yaml", "hooks": "pre-create"}},
+            }
+        }
+        bundle = OpenstackHeatTemplateCache().bundle(template_json, environment, files={"config.sh": ""}, loader=loader)
+        self.logger.debug(bundle)
+        # provider templates of resources section and their nested providers are included. Type mappings are not files
+        self.assertEqual(sorted(bundle.files.keys()), ["config.sh", "config.yaml", "random.yaml", "server.yaml"])
+        self.assertEqual(sorted(loaded), ["config.yaml", "random.yaml", "server.yaml"])
+
+    def test_template_validate_cached(self):
+        heat = self.client.heat
+        heat.template_cache.clear()
+        bundle = heat.template.bundle(template, files={"config.sh": "#!/bin/sh\n"})
+        before = heat.template_cache.stats()
+        res = heat.template.validate(bundle=bundle)
+        self.logger.debug(self.pp.pformat(res))
+
+        # second validation of the same content is not sent to heat
+        bundle = heat.template.bundle(template, files={"config.sh": "#!/bin/sh\n"})
+        self.assertEqual(heat.template.validate(bundle=bundle), res)
+        stats = heat.template_cache.stats()
+        self.logger.debug(self.pp.pformat(stats))
+        self.assertEqual(stats["hits"] - before["hits"], 1)
+        self.assertEqual(stats["validate_hits"] - before["validate_hits"], 1)
+        self.assertEqual(stats["validate_misses"] - before["validate_misses"], 1)
+
+    def test_stack_create(self):
+        global stack_name, stack_id
+        stack_name = "stack-%s" % id_gen()
+        bundle = self.client.heat.template.bundle(template, files={"config.sh": "#!/bin/sh\n"})
+        res = self.client.heat.stack.create(stack_name=stack_name, bundle=bundle, parameters={"length": 12})
+        self.logger.debug(self.pp.pformat(res))
+        stack_id = res["id"]
+
+    def test_stack_tail_events(self):
+        events = list(self.client.heat.stack.event.tail_events(stack_name, stack_id, interval=1, timeout=300))
+        self.logger.debug(self.pp.pformat(events))
+        ids = [event["id"] for event in events]
+        self.assertGreater(len(ids), 0)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(events[-1]["resource_name"], stack_name)
+        self.assertEqual(events[-1]["resource_status"], "CREATE_COMPLETE")
+
+    def test_stack_tail_events_since_marker(self):
+        event = self.client.heat.stack.event
+        events = list(event.tail_events(stack_name, stack_id, follow=False))
+        ids = [item["id"] for item in events]
+
+        # only the events after the marker are returned, also when they are read in many pages
+        res = list(event.tail_events(stack_name, stack_id, since_marker=ids[0], limit=2, follow=False))
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual([item["id"] for item in res], ids[1:])
+
+        # no new events after the last one
+        res = list(event.tail_events(stack_name, stack_id, since_marker=ids[-1], follow=False))
+        self.assertEqual(res, [])
+
+    def test_stack_delete(self):
+        res = self.client.heat.stack.delete(stack_name=stack_name, oid=stack_id)
+        self.logger.debug(self.pp.pformat(res))
+
+
+if __name__ == "__main__":
+    runtest(OpenstackHeatTestCase, tests)
@@ -24,6 +24,8 @@ tests = [
     "test_grant_access",
     "test_list_access",
     "test_revoke_access",
+    "test_sync_access",
+    "test_sync_access_level",
     "test_reset_status",
     "test_extend",
     "test_shrink",
@@ -173,6 +175,33 @@ class OpenstackManilaTestCase(OpenstackClientTestCase):
         res = self.client.manila.share.action.revoke_access(share_id, access_id)
         self.logger.debug(res)
 
+    def test_sync_access(self):
+        global share_id
+        rules = [
+            {"access_type": "ip", "access_to": "158.102.160.0/24", "access_level": "rw"},
+            {"access_type": "ip", "access_to": "158.102.161.0/24", "access_level": "ro"},
+        ]
+        res = self.client.manila.share.action.sync_access(share_id, rules, concurrency=2)
+        self.logger.debug(res)
+        self.assertEqual(res["errors"], [])
+        res = self.client.manila.share.action.sync_access(share_id, rules[:1])
+        self.logger.debug(res)
+        self.assertEqual(len(res["revoked"]), 1)
+
+    def test_sync_access_level(self):
+        global share_id
+        # only access level changes: old rule is revoked before the new one is granted
+        rules = [{"access_type": "ip", "access_to": "158.102.160.0/24", "access_level": "ro"}]
+        res = self.client.manila.share.action.sync_access(share_id, rules)
+        self.logger.debug(res)
+        self.assertEqual(res["errors"], [])
+        self.assertEqual(len(res["revoked"]), 1)
+        self.assertEqual(len(res["granted"]), 1)
+        self.assertEqual(res["granted"][0]["access_level"], "ro")
+        self.assertEqual(res["granted"][0]["state"], "active")
+        access = self.client.manila.share.action.list_access(share_id)
+        self.assertEqual([(item["access_to"], item["access_level"]) for item in access], [("158.102.160.0/24", "ro")])
+
     def test_reset_status(self):
         global share_id
         status = "available"
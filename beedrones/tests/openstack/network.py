@@ -36,11 +36,13 @@ tests = [
     "test_update_subnet",
     # ----- port -------
     "test_network_port_list",
+    "test_network_port_list_fields",
     "test_network_port_get",
     "test_create_port",
     "test_update_port",
     # ----- router -------
     "test_network_router_list",
+    "test_network_router_list_fields",
     "test_network_router_get",
     "test_network_router_create",
     "test_network_router_update",
@@ -55,9 +57,14 @@ tests = [
     "test_security_group_update",
     "test_security_group_rule_create",
     "test_security_group_rule_delete",
+    "test_security_group_create_many",
+    "test_security_group_reconcile",
+    "test_security_group_reconcile_port_rule",
+    "test_security_group_reconcile_normalized_rule",
     "test_security_group_delete",
     # ----- ip -------
     "test_list_floating_ips",
+    "test_list_floating_ips_fields",
     "test_get_floating_ip",
     ## 'test_floating_ip_create',
     ## 'test_floating_ip_update',
@@ -208,6 +215,12 @@ class OpenstackNetworkTestCase(OpenstackClientTestCase):
         self.logger.debug(self.pp.pformat(res))
         port_id = res[0]["id"]
 
+    def test_network_port_list_fields(self):
+        res = self.client.network.port.list(fields=["id", "fixed_ips", "device_id"], page_size=500)
+        self.logger.debug(self.pp.pformat(res[:5]))
+        for item in res:
+            self.assertEqual(sorted(item.keys()), ["device_id", "fixed_ips", "id"])
+
     def test_network_port_get(self):
         global port_id
         res = self.client.network.port.get(port_id)
@@ -282,6 +295,12 @@ class OpenstackNetworkTestCase(OpenstackClientTestCase):
         self.logger.debug(self.pp.pformat(res))
         floating_ip = res[0]["id"]
 
+    def test_list_floating_ips_fields(self):
+        res = self.client.network.floatingip.list(fields=["id", "floating_ip_address", "port_id"], page_size=500)
+        self.logger.debug(self.pp.pformat(res[:5]))
+        for item in res:
+            self.assertEqual(sorted(item.keys()), ["floating_ip_address", "id", "port_id"])
+
     def test_get_floating_ip(self):
         global floating_ip
         res = self.client.network.floatingip.get(floating_ip)
@@ -296,6 +315,12 @@ class OpenstackNetworkTestCase(OpenstackClientTestCase):
         self.logger.debug(self.pp.pformat(res))
         router_id = res[0]["id"]
 
+    def test_network_router_list_fields(self):
+        res = self.client.network.router.list(fields=["id", "name"], page_size=500)
+        self.logger.debug(self.pp.pformat(res[:5]))
+        for item in res:
+            self.assertEqual(sorted(item.keys()), ["id", "name"])
+
     def test_network_router_get(self):
         global router_id
         res = self.client.network.router.get(oid=router_id)
@@ -392,6 +417,105 @@ class OpenstackNetworkTestCase(OpenstackClientTestCase):
         res = self.client.network.security_group.delete_rule(rule_id)
         self.logger.debug(self.pp.pformat(res))
 
+    def test_security_group_create_many(self):
+        global sg_id
+        rules = [
+            {
+                "security_group": sg_id,
+                "direction": "ingress",
+                "ethertype": "IPv4",
+                "port_range_min": port,
+                "port_range_max": port,
+                "protocol": "TCP",
+                "remote_ip_prefix": "10.100.2.0/24",
+            }
+            for port in range(2000, 2010)
+        ]
+        res = self.client.network.security_group.create_many(rules, chunk_size=4)
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual([item["index"] for item in res], list(range(10)))
+        for item in res:
+            self.assertTrue(item["created"])
+            self.client.network.security_group.delete_rule(item["item"]["id"])
+
+    def test_security_group_reconcile(self):
+        global sg_id
+        rules = [
+            {"direction": "egress", "ethertype": "IPv4"},
+            {
+                "direction": "ingress",
+                "ethertype": "IPv4",
+                "port_range_min": 22,
+                "port_range_max": 22,
+                "protocol": "tcp",
+                "remote_ip_prefix": "10.100.2.0/24",
+            },
+        ]
+        res = self.client.network.security_group.reconcile(sg_id, rules)
+        self.logger.debug(self.pp.pformat(res))
+        res = self.client.network.security_group.reconcile(sg_id, rules, dry_run=True)
+        self.assertEqual(res["add"], [])
+        self.assertEqual(res["remove"], [])
+
+    def test_security_group_reconcile_port_rule(self):
+        global sg_id
+        security_group = self.client.network.security_group
+        rule = security_group.create_rule(sg_id, "ingress", protocol="tcp", port_range_min=22, port_range_max=22)
+        self.assertEqual(rule["port_range_min"], 22)
+        current = security_group.get(sg_id)["security_group_rules"]
+        rules = [
+            {
+                "direction": item["direction"],
+                "ethertype": item["ethertype"],
+                "protocol": item["protocol"],
+                "port_range_min": item["port_range_min"],
+                "port_range_max": item["port_range_max"],
+                "remote_ip_prefix": item["remote_ip_prefix"],
+                "remote_group_id": item["remote_group_id"],
+            }
+            for item in current
+            if item["id"] != rule["id"]
+        ]
+        # ported rule without remote and ethertype
+        rules.append({"direction": "ingress", "protocol": "tcp", "port_range_min": 22, "port_range_max": 22})
+        res = security_group.reconcile(sg_id, rules)
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual(res["add"], [])
+        self.assertEqual(res["remove"], [])
+        self.assertEqual(res["created"], [])
+        self.assertEqual(res["deleted"], [])
+
+    def test_security_group_reconcile_normalized_rule(self):
+        global sg_id
+        security_group = self.client.network.security_group
+        rule = security_group.create_rule(
+            sg_id,
+            "ingress",
+            ethertype="IPv6",
+            protocol="tcp",
+            port_range_min=443,
+            port_range_max=443,
+            remote_ip_prefix="2001:db8::/64",
+        )
+        current = security_group.get(sg_id)["security_group_rules"]
+        keys = ["direction", "ethertype", "protocol", "port_range_min", "port_range_max"]
+        keys += ["remote_ip_prefix", "remote_group_id"]
+        rules = [{key: item[key] for key in keys} for item in current if item["id"] != rule["id"]]
+        # ethertype inferred from remote ip prefix and protocol as number
+        rules.append(
+            {
+                "direction": "ingress",
+                "protocol": "6",
+                "port_range_min": 443,
+                "port_range_max": 443,
+                "remote_ip_prefix": "2001:db8::/64",
+            }
+        )
+        res = security_group.reconcile(sg_id, rules, dry_run=True)
+        self.logger.debug(self.pp.pformat(res))
+        self.assertEqual(res["add"], [])
+        self.assertEqual(res["remove"], [])
+
 
 if __name__ == "__main__":
     runtest(OpenstackNetworkTestCase, tests)
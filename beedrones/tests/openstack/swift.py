@@ -11,6 +11,7 @@ import ujson as json
 import unittest
 import random
 import time
+import os
 from beecell.simple import transaction_id_generator
 from gibboncloudapi.util.data import container
 from beecell.simple import jsonDumps
@@ -64,6 +65,13 @@ class OpenstackSwiftTestCase(CloudapiTestCase):
         res = client.swift.container_read(container=container)
         self.logger.debug("Get openstack swift container details: %s" % jsonDumps(res))
 
+    def test_iter_objects(self):
+        container = "prova"
+        count = 0
+        for item in client.swift.iter_objects(container, page_size=100):
+            count += 1
+        self.logger.debug("Get openstack swift container %s objects: %s" % (container, count))
+
     def test_container_put(self):
         container = "prova"
         res = client.swift.container_put(container=container, x_container_meta_name={"meta1": "", "meta2": ""})
@@ -98,6 +106,12 @@ class OpenstackSwiftTestCase(CloudapiTestCase):
         res = client.swift.object_get(container=container, c_object=c_object)
         self.logger.debug("Get openstack swift object details: %s" % res)
 
+    def test_object_get_stream(self):
+        container = "prova"
+        c_object = "test3"
+        res = client.swift.object_get_stream(container=container, c_object=c_object, dest="/tmp/%s" % c_object)
+        self.logger.debug("Download openstack swift object: %s" % res)
+
     def test_object_put(self):
         container = "prova"
         c_object = "test3"
@@ -109,6 +123,46 @@ class OpenstackSwiftTestCase(CloudapiTestCase):
         )
         self.logger.debug("Put openstack swift object: %s" % jsonDumps(res))
 
+    def test_object_put_from_file(self):
+        container = "prova"
+        c_object = "test3"
+        with open("/tmp/%s" % c_object, "wb") as f:
+            f.write(b"Prova test" * 1024)
+        res = client.swift.object_put(container=container, c_object=c_object, path="/tmp/%s" % c_object)
+        self.logger.debug("Put openstack swift object: %s" % jsonDumps(res))
+
+    def test_upload_large_object(self):
+        container = "prova"
+        c_object = "test_large"
+        with open("/tmp/%s" % c_object, "wb") as f:
+            f.write(os.urandom(10 * 1048576))
+        res = client.swift.upload_large_object(
+            container, c_object, "/tmp/%s" % c_object, segment_size=1048576, concurrency=4
+        )
+        self.logger.debug("Upload openstack swift large object: %s" % jsonDumps(res))
+
+    def test_upload_large_object_max_segments(self):
+        container = "prova"
+        c_object = "test_large"
+        max_segments = client.swift.info().get("slo", {}).get("max_manifest_segments", 1000)
+        # segment size is increased to not exceed max manifest segments
+        res = client.swift.upload_large_object(container, c_object, "/tmp/%s" % c_object, segment_size=8192)
+        self.logger.debug("Upload openstack swift large object: %s segments" % len(res["segments"]))
+        self.assertLessEqual(len(res["segments"]), max_segments)
+
+    def test_download_object_parallel(self):
+        container = "prova"
+        c_object = "test_large"
+        res = client.swift.download_object_parallel(
+            container, c_object, "/tmp/%s.download" % c_object, concurrency=4, part_size=1048576
+        )
+        self.logger.debug("Download openstack swift object: %s" % jsonDumps(res))
+
+    def test_bulk_delete(self):
+        container = "prova"
+        res = client.swift.bulk_delete(container, client.swift.iter_objects(container, prefix="test"))
+        self.logger.debug("Bulk delete openstack swift objects: %s" % jsonDumps(res))
+
     def test_object_copy(self):
         container = "prova"
         c_object = "test3"
@@ -190,14 +244,21 @@ def test_suite():
         # --------------Test swift containers--------------------
         #'test_container_put',
         #'test_container_read',
+        #'test_iter_objects',
         #'test_container_delete',
         #'test_container_metadata_post',
         #'test_container_metadata_get',
         # --------------Test swift object--------------------
         "test_object_put",
+        #'test_object_put_from_file',
+        #'test_upload_large_object',
+        #'test_upload_large_object_max_segments',
+        #'test_download_object_parallel',
         #'test_object_get',
+        #'test_object_get_stream',
         #'test_object_copy',
         #'test_object_delete',
+        #'test_bulk_delete',
         #'test_object_metadata_post',
         #'test_object_metadata_get',
         #'test_generate_key'